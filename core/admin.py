@@ -1,6 +1,186 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
 from django.contrib.auth.admin import UserAdmin
-from .models import AdminUser, Role, Branch, Dealer, ProductSupply
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from .models import AdminUser, Role, Branch, Dealer, ProductSupply, DeletionJob
+from .utils import CountedPaginator, estimated_count, cached_count
+from .profiling import list_profiles, read_profile
+
+PERFORMANCE_MODE = getattr(settings, 'ADMIN_PERFORMANCE_MODE', False)
+CURSOR_VAR = 'cursor'
+# Keyset cursor of the first row of the next page, walking back
+BEFORE_VAR = 'before'
+
+
+# ============================================================================
+# Large-table performance mode
+# ============================================================================
+
+def admin_count(queryset):
+    """Planner estimate for the unfiltered changelist, short-TTL cached count otherwise"""
+    if not queryset.query.where:
+        return estimated_count(queryset)
+    return cached_count(queryset)
+
+
+class EstimatedCountPaginator(CountedPaginator):
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page, admin_count, **kwargs)
+
+
+def _cached_choices(key, load):
+    """Materialize filter choices once per ADMIN_FILTER_CACHE_TTL; ``load``
+    is only called on a cache miss"""
+    cached = cache.get(key)
+    if cached is None:
+        cached = list(load())
+        cache.set(key, cached, settings.ADMIN_FILTER_CACHE_TTL)
+    return cached
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """AllValuesFieldListFilter without a SELECT DISTINCT on every page load"""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = f"admin-filter:{model._meta.label_lower}:{field_path}"
+        self.lookup_choices = _cached_choices(key, lambda: self.lookup_choices)
+
+
+class CachedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """RelatedFieldListFilter with cached choices"""
+
+    def field_choices(self, field, request, model_admin):
+        key = f"admin-filter:{model_admin.model._meta.label_lower}:{self.field_path}"
+        return _cached_choices(key, lambda: super(CachedRelatedFieldListFilter, self).field_choices(
+            field, request, model_admin
+        ))
+
+
+class CursorChangeList(ChangeList):
+    """Keyset-paginated changelist ordered by (-created_at, -pk).
+
+    Used when the list is in its default order; clicking a column header
+    falls back to regular page numbers with an estimated count. Only
+    previous/next links are rendered (admin/core/cursor_pagination.html),
+    and the total is the paginator's estimate, never a page's length.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, search and sort links always start from the first page
+        remove = list(remove or [])
+        for var in (CURSOR_VAR, BEFORE_VAR):
+            if not new_params or var not in new_params:
+                remove.append(var)
+        return super().get_query_string(new_params, remove)
+
+    @staticmethod
+    def encode_cursor(obj):
+        raw = f"{obj.created_at.isoformat()}|{obj.pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def decode_cursor(value):
+        try:
+            created_at, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    def get_results(self, request):
+        self.cursor_mode = ORDER_VAR not in self.params and not self.show_all
+        if not self.cursor_mode:
+            return super().get_results(request)
+
+        after = self.decode_cursor(request.GET.get(CURSOR_VAR, ''))
+        before = None if after else self.decode_cursor(request.GET.get(BEFORE_VAR, ''))
+        queryset = self.queryset
+        if before:
+            created_at, pk = before
+            rows = list(
+                queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+                .order_by('created_at', 'pk')[:self.list_per_page + 1]
+            )
+            has_previous = len(rows) > self.list_per_page
+            rows = rows[:self.list_per_page][::-1]
+            has_next = True
+        else:
+            if after:
+                created_at, pk = after
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            rows = list(queryset.order_by('-created_at', '-pk')[:self.list_per_page + 1])
+            has_next = len(rows) > self.list_per_page
+            rows = rows[:self.list_per_page]
+            has_previous = after is not None
+
+        self.first_page_url = self.get_query_string() if has_previous else None
+        self.previous_page_url = (
+            self.get_query_string({BEFORE_VAR: self.encode_cursor(rows[0])}) if has_previous and rows else None
+        )
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: self.encode_cursor(rows[-1])}) if has_next and rows else None
+        )
+        # Estimated when unfiltered, a cached COUNT(*) otherwise (admin_count)
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.result_count_is_exact = self.paginator.count_is_exact
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        # False keeps the pagination tag from building a numbered page range
+        self.multi_page = False
+
+
+class LargeTableAdminMixin:
+    """Performance mode for changelists over large tables (ADMIN_PERFORMANCE_MODE).
+
+    Skips the unfiltered COUNT(*), caches list filter choices, paginates by
+    keyset and restricts search to lookups that can use an index.
+    """
+    show_full_result_count = not PERFORMANCE_MODE
+    # Exact-match/prefix lookups on indexed columns used in performance mode
+    indexed_search_fields = ()
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if not PERFORMANCE_MODE:
+            return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        return EstimatedCountPaginator(queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+
+    def get_changelist(self, request, **kwargs):
+        return CursorChangeList if PERFORMANCE_MODE else super().get_changelist(request, **kwargs)
+
+    def indexed_search(self, term):
+        """Q over indexed_search_fields for a search term; None falls back to
+        the regular search_fields search"""
+        condition = Q()
+        for lookup in self.indexed_search_fields:
+            condition |= Q(**{lookup: term})
+        return condition
+
+    def get_search_results(self, request, queryset, search_term):
+        if not PERFORMANCE_MODE or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+
+        condition = self.indexed_search(search_term.strip())
+        if condition is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(condition), False
+
 
 
 @admin.register(AdminUser)
@@ -34,11 +214,20 @@ class BranchAdmin(admin.ModelAdmin):
 
 
 @admin.register(Dealer)
-class DealerAdmin(admin.ModelAdmin):
+class DealerAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "name", "mobile_number", "company_name", "branch", "created_at")
-    list_filter = ("branch", "state", "created_at")
+    list_filter = (
+        ("branch", CachedRelatedFieldListFilter),
+        ("state", CachedAllValuesFieldListFilter),
+        "created_at",
+    ) if PERFORMANCE_MODE else ("branch", "state", "created_at")
     search_fields = ("name", "mobile_number", "company_name", "email")
     ordering = ("-created_at",)
+
+    def indexed_search(self, term):
+        # Numbers use the mobile digit indexes; names and companies (also what
+        # the supply form's dealer autocomplete types) use search_fields
+        return Dealer.mobile_search(term)
     
     def get_queryset(self, request):
         """Optimize queryset with select_related"""
@@ -47,7 +236,7 @@ class DealerAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductSupply)
-class ProductSupplyAdmin(admin.ModelAdmin):
+class ProductSupplyAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "id", 
         "product_name", 
@@ -62,8 +251,14 @@ class ProductSupplyAdmin(admin.ModelAdmin):
         "purchase_date",
         "count"
     )
-    list_filter = ("dealer__branch", "purchase_date", "product_name")  # This is correct
+    list_filter = (
+        ("dealer__branch", CachedRelatedFieldListFilter),
+        "purchase_date",
+        ("product_name", CachedAllValuesFieldListFilter),
+    ) if PERFORMANCE_MODE else ("dealer__branch", "purchase_date", "product_name")  # This is correct
     search_fields = ("product_name", "invoice_number", "serial_number", "dealer__name", "dealer__company_name")
+    # serial_number is unique, so Postgres also builds a pattern index usable for prefixes
+    indexed_search_fields = ("serial_number__startswith", "product_name", "dealer__mobile_number")
     ordering = ("-created_at",)
     autocomplete_fields = ['dealer']  # Better UX for selecting dealer
     
@@ -79,6 +274,49 @@ class ProductSupplyAdmin(admin.ModelAdmin):
         return qs.select_related('dealer', 'dealer__branch', 'created_by')
 
 
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "target_type", "target_id", "target_name", "status", "deleted_supplies", "total_supplies", "created_at", "finished_at")
+    list_filter = ("status", "target_type")
+    readonly_fields = [f.name for f in DeletionJob._meta.fields]
+    ordering = ("-created_at",)
+
+
+# ============================================================================
+# Request profiles (X-Profile / ?_profile=1)
+# ============================================================================
+
+def profile_list_view(request):
+    """Stored per-request profiles, newest first"""
+    context = dict(
+        admin.site.each_context(request),
+        title="Request profiles",
+        profiles=list_profiles(),
+        max_files=settings.PROFILER_MAX_FILES,
+    )
+    return TemplateResponse(request, 'admin/core/profiles.html', context)
+
+
+def profile_detail_view(request, profile_id):
+    """Text report of one profile, or the raw .prof for snakeviz/pstats with ?download=1"""
+    if request.GET.get('download'):
+        path = read_profile(profile_id, '.prof')
+        if path is None:
+            raise Http404
+        return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+    path = read_profile(profile_id)
+    if path is None:
+        raise Http404
+    context = dict(
+        admin.site.each_context(request),
+        title=f"Profile {profile_id}",
+        profile_id=profile_id,
+        report=path.read_text(),
+    )
+    return TemplateResponse(request, 'admin/core/profile_detail.html', context)
+
+
 # Customize admin site headers
 admin.site.site_header = "Dealer Management Admin"
 admin.site.site_title = "Dealer Admin Portal"
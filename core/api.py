@@ -1,13 +1,16 @@
 from tokenize import TokenError
+from urllib.parse import urlencode
 from ninja import Router
 from django.contrib.auth import authenticate, get_user_model
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Sum, Q
+from django.db.models import Count, F, Sum, Q
+from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 from ninja.errors import HttpError
 
-from .models import Role, Branch, Dealer, ProductSupply
+from .models import Role, Branch, Dealer, ProductSupply, DeletionJob, DealerPeriodTotal, SupplyComponent
 from .schemas import (
     LoginRequest,
     RefreshRequest,
@@ -23,15 +26,36 @@ from .schemas import (
     BranchResponseSchema,
     DealerInSchema,
     DealerSchema,
+    DealerSuggestionSchema,
     ProductSupplySchema,
     ProductSupplyResponseSchema,
     DetailsResponse,
+    DeletionJobSchema,
+    SyncSchema,
+    SupplyUpsertSchema,
+    DealerBatchSchema,
+    SupplyBatchSchema,
+    LeaderboardSchema,
+    ComponentMatchSchema,
+    ComponentDuplicateSchema,
 )
 from .responses import BaseResponseSchema, PaginatedResponseSchema
-from .utils import paginate_queryset
-from .auth import get_auth_class
+from .utils import paginate_queryset, estimated_count, cached_count, parse_id_list, fetch_by_ids
+from .auth import get_auth_class, get_tokens_for_user
+from .scope import get_request_scope, scoped_queryset, can_view_dealer, can_view_supply, viewable_dealers
+from .sync import collect_changes
+from .idempotency import idempotent
+from .cache import cached_response, scope_namespaces, dealer_ns, branch_ns
+from .reference import branch_name
+from .autocomplete import dealer_index
+from .archive import HistoryWithArchive, supply_archive
 from .serializers import ModelSerializer
 from .services.email_service import EmailService
+from .services.deletion_service import DeletionService
+from .services.supply_stream_service import SupplyStreamService
+from .services.supply_upsert_service import SupplyUpsertService
+from .services.period_totals_service import PeriodTotalsService
+from .services.supply_component_service import SupplyComponentService
 
 # Initialize serializer and email service
 serializer = ModelSerializer()
@@ -60,7 +84,7 @@ def login(request, data: LoginRequest):
             'message': 'Invalid credentials',
         }
     
-    refresh = RefreshToken.for_user(user)
+    refresh = get_tokens_for_user(user)
     token_data = {
         'access': str(refresh.access_token),
         'refresh': str(refresh),
@@ -96,7 +120,7 @@ def refresh_token(request, data: RefreshRequest):
             }
 
         user = User.objects.get(id=user_id)
-        new_refresh = RefreshToken.for_user(user)
+        new_refresh = get_tokens_for_user(user)
 
         return 200, BaseResponseSchema.success_response(
             data={
@@ -134,7 +158,7 @@ def signup(request, data: SignupSchema):
             is_staff=True
         )
 
-        refresh = RefreshToken.for_user(user)
+        refresh = get_tokens_for_user(user)
         token_data = TokenResponse(
             access=str(refresh.access_token),
             refresh=str(refresh),
@@ -218,22 +242,11 @@ def reset_password(request, data: ResetPasswordRequest):
 @router.get('/details', response=DetailsResponse)
 def get_details(request):
     """Get roles, branches, and dealers based on user permissions"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+    scope = get_request_scope(request)
 
-    if user.is_superuser:
-        roles_qs = Role.objects.all()
-        branches_qs = Branch.objects.all()
-        dealers_qs = Dealer.objects.all()
-    elif user.is_staff:
-        roles_qs = Role.objects.filter(Q(created_by=user))
-        branches_qs = Branch.objects.filter(Q(created_by=user))
-        dealers_qs = Dealer.objects.filter(Q(created_by=user))
-    else:
-        roles_qs = user.created_roles.all()
-        branches_qs = user.created_branches.all()
-        dealers_qs = user.created_dealers.all()
+    roles_qs = scoped_queryset(Role, scope)
+    branches_qs = scoped_queryset(Branch, scope)
+    dealers_qs = scoped_queryset(Dealer, scope)
 
     return {
         'status': True,
@@ -251,6 +264,7 @@ def get_details(request):
 # ============================================================================
 
 @router.post('/roles', response=RoleResponseSchema)
+@idempotent
 def add_role(request, data: RoleSchema):
     """Create a new role"""
     user = getattr(request, 'user', None)
@@ -268,6 +282,7 @@ def add_role(request, data: RoleSchema):
 # ============================================================================
 
 @router.post('/branches', response=BranchResponseSchema)
+@idempotent
 def add_branch(request, data: BranchSchema):
     """Create a new branch"""
     user = getattr(request, 'user', None)
@@ -280,6 +295,57 @@ def add_branch(request, data: BranchSchema):
     return serializer.branch_to_dict(obj)
 
 
+@router.delete('/branches/{branch_id}', response={202: BaseResponseSchema[DeletionJobSchema]})
+def delete_branch(request, branch_id: int):
+    """Queue a branch and all of its dealers for background deletion"""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        raise HttpError(401, "Unauthorized")
+    if not (user.is_staff or user.is_superuser):
+        raise HttpError(403, "Forbidden")
+
+    try:
+        branch = Branch.objects.get(id=branch_id)
+
+        # Authorization check
+        if not user.is_superuser and branch.created_by_id != user.id:
+            raise HttpError(403, "You don't have permission to delete this branch")
+
+        job = DeletionService.active_job(DeletionJob.TARGET_BRANCH, branch.id)
+        if job is None:
+            job = DeletionService.schedule_branch_deletion(branch, user)
+
+        return 202, BaseResponseSchema.success_response(
+            data=serializer.deletion_job_to_dict(job),
+            message=f"Branch '{branch.name}' scheduled for deletion"
+        )
+    except Branch.DoesNotExist:
+        raise HttpError(404, "Branch not found")
+    except HttpError:
+        raise
+    except Exception as e:
+        raise HttpError(400, f"Error deleting branch: {e}")
+
+
+@router.get('/deletion-jobs/{job_id}', response=BaseResponseSchema[DeletionJobSchema])
+def get_deletion_job(request, job_id: int):
+    """Get progress of a background dealer/branch deletion"""
+    scope = get_request_scope(request)
+
+    try:
+        job = DeletionJob.objects.get(id=job_id)
+    except DeletionJob.DoesNotExist:
+        raise HttpError(404, "Deletion job not found")
+
+    if not scope.is_superuser and job.created_by_id != scope.user_id:
+        raise HttpError(403, "You don't have permission to view this job")
+
+    return BaseResponseSchema.success_response(
+        data=serializer.deletion_job_to_dict(job),
+        message="Deletion job retrieved successfully"
+    )
+
+
 # ============================================================================
 # Dealer Endpoints
 # ============================================================================
@@ -287,42 +353,99 @@ def add_branch(request, data: BranchSchema):
 @router.get('/dealers', response=PaginatedResponseSchema[list[DealerSchema]])
 def list_dealers(request, page: int = 1, page_size: int = 10, branch_id: int = None, search: str = None):
     """List dealers with pagination, branch filter, and search"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+    get_request_scope(request)
 
     try:
-        dealers_qs = Dealer.objects.select_related('branch').all()
+        def build():
+            dealers_qs = Dealer.objects.filter(is_deleting=False)
         
-        # Filter by branch if provided
-        if branch_id:
-            dealers_qs = dealers_qs.filter(branch_id=branch_id)
+            # Filter by branch if provided
+            if branch_id:
+                dealers_qs = dealers_qs.filter(branch_id=branch_id)
         
-        # Search by name, mobile_number, or company_name
-        if search:
-            dealers_qs = dealers_qs.filter(
-                Q(name__icontains=search) |
-                Q(mobile_number__icontains=search) |
-                Q(company_name__icontains=search)
+            # Search by name, mobile_number, or company_name
+            # A numeric term is a phone number: prefix/suffix match on the digits indexes
+            mobile_q = Dealer.mobile_search(search)
+            if mobile_q is not None:
+                dealers_qs = dealers_qs.filter(mobile_q)
+            elif search:
+                dealers_qs = dealers_qs.filter(
+                    Q(name__icontains=search) |
+                    Q(mobile_number__icontains=search) |
+                    Q(company_name__icontains=search)
+                )
+
+            items, pagination = paginate_queryset(
+                dealers_qs,
+                page=page,
+                page_size=page_size,
+                url_path="/api/dealers"
             )
 
-        items, pagination = paginate_queryset(
-            dealers_qs,
-            page=page,
-            page_size=page_size,
-            url_path="/api/dealers"
-        )
+            return PaginatedResponseSchema.success_response(
+                data=[serializer.dealer_to_dict(d) for d in items],
+                pagination=pagination,
+                message="Dealers retrieved successfully"
+            )
 
-        return PaginatedResponseSchema.success_response(
-            data=[serializer.dealer_to_dict(d) for d in items],
-            pagination=pagination,
-            message="Dealers retrieved successfully"
+        # A branch filter only depends on that branch's dealers
+        namespaces = [branch_ns(branch_id), 'branches'] if branch_id else ['dealers', 'branches']
+        return cached_response(
+            'list_dealers',
+            namespaces,
+            {'page': page, 'page_size': page_size, 'branch_id': branch_id, 'search': search},
+            build,
         )
     except Exception as e:
         raise HttpError(400, f"Error listing dealers: {e}")
 
 
+@router.get('/dealers/autocomplete', response=BaseResponseSchema[list[DealerSuggestionSchema]])
+def autocomplete_dealers(request, q: str, branch_id: int = None, limit: int = 10):
+    """Type-ahead: dealers whose name, company or mobile words start with the words of q.
+
+    Answered from a per-worker in-memory index, without a query per keystroke.
+    """
+    scope = get_request_scope(request)
+    limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_RESULTS))
+
+    if scope.is_admin:
+        rows = dealer_index.search(q, limit=limit, branch_id=branch_id)
+    elif scope.dealer_id is not None:
+        rows = dealer_index.search(q, limit=limit, branch_id=branch_id, dealer_id=scope.dealer_id)
+    else:
+        rows = []
+
+    return BaseResponseSchema.success_response(
+        data=[{**row, 'branch_name': branch_name(row['branch_id'])} for row in rows],
+        message=f"{len(rows)} dealer(s) found"
+    )
+
+
+@router.get('/dealers/batch', response=BaseResponseSchema[DealerBatchSchema])
+def get_dealers_batch(request, ids: str):
+    """Fetch up to BATCH_MAX_IDS dealers by id (?ids=1,2,3) in one query"""
+    scope = get_request_scope(request)
+    try:
+        dealer_ids = parse_id_list(ids, settings.BATCH_MAX_IDS)
+    except ValueError as e:
+        raise HttpError(400, f"Invalid ids: {e}")
+
+    items, missing, forbidden = fetch_by_ids(
+        viewable_dealers(scope), Dealer.objects.filter(is_deleting=False), dealer_ids
+    )
+    return BaseResponseSchema.success_response(
+        data={
+            'items': [serializer.dealer_to_dict(d) for d in items],
+            'missing': missing,
+            'forbidden': forbidden,
+        },
+        message=f"{len(items)} dealer(s) retrieved"
+    )
+
+
 @router.post('/dealers', response=BaseResponseSchema[list[DealerSchema]])
+@idempotent
 def add_dealer(request, data: DealerInSchema):
     """Create a new dealer with associated user account"""
     user = getattr(request, 'user', None)
@@ -411,9 +534,9 @@ def update_dealer(request, dealer_id: int, data: DealerInSchema):
         raise HttpError(400, f"Error updating dealer: {e}")
 
 
-@router.delete('/dealers/{dealer_id}', response=BaseResponseSchema)
+@router.delete('/dealers/{dealer_id}', response={202: BaseResponseSchema[DeletionJobSchema]})
 def delete_dealer(request, dealer_id: int):
-    """Delete a dealer"""
+    """Queue a dealer, its supplies and its user account for background deletion"""
     user = getattr(request, 'user', None)
     if not user or not user.is_authenticated:
         raise HttpError(401, "Unauthorized")
@@ -426,16 +549,13 @@ def delete_dealer(request, dealer_id: int):
             if dealer.created_by != user:
                 raise HttpError(403, "You don't have permission to delete this dealer")
 
-        dealer_name = dealer.name
-        
-        # Delete associated user if exists
-        if dealer.user:
-            dealer.user.delete()
-        
-        dealer.delete()
+        job = DeletionService.active_job(DeletionJob.TARGET_DEALER, dealer.id)
+        if job is None:
+            job = DeletionService.schedule_dealer_deletion(dealer, user)
 
-        return BaseResponseSchema.success_response(
-            message=f"Dealer '{dealer_name}' deleted successfully"
+        return 202, BaseResponseSchema.success_response(
+            data=serializer.deletion_job_to_dict(job),
+            message=f"Dealer '{dealer.name}' scheduled for deletion"
         )
     except Dealer.DoesNotExist:
         raise HttpError(404, "Dealer not found")
@@ -457,92 +577,101 @@ def get_dealer_details(
     page_size: int = 10
 ):
     """Get detailed dealer information with purchase statistics and paginated items"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
+    try:
+        scope = get_request_scope(request)
+    except HttpError:
         return 401, {"status": False, "message": "Unauthorized"}
 
+    # Authorization check: regular users can only view their own dealer profile
+    if not can_view_dealer(scope, dealer_id):
+        return 403, {"status": False, "message": "You don't have permission to view this dealer"}
+
     try:
-        # Get dealer with branch
-        dealer = Dealer.objects.select_related('branch').get(id=dealer_id)
-        
-        # Authorization check
-        if not (user.is_staff or user.is_superuser):
-            # Regular users can only view their own dealer profile
-            if not hasattr(user, 'dealer_profile') or user.dealer_profile != dealer:
-                return 403, {"status": False, "message": "You don't have permission to view this dealer"}
+        def build():
+            dealer = Dealer.objects.get(id=dealer_id, is_deleting=False)
 
-        # Get all supplies for this dealer
-        supplies_qs = ProductSupply.objects.filter(dealer=dealer).select_related('dealer__branch')
+            # Get all supplies for this dealer
+            supplies_qs = ProductSupply.objects.filter(dealer=dealer).select_related('dealer')
         
-        # Calculate product counts by aggregating
-        product_counts = (
-            supplies_qs
-            .values('product_name')
-            .annotate(total=Sum('count'))
-        )
+            # Calculate product counts by aggregating
+            product_counts = (
+                supplies_qs
+                .values('product_name')
+                .annotate(total=Sum('count'))
+            )
         
-        vehicle_count = 0
-        battery_count = 0
-        charger_count = 0
+            vehicle_count = 0
+            battery_count = 0
+            charger_count = 0
         
-        for p in product_counts:
-            name = (p['product_name'] or '').strip().lower()
-            total = p.get('total') or 0
+            for p in product_counts:
+                name = (p['product_name'] or '').strip().lower()
+                total = p.get('total') or 0
             
-            if 'vehicle' in name:
-                vehicle_count += total
-            elif 'battery' in name:
-                battery_count += total
-            elif 'charger' in name:
-                charger_count += total
+                if 'vehicle' in name:
+                    vehicle_count += total
+                elif 'battery' in name:
+                    battery_count += total
+                elif 'charger' in name:
+                    charger_count += total
         
-        # Get paginated purchase items
-        items, pagination = paginate_queryset(
-            supplies_qs.order_by('-created_at'),
-            page=page,
-            page_size=page_size,
-            url_path=f"/api/dealers/{dealer_id}/details"
-        )
+            # Get paginated purchase items
+            items, pagination = paginate_queryset(
+                supplies_qs.order_by('-created_at'),
+                page=page,
+                page_size=page_size,
+                url_path=f"/api/dealers/{dealer_id}/details"
+            )
         
-        # Build dealer details
-        dealer_info = {
-            'id': dealer.id,
-            'name': dealer.name,
-            'mobile_number': dealer.mobile_number,
-            'company_name': dealer.company_name,
-            'email': dealer.email,
-            'address_line1': dealer.address_line1,
-            'address_line2': dealer.address_line2,
-            'pincode': dealer.pincode,
-            'state': dealer.state,
-            'branch_id': dealer.branch.id if dealer.branch else None,
-            'branch_name': dealer.branch.name if dealer.branch else None,
-            'vehicle_count': vehicle_count,
-            'battery_count': battery_count,
-            'charger_count': charger_count,
-            'total_purchases': supplies_qs.count()
-        }
+            # Build dealer details
+            dealer_info = {
+                'id': dealer.id,
+                'name': dealer.name,
+                'mobile_number': dealer.mobile_number,
+                'company_name': dealer.company_name,
+                'email': dealer.email,
+                'address_line1': dealer.address_line1,
+                'address_line2': dealer.address_line2,
+                'pincode': dealer.pincode,
+                'state': dealer.state,
+                'branch_id': dealer.branch_id,
+                'branch_name': branch_name(dealer.branch_id),
+                'vehicle_count': vehicle_count,
+                'battery_count': battery_count,
+                'charger_count': charger_count,
+                'total_purchases': supplies_qs.count()
+            }
         
-        # Build purchase items list
-        purchase_items = [serializer.supply_to_dict(item) for item in items]
+            # Build purchase items list
+            purchase_items = [serializer.supply_to_dict(item) for item in items]
         
-        return 200, {
-            'status': True,
-            'message': 'Dealer details retrieved successfully',
-            'data': {
-                'dealer': dealer_info,
-                'purchases': purchase_items,
-                'pagination': {
-                    'count': pagination.count,
-                    'next': pagination.next,
-                    'previous': pagination.previous,
-                    'page_size': pagination.page_size,
-                    'current_page': pagination.current_page,
-                    'total_pages': pagination.total_pages
+            return {
+                'status': True,
+                'message': 'Dealer details retrieved successfully',
+                'data': {
+                    'dealer': dealer_info,
+                    'purchases': purchase_items,
+                    'pagination': {
+                        'count': pagination.count,
+                        'count_is_exact': pagination.count_is_exact,
+                        'next': pagination.next,
+                        'previous': pagination.previous,
+                        'page_size': pagination.page_size,
+                        'current_page': pagination.current_page,
+                        'total_pages': pagination.total_pages
+                    }
                 }
             }
-        }
         
+
+        data = cached_response(
+            'dealer_details',
+            [dealer_ns(dealer_id), 'branches'],
+            {'dealer_id': dealer_id, 'page': page, 'page_size': page_size},
+            build,
+        )
+        return 200, data
+
     except Dealer.DoesNotExist:
         return 404, {"status": False, "message": "Dealer not found"}
     except Exception as e:
@@ -563,25 +692,10 @@ def list_supplies(
     search: str = None
 ):
     """List product supplies with pagination, branch/dealer filter, and search"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+    scope = get_request_scope(request)
 
     # Determine queryset based on user role
-    if user.is_superuser:
-        supplies_qs = ProductSupply.objects.select_related('dealer', 'dealer__branch').all()
-    elif user.is_staff:
-        supplies_qs = ProductSupply.objects.select_related('dealer', 'dealer__branch').filter(
-            Q(created_by=user)
-        )
-    else:
-        dealer = getattr(user, 'dealer_profile', None)
-        if not dealer:
-            supplies_qs = ProductSupply.objects.none()
-        else:
-            supplies_qs = ProductSupply.objects.select_related('dealer', 'dealer__branch').filter(
-                dealer=dealer
-            )
+    supplies_qs = scoped_queryset(ProductSupply, scope).select_related('dealer')
 
     # Filter by branch if provided
     if branch_id:
@@ -591,8 +705,17 @@ def list_supplies(
     if dealer_id:
         supplies_qs = supplies_qs.filter(dealer_id=dealer_id)
     
-    # Search by dealer name, mobile number, company name, product name, serial number, or invoice number
-    if search:
+    # Search by dealer name, mobile number, company name, product name, serial number, or invoice number.
+    # A numeric term matches dealer mobiles through the digits indexes (a
+    # subquery, not a join-filter), or a serial/invoice number
+    mobile_q = Dealer.mobile_search(search)
+    if mobile_q is not None:
+        supplies_qs = supplies_qs.filter(
+            Q(dealer_id__in=Dealer.objects.filter(mobile_q).values('id')) |
+            Q(serial_number__icontains=search) |
+            Q(invoice_number__icontains=search)
+        )
+    elif search:
         supplies_qs = supplies_qs.filter(
             Q(dealer__name__icontains=search) |
             Q(dealer__mobile_number__icontains=search) |
@@ -602,11 +725,14 @@ def list_supplies(
             Q(invoice_number__icontains=search)
         )
 
+    # Unfiltered superuser lists count the whole table: use the planner estimate
+    filtered = bool(branch_id or dealer_id or search) or not scope.is_superuser
     items, pagination = paginate_queryset(
         supplies_qs,
         page=page,
         page_size=page_size,
-        url_path="/api/supplies"
+        url_path="/api/supplies",
+        count_strategy=cached_count if filtered else estimated_count
     )
 
     return PaginatedResponseSchema.success_response(
@@ -616,7 +742,52 @@ def list_supplies(
     )
 
 
+@router.get('/supplies/batch', response=BaseResponseSchema[SupplyBatchSchema])
+def get_supplies_batch(request, ids: str):
+    """Fetch up to BATCH_MAX_IDS product supplies by id (?ids=1,2,3) in one query"""
+    scope = get_request_scope(request)
+    try:
+        supply_ids = parse_id_list(ids, settings.BATCH_MAX_IDS)
+    except ValueError as e:
+        raise HttpError(400, f"Invalid ids: {e}")
+
+    items, missing, forbidden = fetch_by_ids(
+        scoped_queryset(ProductSupply, scope).select_related('dealer'), ProductSupply.objects.all(), supply_ids
+    )
+    return BaseResponseSchema.success_response(
+        data={
+            'items': [serializer.supply_to_dict(s) for s in items],
+            'missing': missing,
+            'forbidden': forbidden,
+        },
+        message=f"{len(items)} product supply/supplies retrieved"
+    )
+
+
+@router.get('/supplies/by-serial', response=BaseResponseSchema[ProductSupplyResponseSchema])
+def get_supply_by_serial(request, serial_number: str):
+    """Look up a supply by serial number, falling back to the archive"""
+    scope = get_request_scope(request)
+    supply = ProductSupply.objects.select_related('dealer').filter(serial_number=serial_number).first()
+    if supply is None:
+        supply = supply_archive.by_serial(serial_number)
+        if supply is not None:
+            # Archived supplies of a since-deleted dealer are gone with it
+            supply.dealer = Dealer.objects.filter(id=supply.dealer_id, is_deleting=False).first()
+            if supply.dealer is None:
+                supply = None
+    if supply is None:
+        raise HttpError(404, "Product supply not found")
+    if not can_view_supply(scope, supply):
+        raise HttpError(403, "You don't have permission to view this supply")
+    return BaseResponseSchema.success_response(
+        data=serializer.supply_to_dict(supply),
+        message="Product supply retrieved successfully"
+    )
+
+
 @router.post('/supplies', response=BaseResponseSchema[list[ProductSupplyResponseSchema]])
+@idempotent
 def add_supplies(request, data: list[ProductSupplySchema]):
     """Create one or more product supplies with branch validation"""
     user = getattr(request, 'user', None)
@@ -626,6 +797,12 @@ def add_supplies(request, data: list[ProductSupplySchema]):
     try:
         items = data if isinstance(data, list) else [data]
         created_items = []
+        # Each dealer is fetched once however many items reference it
+        dealers = {}
+
+        archived = supply_archive.archived_serials(item.serial_number for item in items)
+        if archived:
+            raise HttpError(400, f"Serial numbers used by archived supplies: {', '.join(sorted(archived)[:20])}")
 
         with transaction.atomic():
             for item in items:
@@ -641,13 +818,15 @@ def add_supplies(request, data: list[ProductSupplySchema]):
 
                 # Verify dealer exists and belongs to the specified branch
                 try:
-                    dealer = Dealer.objects.select_related('branch').get(id=dealer_id)
+                    dealer = dealers.get(dealer_id)
+                    if dealer is None:
+                        dealer = dealers[dealer_id] = Dealer.objects.get(id=dealer_id, is_deleting=False)
                     
                     # Validate branch matches dealer's branch
                     if dealer.branch_id != branch_id:
                         raise HttpError(
                             400, 
-                            f"Dealer '{dealer.name}' belongs to branch '{dealer.branch.name}' "
+                            f"Dealer '{dealer.name}' belongs to branch '{branch_name(dealer.branch_id)}' "
                             f"(ID: {dealer.branch_id}), not the specified branch (ID: {branch_id})"
                         )
                     
@@ -656,12 +835,12 @@ def add_supplies(request, data: list[ProductSupplySchema]):
 
                 # Authorization check
                 if not (user.is_staff or user.is_superuser):
-                    if dealer.user != user:
+                    if dealer.user_id != user.id:
                         raise HttpError(403, f"Not allowed to add supply for dealer '{dealer.name}'")
 
                 # Create supply
                 supply = ProductSupply.objects.create(
-                    dealer_id=dealer_id,
+                    dealer=dealer,
                     created_by=user,
                     **payload
                 )
@@ -680,6 +859,42 @@ def add_supplies(request, data: list[ProductSupplySchema]):
         )
 
 
+@router.post('/supplies/stream')
+def stream_supplies(request):
+    """Create supplies from an NDJSON body (one ProductSupplySchema object per line).
+
+    The body is parsed line by line and committed in chunks; the response is
+    NDJSON too, one progress line per chunk followed by a summary line.
+    """
+    scope = get_request_scope(request)
+    # Ingest everything before responding: a database error then surfaces as a
+    # 500 instead of a cut-off 200, and timing, metrics and profiling cover it.
+    # Only the per-chunk results (at most 50 errors each) are held in memory.
+    results = list(SupplyStreamService.ingest(request, scope, scope.user_id))
+    return HttpResponse(
+        SupplyStreamService.to_ndjson(results),
+        content_type='application/x-ndjson',
+    )
+
+
+@router.post('/supplies/upsert', response=BaseResponseSchema[SupplyUpsertSchema])
+@idempotent
+def upsert_supplies(request, data: list[ProductSupplySchema]):
+    """Insert or update supplies by serial_number, skipping rows that did not change"""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        raise HttpError(401, "Unauthorized")
+    if not (user.is_staff or user.is_superuser):
+        raise HttpError(403, "Forbidden")
+
+    supplies = SupplyUpsertService.build(data, user)
+    counts = SupplyUpsertService.upsert(supplies)
+    return BaseResponseSchema.success_response(
+        data=counts,
+        message=f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged"
+    )
+
+
 @router.put('/supplies/{supply_id}', response=BaseResponseSchema[ProductSupplyResponseSchema])
 def update_supply(request, supply_id: int, data: ProductSupplySchema):
     """Update an existing product supply with branch validation"""
@@ -688,7 +903,7 @@ def update_supply(request, supply_id: int, data: ProductSupplySchema):
         raise HttpError(401, "Unauthorized")
 
     try:
-        supply = ProductSupply.objects.select_related('dealer', 'dealer__branch').get(id=supply_id)
+        supply = ProductSupply.objects.select_related('dealer').get(id=supply_id)
         
         # Authorization check
         if not (user.is_staff or user.is_superuser):
@@ -702,21 +917,24 @@ def update_supply(request, supply_id: int, data: ProductSupplySchema):
         # If dealer is being changed, validate it
         if dealer_id and dealer_id != supply.dealer_id:
             try:
-                dealer = Dealer.objects.select_related('branch').get(id=dealer_id)
+                dealer = Dealer.objects.get(id=dealer_id, is_deleting=False)
                 
                 # Validate branch matches dealer's branch
                 if branch_id and dealer.branch_id != branch_id:
                     raise HttpError(
                         400, 
-                        f"Dealer '{dealer.name}' belongs to branch '{dealer.branch.name}' "
+                        f"Dealer '{dealer.name}' belongs to branch '{branch_name(dealer.branch_id)}' "
                         f"(ID: {dealer.branch_id}), not the specified branch (ID: {branch_id})"
                     )
                 
-                supply.dealer_id = dealer_id
+                supply.dealer = dealer
                 
             except Dealer.DoesNotExist:
                 raise HttpError(404, f"Dealer with ID {dealer_id} not found")
         
+        if payload['serial_number'] != supply.serial_number and supply_archive.archived_serials([payload['serial_number']]):
+            raise HttpError(400, f"Serial number '{payload['serial_number']}' is used by an archived supply")
+
         # Update supply fields
         for field, value in payload.items():
             setattr(supply, field, value)
@@ -748,41 +966,47 @@ def get_dealer_supplies(
     search: str = None
 ):
     """Get all supplies for a specific dealer with pagination"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+    scope = get_request_scope(request)
+
+    # Authorization check
+    if not can_view_dealer(scope, dealer_id):
+        raise HttpError(403, "You don't have permission to view this dealer's supplies")
 
     try:
-        # Verify dealer exists
-        dealer = Dealer.objects.select_related('branch').get(id=dealer_id)
-        
-        # Authorization check
-        if not (user.is_staff or user.is_superuser):
-            if not hasattr(user, 'dealer_profile') or user.dealer_profile != dealer:
-                raise HttpError(403, "You don't have permission to view this dealer's supplies")
+        def build():
+            # Verify dealer exists
+            dealer = Dealer.objects.get(id=dealer_id, is_deleting=False)
 
-        # Get supplies
-        supplies_qs = ProductSupply.objects.filter(dealer=dealer).select_related('dealer__branch')
+            # Get supplies
+            supplies_qs = ProductSupply.objects.filter(dealer=dealer).select_related('dealer')
         
-        # Search if provided
-        if search:
-            supplies_qs = supplies_qs.filter(
-                Q(product_name__icontains=search) |
-                Q(serial_number__icontains=search) |
-                Q(invoice_number__icontains=search)
+            # Search if provided
+            if search:
+                supplies_qs = supplies_qs.filter(
+                    Q(product_name__icontains=search) |
+                    Q(serial_number__icontains=search) |
+                    Q(invoice_number__icontains=search)
+                )
+
+            # Older pages continue into the dealer's archived supplies
+            items, pagination = paginate_queryset(
+                HistoryWithArchive(supplies_qs.order_by('-created_at'), dealer, search),
+                page=page,
+                page_size=page_size,
+                url_path=f"/api/dealers/{dealer_id}/supplies"
             )
 
-        items, pagination = paginate_queryset(
-            supplies_qs.order_by('-created_at'),
-            page=page,
-            page_size=page_size,
-            url_path=f"/api/dealers/{dealer_id}/supplies"
-        )
+            return PaginatedResponseSchema.success_response(
+                data=[serializer.supply_to_dict(s) for s in items],
+                pagination=pagination,
+                message=f"Supplies for dealer '{dealer.name}' retrieved successfully"
+            )
 
-        return PaginatedResponseSchema.success_response(
-            data=[serializer.supply_to_dict(s) for s in items],
-            pagination=pagination,
-            message=f"Supplies for dealer '{dealer.name}' retrieved successfully"
+        return cached_response(
+            'dealer_supplies',
+            [dealer_ns(dealer_id), 'branches'],
+            {'dealer_id': dealer_id, 'page': page, 'page_size': page_size, 'search': search},
+            build,
         )
         
     except Dealer.DoesNotExist:
@@ -823,62 +1047,149 @@ def delete_supply(request, supply_id: int):
 
 
 # ============================================================================
-# Dashboard Endpoint
+# Delta Sync Endpoint
 # ============================================================================
 
-@router.get('/dashboard')
-def dashboard_counts(request):
-    """Get aggregated counts for dashboard"""
-    user = getattr(request, 'user', None)
-    if not user or not user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+@router.get('/sync', response=BaseResponseSchema[SyncSchema])
+def sync_changes(request, cursor: str = None, limit: int = 500):
+    """Dealers and supplies created, updated or deleted since the cursor.
+
+    Omit the cursor for a full sync, then pass back the returned cursor
+    until has_more is false.
+    """
+    scope = get_request_scope(request)
+    limit = min(max(1, limit), settings.SYNC_MAX_PAGE_SIZE)
+
+    changes = collect_changes(scope, cursor, limit)
+
+    return BaseResponseSchema.success_response(
+        data={
+            'dealers': [serializer.dealer_to_dict(d) for d in changes['dealers']],
+            'supplies': [serializer.supply_to_dict(s) for s in changes['supplies']],
+            'deleted': [serializer.tombstone_to_dict(t) for t in changes['deleted']],
+            'cursor': changes['cursor'],
+            'has_more': changes['has_more'],
+        },
+        message="Changes retrieved successfully"
+    )
 
-    try:
-        response = {
-            'vehicle_count': 0,
-            'battery_count': 0,
-            'charger_count': 0,
-        }
 
-        # Determine queryset scope
-        if user.is_superuser:
-            supplies_qs = ProductSupply.objects.all()
-            dealer_count = Dealer.objects.count()
-            branch_count = Branch.objects.count()
-        elif user.is_staff:
-            supplies_qs = ProductSupply.objects.filter(Q(created_by=user))
-            dealer_count = Dealer.objects.filter(Q(created_by=user)).count()
-            branch_count = Branch.objects.filter(Q(created_by=user)).count()
-        else:
-            dealer = getattr(user, 'dealer_profile', None)
-            if not dealer:
-                supplies_qs = ProductSupply.objects.none()
-                dealer_count = 0
-                branch_count = 0
-            else:
-                supplies_qs = ProductSupply.objects.filter(dealer=dealer)
-                dealer_count = 1
-                branch_count = 1
-
-        # Aggregate product counts
-        product_counts = (
-            supplies_qs
-            .values('product_name')
-            .annotate(total=Sum('count'))
-            .order_by('-total')
+# ============================================================================
+# Dashboard Endpoint
+# ============================================================================
+
+DASHBOARD_GROUPS = {
+    'branch': ('dealer__branch_id', 'dealer__branch__name'),
+    'dealer': ('dealer_id', 'dealer__name'),
+}
+
+
+def dashboard_breakdown(scope, group_by, top):
+    """Per-branch or per-dealer product and dealer counts in one grouped aggregate"""
+    id_field, name_field = DASHBOARD_GROUPS[group_by]
+    rows = list(
+        scoped_queryset(ProductSupply, scope)
+        # Same product names as the totals (trimmed, case-insensitive)
+        .alias(product=PeriodTotalsService.product_key())
+        .values(id_field, name_field)
+        .annotate(
+            vehicle_count=Sum('count', filter=Q(product='vehicle'), default=0),
+            battery_count=Sum('count', filter=Q(product='battery'), default=0),
+            charger_count=Sum('count', filter=Q(product='charger'), default=0),
+            dealer_count=Count('dealer_id', distinct=True),
+            total_count=Sum('count', default=0),
         )
+        .order_by('-total_count', id_field)[:top + 1]
+    )
+    return {
+        'group_by': group_by,
+        'groups': [
+            {
+                'id': row.pop(id_field),
+                'name': row.pop(name_field),
+                **row,
+            }
+            for row in rows[:top]
+        ],
+        'truncated': len(rows) > top,
+    }
+
+
+def dashboard_totals(scope):
+    """Overall product, dealer and branch counts for a scope"""
+    response = {
+        'vehicle_count': 0,
+        'battery_count': 0,
+        'charger_count': 0,
+    }
+
+    # Determine queryset scope
+    supplies_qs = scoped_queryset(ProductSupply, scope)
+    if scope.is_admin:
+        dealer_count = scoped_queryset(Dealer, scope).count()
+        branch_count = scoped_queryset(Branch, scope).count()
+    elif scope.dealer_id is not None:
+        dealer_count = 1
+        branch_count = 1
+    else:
+        dealer_count = 0
+        branch_count = 0
+
+    # Aggregate product counts
+    product_counts = (
+        supplies_qs
+        .values(product=PeriodTotalsService.product_key())
+        .annotate(total=Sum('count'))
+        .order_by('-total')
+    )
+
+    for p in product_counts:
+        name = p['product'] or ''
+        total = p.get('total') or 0
+        key = f"{name}_count"
+        response[key] = total
 
-        for p in product_counts:
-            name = (p['product_name'] or '').strip().lower()
-            total = p.get('total') or 0
-            key = f"{name}_count"
-            response[key] = total
+    response.update({
+        'dealer_count': dealer_count,
+        'branch_count': branch_count,
+    })
+    return response
 
-        response.update({
-            'dealer_count': dealer_count,
-            'branch_count': branch_count,
-        })
 
+@router.get('/dashboard')
+def dashboard_counts(request, group_by: str = None, top: int = 20):
+    """Get aggregated counts for dashboard, optionally broken down per branch or dealer"""
+    scope = get_request_scope(request)
+
+    if group_by is not None:
+        if group_by not in DASHBOARD_GROUPS:
+            raise HttpError(400, f"group_by must be one of: {', '.join(DASHBOARD_GROUPS)}")
+        top = max(1, min(top, settings.DASHBOARD_MAX_GROUPS))
+        try:
+            data = cached_response(
+                'dashboard_breakdown',
+                scope_namespaces(scope),
+                {'scope': scope.cache_key, 'group_by': group_by, 'top': top},
+                lambda: dashboard_breakdown(scope, group_by, top),
+            )
+            return {
+                'status': True,
+                'message': 'Dashboard breakdown fetched successfully',
+                'data': data
+            }
+        except Exception as e:
+            return {
+                'status': False,
+                'message': f'Error fetching dashboard breakdown: {str(e)}',
+            }
+
+    try:
+        response = cached_response(
+            'dashboard_counts',
+            scope_namespaces(scope),
+            {'scope': scope.cache_key},
+            lambda: dashboard_totals(scope),
+        )
         return {
             'status': True,
             'message': 'Dashboard counts fetched successfully',
@@ -888,4 +1199,121 @@ def dashboard_counts(request):
         return {
             'status': False,
             'message': f'Error fetching dashboard counts: {str(e)}',
-        }
\ No newline at end of file
+        }
+
+
+# ============================================================================
+# Leaderboard Endpoint
+# ============================================================================
+
+@router.get('/leaderboard', response=BaseResponseSchema[LeaderboardSchema])
+def dealer_leaderboard(request, product: str = 'vehicle', period: str = None, branch_id: int = None, top: int = 10):
+    """Top dealers by supplied count of a product in a quarter, from the maintained totals"""
+    scope = get_request_scope(request)
+    if not scope.is_admin:
+        raise HttpError(403, "Forbidden")
+
+    period = period or PeriodTotalsService.current_period()
+    try:
+        PeriodTotalsService.period_range(period)
+    except ValueError:
+        raise HttpError(400, "period must look like 2025-Q3")
+    product = product.strip().lower()
+    top = max(1, min(top, settings.DASHBOARD_MAX_GROUPS))
+
+    totals = DealerPeriodTotal.objects.filter(period=period, product=product, dealer__is_deleting=False)
+    if branch_id:
+        totals = totals.filter(branch_id=branch_id)
+    if not scope.is_superuser:
+        totals = totals.filter(dealer__created_by_id=scope.user_id)
+    rows = totals.order_by('-total', 'dealer_id').values('dealer_id', 'dealer__name', 'branch_id', 'total')[:top]
+
+    return BaseResponseSchema.success_response(
+        data={
+            'period': period,
+            'product': product,
+            'branch_id': branch_id,
+            'entries': [
+                {
+                    'rank': rank,
+                    'dealer_id': row['dealer_id'],
+                    'dealer_name': row['dealer__name'],
+                    'branch_id': row['branch_id'],
+                    'total': row['total'],
+                }
+                for rank, row in enumerate(rows, start=1)
+            ],
+        },
+        message="Leaderboard retrieved successfully"
+    )
+
+
+# ============================================================================
+# Component Lookup Endpoints
+# ============================================================================
+
+@router.get('/components/lookup', response=PaginatedResponseSchema[list[ComponentMatchSchema]])
+def lookup_component(request, value: str, kind: str = None, page: int = 1, page_size: int = 50):
+    """Find the supplies carrying a chassis, battery, charger, motor or controller number"""
+    scope = get_request_scope(request)
+    if kind and kind not in SupplyComponent.KIND_FIELDS:
+        raise HttpError(400, f"kind must be one of: {', '.join(SupplyComponent.KIND_FIELDS)}")
+    value = SupplyComponent.normalize(value)
+    if not value:
+        raise HttpError(400, "value is required")
+
+    conditions = {'value': value, **({'kind': kind} if kind else {})}
+    components = SupplyComponent.objects.filter(**conditions)
+
+    # One indexed join for the caller's matches, one grouped count over everyone's
+    matches = (
+        scoped_queryset(ProductSupply, scope)
+        .filter(**{f'components__{field}': v for field, v in conditions.items()})
+        .annotate(component_kind=F('components__kind'))
+        .select_related('dealer')
+        .order_by('-created_at')
+    )
+    counts = dict(components.values_list('kind').annotate(n=Count('id')).order_by())
+
+    items, pagination = paginate_queryset(
+        matches,
+        page=page,
+        page_size=page_size,
+        url_path=f"/api/components/lookup?{urlencode(conditions)}"
+    )
+    return PaginatedResponseSchema.success_response(
+        data=[
+            {
+                'kind': supply.component_kind,
+                'value': value,
+                'supply_count': counts.get(supply.component_kind, 1),
+                'duplicate': counts.get(supply.component_kind, 1) > 1,
+                'supply': serializer.supply_to_dict(supply),
+            }
+            for supply in items
+        ],
+        pagination=pagination,
+        message="Component lookup completed"
+    )
+
+
+@router.get('/components/duplicates', response=PaginatedResponseSchema[list[ComponentDuplicateSchema]])
+def list_duplicate_components(request, kind: str = None, page: int = 1, page_size: int = 50):
+    """Component numbers recorded on more than one supply (superusers only)"""
+    scope = get_request_scope(request)
+    if not scope.is_superuser:
+        raise HttpError(403, "Forbidden")
+    if kind and kind not in SupplyComponent.KIND_FIELDS:
+        raise HttpError(400, f"kind must be one of: {', '.join(SupplyComponent.KIND_FIELDS)}")
+
+    items, pagination = paginate_queryset(
+        SupplyComponentService.duplicated(kind),
+        page=page,
+        page_size=page_size,
+        url_path="/api/components/duplicates"
+    )
+    return PaginatedResponseSchema.success_response(
+        data=list(items),
+        pagination=pagination,
+        message="Duplicate components retrieved successfully"
+    )
@@ -0,0 +1,307 @@
+import contextvars
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import ProductSupply
+
+# Rows per gzip member; a lookup decompresses one member, not the segment
+BLOCK_ROWS = 200
+# Rows per segment file before the next one is started
+SEGMENT_ROWS = 100_000
+
+FIELDS = ProductSupply._meta.concrete_fields
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS supplies (
+    id INTEGER PRIMARY KEY,
+    serial_number TEXT NOT NULL,
+    dealer_id INTEGER NOT NULL,
+    created_by_id INTEGER,
+    created_at TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    invoice_number TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    block_offset INTEGER NOT NULL,
+    block_length INTEGER NOT NULL,
+    -- What the supply adds to dealer_period_totals (PeriodTotalsService)
+    period TEXT NOT NULL,
+    product TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS supplies_serial ON supplies (serial_number);
+CREATE INDEX IF NOT EXISTS supplies_dealer ON supplies (dealer_id, created_at DESC, id DESC);
+"""
+
+_archiving = contextvars.ContextVar('archiving', default=False)
+
+
+@contextmanager
+def archiving():
+    """Deletes inside this block move supplies to the archive: the signal
+    receivers skip sync tombstones and period total refreshes"""
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def is_archiving():
+    return _archiving.get()
+
+
+def _json_default(value):
+    # Full precision, unlike DjangoJSONEncoder which drops microseconds
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def period_of(day):
+    # Same as PeriodTotalsService.period_of, whose module imports this one
+    return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+
+
+def sortable_time(value):
+    """created_at as fixed-width UTC text, so the index orders it as a string"""
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+def like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class SupplyArchive:
+    """Append-only store of archived supplies under SUPPLY_ARCHIVE_DIR.
+
+    ``segments/*.ndjson.gz`` hold one JSON object per supply, written as
+    concatenated gzip members of BLOCK_ROWS lines (so ``zcat`` reads a whole
+    segment). ``index.sqlite3`` maps each supply id to its member's offset
+    and length, with the serial number, dealer, creator and search columns.
+    Re-archiving an id points the index at the new copy; segments are never
+    rewritten. Readers use one read-only SQLite connection per thread.
+    """
+
+    def __init__(self, root=None):
+        self._root = root
+        self._local = threading.local()
+
+    @cached_property
+    def root(self):
+        return Path(self._root or settings.SUPPLY_ARCHIVE_DIR)
+
+    def reset(self):
+        """Forget the directory and this thread's index connection (tests
+        pointing SUPPLY_ARCHIVE_DIR elsewhere)"""
+        self.__dict__.pop('root', None)
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    @property
+    def index_path(self):
+        return self.root / 'index.sqlite3'
+
+    def _reader(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            if not self.index_path.exists():
+                return None
+            db = self._local.db = sqlite3.connect(f'file:{self.index_path}?mode=ro', uri=True)
+        return db
+
+    def _query(self, sql, params=()):
+        db = self._reader()
+        if db is None:
+            return []
+        return db.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Writing (manage.py archive_supplies)
+    # ------------------------------------------------------------------
+
+    def writer(self):
+        (self.root / 'segments').mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.index_path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(INDEX_SCHEMA)
+        return db
+
+    def append(self, db, segment, rows):
+        """Write ``rows`` (dicts of ProductSupply attnames) to a segment and
+        index them. The segment is fsynced before the index commits, so an
+        indexed row is always readable."""
+        path = self.root / 'segments' / segment
+        entries = []
+        with open(path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            for start in range(0, len(rows), BLOCK_ROWS):
+                block = rows[start:start + BLOCK_ROWS]
+                data = gzip.compress(b''.join(
+                    json.dumps(row, default=_json_default, separators=(',', ':')).encode() + b'\n'
+                    for row in block
+                ))
+                offset = f.tell()
+                f.write(data)
+                entries.extend(
+                    (
+                        row['id'], row['serial_number'], row['dealer_id'], row['created_by_id'],
+                        sortable_time(row['created_at']), row['product_name'], row['invoice_number'],
+                        segment, offset, len(data),
+                        period_of(row['purchase_date'] or timezone.localdate(row['created_at'])),
+                        row['product_name'].strip().lower(), row['count'],
+                    )
+                    for row in block
+                )
+            f.flush()
+            os.fsync(f.fileno())
+        with db:
+            db.executemany('INSERT OR REPLACE INTO supplies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', entries)
+        return len(entries)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _load(self, entries):
+        """ProductSupply objects (unsaved, ``is_archived`` set) for index rows
+        (id, segment, offset, length), in the order given"""
+        wanted = {}
+        for supply_id, segment, offset, length in entries:
+            wanted.setdefault((segment, offset, length), set()).add(supply_id)
+        found = {}
+        for (segment, offset, length), ids in wanted.items():
+            with open(self.root / 'segments' / segment, 'rb') as f:
+                f.seek(offset)
+                data = gzip.decompress(f.read(length))
+            for line in data.splitlines():
+                record = json.loads(line)
+                if record['id'] in ids:
+                    found[record['id']] = self.to_supply(record)
+        return [found[entry[0]] for entry in entries if entry[0] in found]
+
+    @staticmethod
+    def to_supply(record):
+        supply = ProductSupply(**{field.attname: field.to_python(record.get(field.attname)) for field in FIELDS})
+        supply.is_archived = True
+        return supply
+
+    def by_serial(self, serial_number):
+        """The archived supply with this serial number, or None"""
+        rows = self._query(
+            'SELECT id, segment, block_offset, block_length FROM supplies WHERE serial_number = ? ORDER BY id DESC LIMIT 1',
+            (serial_number,),
+        )
+        supplies = self._load(rows)
+        return supplies[0] if supplies else None
+
+    def archived_serials(self, serial_numbers):
+        """Which of these serial numbers belong to archived supplies; they stay
+        reserved, so creating or renaming a supply to one of them is refused"""
+        serial_numbers = list(set(serial_numbers))
+        found = set()
+        for start in range(0, len(serial_numbers), 500):
+            chunk = serial_numbers[start:start + 500]
+            found.update(row[0] for row in self._query(
+                f"SELECT DISTINCT serial_number FROM supplies WHERE serial_number IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ))
+        return found
+
+    def period_totals(self, dealer_ids, periods=None):
+        """(dealer_id, period, product, total) of the archived supplies of these
+        dealers, optionally limited to some periods"""
+        dealer_ids, periods = list(set(dealer_ids)), list(set(periods or ()))
+        rows = []
+        for start in range(0, len(dealer_ids), 500):
+            chunk = dealer_ids[start:start + 500]
+            sql = f"dealer_id IN ({', '.join('?' * len(chunk))})"
+            if periods:
+                sql += f" AND period IN ({', '.join('?' * len(periods))})"
+            rows += self._query(
+                f'SELECT dealer_id, period, product, sum(count) FROM supplies WHERE {sql} '
+                f'GROUP BY dealer_id, period, product',
+                chunk + periods,
+            )
+        return rows
+
+    def _dealer_filter(self, dealer_id, search):
+        sql = 'dealer_id = ?'
+        params = [dealer_id]
+        if search:
+            sql += " AND (product_name LIKE ? ESCAPE '\\' OR serial_number LIKE ? ESCAPE '\\' OR invoice_number LIKE ? ESCAPE '\\')"
+            params += [like_pattern(search)] * 3
+        return sql, params
+
+    def dealer_count(self, dealer_id, search=None):
+        sql, params = self._dealer_filter(dealer_id, search)
+        rows = self._query(f'SELECT count(*) FROM supplies WHERE {sql}', params)
+        return rows[0][0] if rows else 0
+
+    def dealer_supplies(self, dealer_id, offset, limit, search=None):
+        """A dealer's archived supplies, newest first"""
+        sql, params = self._dealer_filter(dealer_id, search)
+        return self._load(self._query(
+            f'SELECT id, segment, block_offset, block_length FROM supplies WHERE {sql} '
+            f'ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+            params + [limit, offset],
+        ))
+
+
+class HistoryWithArchive:
+    """A dealer's supplies queryset (ordered newest first) followed by the
+    dealer's archived supplies, which are all older. Sliceable and
+    countable, so it can be handed to paginate_queryset."""
+
+    def __init__(self, queryset, dealer, search=None):
+        self.queryset = queryset
+        self.dealer = dealer
+        self.search = search
+
+    @cached_property
+    def hot_count(self):
+        return self.queryset.count()
+
+    def count(self):
+        return self.hot_count + supply_archive.dealer_count(self.dealer.id, self.search)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("HistoryWithArchive only supports slicing")
+        start, stop = index.start or 0, index.stop
+        items = list(self.queryset[start:stop]) if start < self.hot_count else []
+        missing = stop - start - len(items)
+        if missing > 0:
+            archived = supply_archive.dealer_supplies(
+                self.dealer.id, max(0, start - self.hot_count), missing, self.search
+            )
+            for supply in archived:
+                supply.dealer = self.dealer
+            items += archived
+        return items
+
+
+supply_archive = SupplyArchive()
+
+
+@receiver(setting_changed)
+def archive_dir_changed(setting, **kwargs):
+    if setting == 'SUPPLY_ARCHIVE_DIR':
+        supply_archive.reset()
@@ -1,31 +1,75 @@
 from ninja.security import HttpBearer
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 from typing import Optional
+import logging
+
+from .invalidation import LocalCache
+from .scope import Scope
+from .timing import timing_phase
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Tokens with scope claims skip loading the user, so each worker remembers
+# whether a user id still exists and is active. Saving or deleting a user
+# evicts it in every worker through the invalidation bus (core/invalidation.py)
+_active_users = LocalCache('user')
+
+
+def user_is_active(user_id) -> bool:
+    """Whether the user exists and is active, from the worker's cache when fresh"""
+    found = _active_users.get_many([user_id])
+    if user_id in found:
+        return found[user_id]
+    generation = _active_users.generation
+    active = User.objects.filter(id=user_id, is_active=True).exists()
+    _active_users.set_many({user_id: active}, generation)
+    return active
+
 def get_auth_class():
     """Returns the appropriate auth class based on settings"""
     if settings.API_AUTHENTICATION_ENABLED:
-        print("Authentication is ENABLED, using JWTAuth")
+        logger.info("Authentication is ENABLED, using JWTAuth")
         return JWTAuth
     else:
-        print("Authentication is DISABLED, using NoAuth")
+        logger.info("Authentication is DISABLED, using NoAuth")
         return None  # Return None to disable authentication completely
 
+
+def get_tokens_for_user(user) -> RefreshToken:
+    """Issue a refresh token (and its access token) carrying the user's scope claims"""
+    refresh = RefreshToken.for_user(user)
+    Scope.from_user(user).add_to_token(refresh)
+    return refresh
+
+
 class JWTAuth(HttpBearer):
     def authenticate(self, request, token):
         if not token:
             return None
 
         try:
-            validated = AccessToken(token)
-            user_id = validated['user_id']
-            request.user = User.objects.get(id=user_id)
+            with timing_phase(request, 'auth'):
+                validated = AccessToken(token)
+                user_id = validated['user_id']
+                scope = Scope.from_token(validated)
+                if scope is None:
+                    # Token issued before scope claims existed
+                    user = User.objects.get(id=user_id, is_active=True)
+                    scope = Scope.from_user(user)
+                    request.user = user
+                elif not user_is_active(scope.user_id):
+                    return None
+                else:
+                    # Only endpoints that need the full user row pay for the lookup
+                    request.user = SimpleLazyObject(lambda: User.objects.get(id=user_id))
+                request.scope = scope
             return True
         except Exception as e:
-            print(f"Authentication error: {str(e)}")  # For debugging
+            logger.debug("Authentication error: %s", e)
             return None
@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .invalidation import listener_live, subscribe
+from .models import Dealer
+
+WORD = re.compile(r'\w+')
+
+# Fields copied into the index; also what a suggestion returns
+FIELDS = ('id', 'name', 'company_name', 'mobile_number', 'branch_id')
+
+
+def words(text):
+    return WORD.findall((text or '').casefold())
+
+
+def dealer_tokens(row):
+    """Words of the name and company, the mobile's digits and its last ten
+    digits (so a number typed without the country code still matches)"""
+    tokens = set(words(row['name'])) | set(words(row['company_name']))
+    digits = Dealer.normalize_mobile(row['mobile_number'])
+    if digits:
+        tokens.update((digits, digits[-10:]))
+    return tokens
+
+
+class DealerIndex:
+    """Per-worker prefix index over every dealer not queued for deletion.
+
+    ``keys`` is a sorted array of (token, dealer_id), so the dealers having a
+    token that starts with a prefix are one bisect plus a walk of the
+    matching run. Dealer writes arrive through the invalidation bus and only
+    mark ids dirty; the next lookup reloads those rows with one query. The
+    whole index is reloaded after LOCAL_CACHE_MAX_AGE, or after
+    LOCAL_CACHE_FALLBACK_TTL while the bus is not running.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.tokens = {}
+        self.keys = []
+        self.dirty = set()
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        subscribe('dealer', self)
+
+    def evict(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self.loaded_at = None
+            else:
+                self.dirty.update(keys)
+
+    def _stale(self):
+        if self.loaded_at is None:
+            return True
+        max_age = settings.LOCAL_CACHE_MAX_AGE if listener_live() else settings.LOCAL_CACHE_FALLBACK_TTL
+        return time.monotonic() - self.loaded_at > max_age
+
+    def _queryset(self):
+        return Dealer.objects.filter(is_deleting=False).order_by().values(*FIELDS)
+
+    def refresh(self):
+        """Bring the index up to date: a full load when stale, else reload dirty ids"""
+        if self._stale():
+            with self._lock:
+                # Evictions from here on land in dirty and are applied next time
+                self.dirty = set()
+                started = time.monotonic()
+            rows = {row['id']: row for row in self._queryset()}
+            tokens = {dealer_id: dealer_tokens(row) for dealer_id, row in rows.items()}
+            keys = sorted((token, dealer_id) for dealer_id, row_tokens in tokens.items() for token in row_tokens)
+            with self._lock:
+                self.rows, self.tokens, self.keys = rows, tokens, keys
+                self.loaded_at = started
+            return
+
+        with self._lock:
+            dirty, self.dirty = self.dirty, set()
+        if not dirty:
+            return
+        fresh = {row['id']: row for row in self._queryset().filter(id__in=dirty)}
+        with self._lock:
+            for dealer_id in dirty:
+                self._remove(dealer_id)
+                if dealer_id in fresh:
+                    self._add(fresh[dealer_id])
+
+    def _add(self, row):
+        row_tokens = dealer_tokens(row)
+        self.rows[row['id']] = row
+        self.tokens[row['id']] = row_tokens
+        for token in row_tokens:
+            insort(self.keys, (token, row['id']))
+
+    def _remove(self, dealer_id):
+        for token in self.tokens.pop(dealer_id, ()):
+            position = bisect_left(self.keys, (token, dealer_id))
+            if position < len(self.keys) and self.keys[position] == (token, dealer_id):
+                del self.keys[position]
+        self.rows.pop(dealer_id, None)
+
+    def search(self, query, limit=10, branch_id=None, dealer_id=None):
+        """Dealers with, for every word of the query, a token starting with it.
+
+        Ordered by the token matching the first word. ``dealer_id`` limits the
+        search to that one dealer (dealer users); ``branch_id`` to a branch.
+        """
+        query_words = words(query)
+        if not query_words:
+            return []
+        self.refresh()
+
+        def matches(candidate, remaining):
+            row_tokens = self.tokens[candidate]
+            return all(any(t.startswith(word) for t in row_tokens) for word in remaining)
+
+        first, rest = query_words[0], query_words[1:]
+        results = []
+        seen = set()
+        with self._lock:
+            if dealer_id is not None:
+                row = self.rows.get(dealer_id)
+                if row is None or (branch_id is not None and row['branch_id'] != branch_id):
+                    return []
+                return [row] if matches(dealer_id, query_words) else []
+
+            position = bisect_left(self.keys, (first,))
+            while position < len(self.keys) and len(results) < limit:
+                token, candidate = self.keys[position]
+                if not token.startswith(first):
+                    break
+                position += 1
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                row = self.rows[candidate]
+                if branch_id is not None and row['branch_id'] != branch_id:
+                    continue
+                if matches(candidate, rest):
+                    results.append(row)
+        return results
+
+
+dealer_index = DealerIndex()
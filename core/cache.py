@@ -0,0 +1,132 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from prometheus_client import Counter
+
+from .on_commit import on_commit_merged
+
+RESPONSE_CACHE = Counter(
+    'api_response_cache_total',
+    'Versioned response cache lookups by endpoint and result (hit/miss)',
+    ['endpoint', 'result'],
+)
+
+
+# ============================================================================
+# Version namespaces
+# ============================================================================
+#
+# A cached response is keyed by the current version of every namespace it was
+# built from. Writes bump those versions (signals.py), so invalidation is one
+# cache.set per namespace and stale entries simply stop being read until
+# they expire. Versions and responses live in the 'responses' cache, which
+# must be shared by every worker and by management commands. Namespaces:
+#   dealer:<id>    the dealer row and its supplies
+#   branch:<id>    the dealers of a branch
+#   creator:<id>   rows created by a staff user (their scope)
+#   dealers, branches, supplies   any row of that table
+
+def dealer_ns(dealer_id):
+    return f'dealer:{dealer_id}'
+
+
+def branch_ns(branch_id):
+    return f'branch:{branch_id}'
+
+
+def creator_ns(user_id):
+    return f'creator:{user_id}'
+
+
+def scope_namespaces(scope):
+    """Namespaces covering everything scoped_queryset can return for a scope"""
+    if scope.is_superuser:
+        return ['dealers', 'branches', 'supplies']
+    if scope.is_staff:
+        return [creator_ns(scope.user_id), 'dealers', 'branches']
+    return [dealer_ns(scope.dealer_id)]
+
+
+def response_cache():
+    return caches['responses']
+
+
+def _version_key(namespace):
+    return f'ver:{namespace}'
+
+
+def _new_version():
+    # Random rather than incremented: never repeats an evicted version, and
+    # two processes bumping at once cannot both write the same value
+    return uuid.uuid4().hex
+
+
+def get_versions(namespaces):
+    """Current version of each namespace, created when missing"""
+    cache = response_cache()
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(namespaces):
+    response_cache().set_many({_version_key(namespace): _new_version() for namespace in set(namespaces)}, None)
+
+
+class _PendingBumps:
+    """on_commit callback collecting the namespaces a transaction touched"""
+
+    def __init__(self, namespaces):
+        self.namespaces = namespaces
+
+    def merge(self, other):
+        self.namespaces |= other.namespaces
+
+    def __call__(self):
+        bump(self.namespaces)
+
+
+def invalidate(*namespaces):
+    """Bump namespaces once the current transaction commits (immediately outside one).
+
+    Bumping before commit would let a concurrent read cache the old rows
+    under the new version.
+    """
+    on_commit_merged(_PendingBumps(set(namespaces)))
+
+
+# ============================================================================
+# Response cache
+# ============================================================================
+
+def cached_response(endpoint, namespaces, params, build):
+    """Return build() cached under the current versions of namespaces.
+
+    params must identify everything else the response depends on (page,
+    filters, ...). Results are kept for RESPONSE_CACHE_TTL seconds at most;
+    a replayed response envelope gets the current timestamp.
+    """
+    cache = response_cache()
+    versions = get_versions(namespaces)
+    fingerprint = json.dumps([params, namespaces, versions], sort_keys=True, default=str)
+    key = f'resp:{endpoint}:{hashlib.sha1(fingerprint.encode()).hexdigest()}'
+
+    data = cache.get(key)
+    if data is not None:
+        RESPONSE_CACHE.labels(endpoint, 'hit').inc()
+        if isinstance(data, dict) and 'timestamp' in data:
+            data = {**data, 'timestamp': datetime.now()}
+        return data
+
+    RESPONSE_CACHE.labels(endpoint, 'miss').inc()
+    data = build()
+    cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+    return data
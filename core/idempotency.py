@@ -0,0 +1,120 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from .models import IdempotencyKey
+from .scope import get_request_scope
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def request_hash(request) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def succeeded(response) -> bool:
+    """2xx and not a BaseResponseSchema.error_response body"""
+    if not 200 <= response.status_code < 300 or response.streaming:
+        return False
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        return True
+    return not (isinstance(body, dict) and body.get('success') is False)
+
+
+def idempotent(view):
+    """Honour an Idempotency-Key header on a write endpoint.
+
+    The first request with a key claims it; IdempotencyMiddleware stores the
+    rendered response once it is known. A retry with the same key and body
+    gets that stored response back without running the view again. Only 2xx
+    responses whose body is not ``"success": false`` are kept, so a request
+    that failed can simply be retried. A claim left without a response for
+    IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS (a worker killed mid-request) is taken
+    over by the next retry.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            raise HttpError(400, f"{HEADER} must be at most 255 characters")
+
+        scope = get_request_scope(request)
+        fingerprint = request_hash(request)
+        now = timezone.now()
+
+        record = IdempotencyKey.objects.filter(user_id=scope.user_id, key=key, expires_at__gt=now).first()
+        if record is not None:
+            if record.request_hash != fingerprint:
+                raise HttpError(422, f"{HEADER} was already used for a different request")
+            if record.status_code is None:
+                stale = now - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)
+                # created_at doubles as the claim time; only one retry wins the update
+                taken = IdempotencyKey.objects.filter(
+                    id=record.id, status_code__isnull=True, created_at=record.created_at, created_at__lt=stale,
+                ).update(created_at=now)
+                if not taken:
+                    raise HttpError(409, "A request with this idempotency key is still in progress")
+                record.created_at = now
+                request.idempotency_key = record
+                return view(request, *args, **kwargs)
+            response = HttpResponse(record.response, status=record.status_code, content_type=record.content_type)
+            response[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.filter(user_id=scope.user_id, key=key, expires_at__lte=now).delete()
+                record = IdempotencyKey.objects.create(
+                    user_id=scope.user_id,
+                    key=key,
+                    request_hash=fingerprint,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+                )
+        except IntegrityError:
+            # A concurrent retry claimed the key first
+            raise HttpError(409, "A request with this idempotency key is still in progress")
+
+        request.idempotency_key = record
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class IdempotencyMiddleware:
+    """Save the final response for requests whose key was claimed by @idempotent"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        record = getattr(request, 'idempotency_key', None)
+        if record is None:
+            return response
+
+        # A claim taken over after IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS is no longer ours
+        claim = IdempotencyKey.objects.filter(id=record.id, created_at=record.created_at)
+        if succeeded(response):
+            claim.update(
+                status_code=response.status_code,
+                content_type=response.get('Content-Type', ''),
+                response=response.content.decode(response.charset or 'utf-8'),
+            )
+        else:
+            claim.delete()
+        return response
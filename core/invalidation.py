@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from prometheus_client import Counter, Gauge, Histogram
+
+from .on_commit import on_commit_merged
+
+logger = logging.getLogger(__name__)
+
+# Every worker LISTENs on this channel; publish() NOTIFYs it on commit
+CHANNEL = 'cache_invalidation'
+
+# NOTIFY payloads are limited to 8000 bytes
+MAX_KEYS_PER_MESSAGE = 500
+
+# Seconds without a notification before the listener pings its connection
+KEEPALIVE_INTERVAL = 30
+
+INVALIDATIONS = Counter(
+    'local_cache_invalidations_total',
+    'Invalidation messages received from other workers, by entity',
+    ['entity'],
+)
+LAG = Histogram(
+    'local_cache_invalidation_lag_seconds',
+    'Time from a commit in one worker to the eviction in another',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+LISTENING = Gauge(
+    'local_cache_listeners',
+    'Workers currently listening for cache invalidations',
+    multiprocess_mode='livesum',
+)
+
+
+def origin():
+    """Identifies this worker, so it can skip its own messages"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ============================================================================
+# Local caches
+# ============================================================================
+
+_registry = {}
+
+
+def subscribe(entity, subscriber):
+    """Have subscriber.evict(keys) called for every invalidation of entity
+    in this worker (keys is None when all of them changed)"""
+    _registry.setdefault(entity, []).append(subscriber)
+
+
+def listener_live():
+    """Whether this worker currently receives other workers' invalidations"""
+    _listener.ensure_started()
+    return _listener.is_live()
+
+
+class LocalCache:
+    """In-process cache of one entity's rows by primary key (e.g. branch names).
+
+    Writes to the entity are broadcast by the invalidation bus and evicted in
+    every worker. When the bus is not running (SQLite, INVALIDATION_BUS_ENABLED
+    off, listener reconnecting) entries expire after ``ttl`` seconds instead.
+    """
+
+    def __init__(self, entity, ttl=None):
+        self.entity = entity
+        self.ttl = ttl
+        self.generation = 0
+        self._data = {}
+        self._lock = threading.Lock()
+        subscribe(entity, self)
+
+    def max_age(self):
+        if _listener.is_live():
+            return settings.LOCAL_CACHE_MAX_AGE
+        return self.ttl if self.ttl is not None else settings.LOCAL_CACHE_FALLBACK_TTL
+
+    def get_many(self, keys):
+        """{key: value} of the keys that are cached and fresh"""
+        _listener.ensure_started()
+        oldest = time.monotonic() - self.max_age()
+        found = {}
+        for key in keys:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] >= oldest:
+                found[key] = entry[0]
+        return found
+
+    def set_many(self, mapping, generation=None):
+        """Store values loaded from the database.
+
+        Pass the ``generation`` read before loading them: if an eviction
+        arrived in between, the values may predate it and are dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, value in mapping.items():
+                self._data[key] = (value, now)
+
+    def evict(self, keys=None):
+        """Drop the given keys, or everything when keys is None"""
+        with self._lock:
+            self.generation += 1
+            if keys is None:
+                self._data.clear()
+            else:
+                for key in keys:
+                    self._data.pop(key, None)
+
+
+def evict(entity, keys=None):
+    for subscriber in _registry.get(entity, ()):
+        subscriber.evict(keys)
+
+
+def evict_all():
+    for subscribers in _registry.values():
+        for subscriber in subscribers:
+            subscriber.evict()
+
+
+# ============================================================================
+# Publishing
+# ============================================================================
+
+def bus_available():
+    return getattr(settings, 'INVALIDATION_BUS_ENABLED', False) and connection.vendor == 'postgresql'
+
+
+class _PendingMessages:
+    """on_commit callback collecting the entity keys a transaction touched"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def add(self, entity, keys):
+        if keys is None or self.keys.get(entity, set()) is None:
+            self.keys[entity] = None
+        else:
+            self.keys.setdefault(entity, set()).update(keys)
+
+    def merge(self, other):
+        for entity, keys in other.keys.items():
+            self.add(entity, keys)
+
+    def __call__(self):
+        for entity, keys in self.keys.items():
+            evict(entity, keys)
+        if bus_available():
+            send(self.keys)
+
+
+def send(keys_by_entity):
+    """NOTIFY the other workers; keys are split so each payload stays under the limit"""
+    sent_at = time.time()
+    messages = []
+    for entity, keys in keys_by_entity.items():
+        keys = None if keys is None else sorted(keys)
+        if keys is None:
+            messages.append({'e': entity, 'k': None})
+            continue
+        for start in range(0, len(keys), MAX_KEYS_PER_MESSAGE):
+            messages.append({'e': entity, 'k': keys[start:start + MAX_KEYS_PER_MESSAGE]})
+
+    with connection.cursor() as cursor:
+        for message in messages:
+            message.update(t=sent_at, o=origin())
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(message)])
+
+
+def publish(entity, *keys):
+    """Evict these primary keys of entity in every worker once the current
+    transaction commits (immediately outside one); no keys evicts them all.
+
+    NOTIFY is itself transactional, but sending after commit also keeps a
+    rolled-back write from evicting anything.
+    """
+    pending = _PendingMessages()
+    pending.add(entity, keys or None)
+    on_commit_merged(pending)
+
+
+# ============================================================================
+# Listening
+# ============================================================================
+
+def receive(payload):
+    message = json.loads(payload)
+    if message.get('o') == origin():
+        # Already evicted locally when the transaction committed
+        return
+    evict(message['e'], message['k'])
+    INVALIDATIONS.labels(message['e']).inc()
+    # Across hosts this includes clock skew between them
+    LAG.observe(max(0.0, time.time() - message['t']))
+
+
+class _Listener:
+    """Background thread holding a dedicated connection that LISTENs on CHANNEL.
+
+    Started on first use in each process, so every gunicorn worker gets its
+    own after the fork. On connection loss it reconnects with backoff and clears
+    every local cache, since notifications sent meanwhile are lost.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.live = False
+        self._lock = threading.Lock()
+
+    def is_live(self):
+        return self.live and self.pid == os.getpid()
+
+    def ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.live = False
+            if bus_available():
+                threading.Thread(target=self.run, name='cache-invalidation', daemon=True).start()
+
+    def run(self):
+        backoff = 1
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception("Cache invalidation listener lost its connection")
+            if self.live:
+                self.live = False
+                LISTENING.dec()
+                backoff = 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def listen(self):
+        db = connections[DEFAULT_DB_ALIAS]
+        raw = db.get_new_connection(db.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            evict_all()
+            self.live = True
+            LISTENING.inc()
+
+            while True:
+                if not select.select([raw], [], [], KEEPALIVE_INTERVAL)[0]:
+                    with raw.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notify = raw.notifies.pop(0)
+                    try:
+                        receive(notify.payload)
+                    except (ValueError, KeyError):
+                        logger.warning("Ignoring malformed invalidation message %r", notify.payload)
+        finally:
+            raw.close()
+
+
+_listener = _Listener()
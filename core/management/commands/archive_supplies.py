@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.services.archive_service import SupplyArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move supplies older than SUPPLY_ARCHIVE_AFTER_DAYS to compressed segment files in SUPPLY_ARCHIVE_DIR"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.SUPPLY_ARCHIVE_AFTER_DAYS,
+            help="Archive supplies created more than this many days ago",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Supplies archived per transaction")
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many supplies would move")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            cutoff = SupplyArchiveService.cutoff(options['older_than_days'])
+            count = SupplyArchiveService.candidates(cutoff).count()
+            self.stdout.write(f"{count} supplies created before {cutoff:%Y-%m-%d} would be archived")
+            return
+        count = SupplyArchiveService.archive(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} supplies"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.services.supply_component_service import SupplyComponentService
+
+
+class Command(BaseCommand):
+    help = "Build the supply_components reverse index from product_supplies, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Supplies indexed per transaction")
+        parser.add_argument('--start-id', type=int, default=0, help="Resume after this supply id")
+
+    def handle(self, *args, **options):
+        count = SupplyComponentService.backfill(
+            batch_size=options['batch_size'], start_id=options['start_id'], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(f"Indexed components of {count} supplies"))
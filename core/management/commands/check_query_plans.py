@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Branch, Dealer, ProductSupply
+from core.query_plans import check_plans, endpoint_cases
+from core.scope import Scope
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the main query of each endpoint and fail if a plan falls back to a "
+        "sequential scan over a table larger than --max-seq-rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Seed this many supplies (plus dealers/branches) in a transaction that is rolled back afterwards",
+        )
+        parser.add_argument('--max-seq-rows', type=int, default=1000)
+        parser.add_argument('--show-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f"Plan checks are not supported on {connection.vendor}")
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            results = check_plans(self.cases(), options['max_seq_rows'])
+            transaction.set_rollback(True)
+
+        failures = []
+        for result in results:
+            status = 'FAIL' if result.seq_scans else 'ok'
+            self.stdout.write(f"{status:4} {result.name}")
+            if options['show_plans'] or result.seq_scans:
+                self.stdout.write(f"     {result.plan}")
+            for table, rows in result.seq_scans:
+                failures.append(f"{result.name}: sequential scan on {table} ({rows} rows)")
+
+        if failures:
+            raise CommandError("Query plan regressions:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} query plan(s) OK"))
+
+    def cases(self):
+        staff_id = (
+            ProductSupply.objects.exclude(created_by=None)
+            .values_list('created_by_id', flat=True).first()
+        ) or 0
+        dealer_id = ProductSupply.objects.values_list('dealer_id', flat=True).first() or 0
+        branch_id = Branch.objects.values_list('id', flat=True).first() or 0
+        return endpoint_cases(
+            superuser=Scope(user_id=0, is_superuser=True),
+            staff=Scope(user_id=staff_id, is_staff=True),
+            dealer=Scope(user_id=0, dealer_id=dealer_id),
+            branch_id=branch_id,
+        )
+
+    def seed(self, count):
+        """Spread supplies over a realistic number of staff, branches and dealers"""
+        staff = [
+            User.objects.create_user(username=f'plan-staff-{i}', email=f'plan-staff-{i}@example.com', is_staff=True)
+            for i in range(5)
+        ]
+        branches = Branch.objects.bulk_create(
+            Branch(name=f'Plan Branch {i}', created_by=staff[i % len(staff)]) for i in range(20)
+        )
+        # bulk_create skips save(), which normally fills the digit columns
+        dealers = Dealer.objects.bulk_create(
+            Dealer(
+                name=f'Plan Dealer {i}',
+                mobile_number=f'9{i:09d}',
+                mobile_digits=f'9{i:09d}',
+                mobile_digits_reversed=f'9{i:09d}'[::-1],
+                address_line1='-',
+                branch=branches[i % len(branches)],
+                created_by=staff[i % len(staff)],
+            )
+            for i in range(max(1, count // 50))
+        )
+        ProductSupply.objects.bulk_create(
+            (
+                ProductSupply(
+                    dealer=dealers[i % len(dealers)],
+                    product_name=('Vehicle', 'Battery', 'Charger')[i % 3],
+                    invoice_number=f'PLAN-INV-{i // 10}',
+                    serial_number=f'PLAN-SN-{i}',
+                    created_by=staff[i % len(staff)],
+                )
+                for i in range(count)
+            ),
+            batch_size=1000,
+        )
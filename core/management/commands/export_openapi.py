@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Build the OpenAPI document once and write it to OPENAPI_SCHEMA_FILE for workers to load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path-prefix', default='/api/')
+        parser.add_argument('--output', default=None, help="Defaults to settings.OPENAPI_SCHEMA_FILE")
+
+    def handle(self, *args, **options):
+        from dealer_project.urls import api
+
+        destination = Path(options['output'] or settings.OPENAPI_SCHEMA_FILE)
+        document = api.export_openapi(options['path_prefix'], destination)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {destination} ({len(document.content)} bytes, ETag {document.etag})"
+        ))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.partition_service import SupplyPartitionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert product_supplies to monthly range partitions on created_at while it stays in use "
+        "(PostgreSQL 13+); with --ensure, create upcoming partitions of the converted table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ensure', action='store_true',
+            help="Only create partitions up to --months-ahead months from now (run daily from cron)",
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.SUPPLY_PARTITION_MONTHS_AHEAD,
+            help="Months of partitions to create ahead of today",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Supply ids copied per transaction")
+        parser.add_argument('--start-id', type=int, default=0, help="Resume the copy after this supply id")
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds to sleep between chunks")
+        parser.add_argument('--no-swap', action='store_true', help="Stop after the copy; run again to swap")
+
+    def handle(self, *args, **options):
+        SupplyPartitionService.check_backend()
+        if options['ensure']:
+            if not SupplyPartitionService.is_partitioned():
+                raise CommandError("product_supplies is not partitioned yet; run without --ensure first")
+            created = SupplyPartitionService.ensure_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions {' '.join(created)}"))
+            return
+
+        SupplyPartitionService.prepare(options['months_ahead'], log=self.stdout.write)
+        copied = SupplyPartitionService.copy(
+            chunk_size=options['chunk_size'],
+            start_id=options['start_id'],
+            pause=options['pause'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(f"Copied {copied} rows")
+        removed = SupplyPartitionService.reconcile(
+            chunk_size=options['chunk_size'], pause=options['pause'], log=self.stdout.write,
+        )
+        self.stdout.write(f"Removed {removed} stale rows")
+        if options['no_swap']:
+            self.stdout.write("Mirror trigger left in place; run again (with --start-id to skip the copy) to swap")
+            return
+        SupplyPartitionService.swap(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            "Done. Check the application, then DROP TABLE product_supplies_unpartitioned"
+        ))
@@ -0,0 +1,88 @@
+import inspect
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_SNIPPET = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Report worker startup cost: import time per module (python -X importtime "
+        "in a fresh interpreter) and build time per Ninja/pydantic schema"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Number of modules/schemas to list")
+
+    def handle(self, *args, **options):
+        top = options['top']
+        self.report_imports(top)
+        self.report_schemas(top)
+
+    def report_imports(self, top):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'dealer_project.settings'))
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_SNIPPET],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode != 0:
+            raise CommandError(f"Startup import failed:\n{proc.stderr[-2000:]}")
+
+        modules = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+        by_package = defaultdict(int)
+        for name, self_us, _ in modules:
+            by_package[name.split('.')[0]] += self_us
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Interpreter start to URLconf loaded: {wall_ms:.0f} ms ({len(modules)} modules)"
+        ))
+        self.stdout.write("Top packages by self time:")
+        for package, self_us in sorted(by_package.items(), key=lambda p: -p[1])[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package}")
+        self.stdout.write("Top modules by cumulative time:")
+        for name, _, cumulative_us in sorted(modules, key=lambda m: -m[2])[:top]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    def report_schemas(self, top):
+        from ninja import NinjaAPI, Schema
+        from core import schemas
+        from dealer_project.urls import api
+
+        timings = []
+        for name, schema in inspect.getmembers(schemas, inspect.isclass):
+            if issubclass(schema, Schema) and schema.__module__ == schemas.__name__:
+                started = time.perf_counter()
+                schema.model_json_schema()
+                timings.append(((time.perf_counter() - started) * 1000, name))
+
+        # Bypass the per-process document cache to time a real build
+        started = time.perf_counter()
+        NinjaAPI.get_openapi_schema(api, path_prefix='/api/')
+        openapi_ms = (time.perf_counter() - started) * 1000
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Schema builds: {sum(t for t, _ in timings):.1f} ms for {len(timings)} schemas, "
+            f"OpenAPI document {openapi_ms:.1f} ms"
+        ))
+        for ms, name in sorted(timings, reverse=True)[:top]:
+            self.stdout.write(f"  {ms:8.2f} ms  {name}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.services.period_totals_service import PeriodTotalsService
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-dealer quarterly totals behind the leaderboard from product_supplies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Dealers recomputed per transaction")
+
+    def handle(self, *args, **options):
+        count = PeriodTotalsService.rebuild(batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt period totals for {count} dealer(s)"))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.services.deletion_service import DeletionService
+
+
+class Command(BaseCommand):
+    help = "Run pending dealer/branch deletion jobs and resume jobs interrupted by a worker restart"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=5,
+            help="Treat running jobs without progress for this long as abandoned",
+        )
+
+    def handle(self, *args, **options):
+        job_ids = DeletionService.resume_jobs(stale_after=timedelta(minutes=options['stale_minutes']))
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(job_ids)} deletion job(s)"))
@@ -0,0 +1,92 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .timing import API_PREFIX
+
+# Under gunicorn every worker writes its samples to files in
+# PROMETHEUS_MULTIPROC_DIR (see deployments/gunicorn.conf.py) and metrics_view
+# merges them, so a scrape sees the whole server rather than whichever worker
+# answered. Without that variable (runserver) the in-process registry is used.
+REQUESTS = Counter(
+    'api_requests_total',
+    'API requests by route, method and status code',
+    ['route', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'API request latency by route and method',
+    ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUERIES = Histogram(
+    'api_db_queries',
+    'SQL queries per API request by route and method',
+    ['route', 'method'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def route_label(request):
+    """URL pattern (e.g. api/core/supplies/<int:supply_id>) rather than the raw path,
+    so ids don't explode the label set"""
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Record count, latency, query count and status of every /api/ request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', False)
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith(API_PREFIX):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        route = route_label(request)
+        REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+        LATENCY.labels(route, request.method).observe(elapsed)
+        QUERIES.labels(route, request.method).observe(counter.count)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text format, for a scraper on the same host only"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    # Behind nginx on a unix socket REMOTE_ADDR is empty; proxy_params sets X-Real-IP
+    client = request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR') or ''
+    if client not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,31 @@
+from django.contrib.postgres import operations
+from django.db import migrations
+
+
+def _concurrent(schema_editor, model):
+    """Postgres can build the index concurrently: not on SQLite, and not on
+    a partitioned table (product_supplies after partition_supplies)"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        row = cursor.fetchone()
+    return not row or row[0] != 'p'
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY where Postgres allows it, a plain CREATE INDEX
+    otherwise. Like Django's, it needs a migration with ``atomic = False``."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if _concurrent(schema_editor, model):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if _concurrent(schema_editor, model):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
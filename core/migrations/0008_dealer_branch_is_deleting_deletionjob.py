@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_alter_adminuser_options_alter_branch_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='is_deleting',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='dealer',
+            name='is_deleting',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('target_type', models.CharField(choices=[('dealer', 'Dealer'), ('branch', 'Branch')], max_length=20)),
+                ('target_id', models.BigIntegerField()),
+                ('target_name', models.CharField(blank=True, max_length=150)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_supplies', models.PositiveIntegerField(default=0)),
+                ('deleted_supplies', models.PositiveIntegerField(default=0)),
+                ('deleted_dealers', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_deletion_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'deletion_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='deletion_jo_status_5af366_idx'), models.Index(fields=['target_type', 'target_id'], name='deletion_jo_target__07e548_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_dealer_branch_is_deleting_deletionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('dealer', 'Dealer'), ('supply', 'Product Supply')], max_length=20)),
+                ('entity_id', models.BigIntegerField()),
+                ('dealer_id', models.BigIntegerField(blank=True, null=True)),
+                ('creator_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'tombstones',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dealer',
+            index=models.Index(fields=['updated_at', 'id'], name='dealers_updated_eaab67_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productsupply',
+            index=models.Index(fields=['updated_at', 'id'], name='product_sup_updated_15a6a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstones_deleted_e79d8d_idx'),
+        ),
+    ]
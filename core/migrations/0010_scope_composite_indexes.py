@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction; it builds the
+    # indexes without blocking writes to the large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_sync_indexes_tombstone'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='branch',
+            index=models.Index(fields=['created_by', 'name'], name='branches_created_f7e7c8_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='dealer',
+            index=models.Index(fields=['created_by', '-created_at'], name='dealers_created_da7464_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='productsupply',
+            index=models.Index(fields=['created_by', '-created_at'], name='product_sup_created_443e4b_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='productsupply',
+            index=models.Index(fields=['-created_at'], name='product_sup_created_337b30_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='role',
+            index=models.Index(fields=['created_by', 'name'], name='roles_created_9bd848_idx'),
+        ),
+    ]
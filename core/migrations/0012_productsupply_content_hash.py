@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsupply',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
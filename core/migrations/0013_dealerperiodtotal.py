@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_productsupply_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerPeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('branch_id', models.BigIntegerField()),
+                ('period', models.CharField(max_length=7)),
+                ('product', models.CharField(max_length=150)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dealer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_totals', to='core.dealer')),
+            ],
+            options={
+                'db_table': 'dealer_period_totals',
+                'indexes': [models.Index(fields=['period', 'product', '-total'], name='dealer_peri_period_3a7ce8_idx'), models.Index(fields=['period', 'product', 'branch_id', '-total'], name='dealer_peri_period_e1e6e4_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dealer', 'period', 'product'), name='dealer_period_product_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:37
+
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_mobile_digits(apps, schema_editor):
+    Dealer = apps.get_model('core', 'Dealer')
+    last_id = 0
+    while True:
+        batch = list(
+            Dealer.objects.filter(id__gt=last_id).order_by('id').only('id', 'mobile_number')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for dealer in batch:
+            dealer.mobile_digits = re.sub(r'\D', '', dealer.mobile_number or '')[:20]
+            dealer.mobile_digits_reversed = dealer.mobile_digits[::-1]
+        Dealer.objects.bulk_update(batch, ['mobile_digits', 'mobile_digits_reversed'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_dealerperiodtotal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealer',
+            name='mobile_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='dealer',
+            name='mobile_digits_reversed',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        # Fill before indexing so the indexes are built once
+        migrations.RunPython(backfill_mobile_digits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dealer',
+            index=models.Index(fields=['mobile_digits'], name='dealers_mobile__242b1a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dealer',
+            index=models.Index(fields=['mobile_digits_reversed'], name='dealers_mobile__b6a910_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_dealer_mobile_digits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplyComponent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('chassis', 'Chassis'), ('battery', 'Battery'), ('charger', 'Charger'), ('motor', 'Motor'), ('controller', 'Controller')], max_length=20)),
+                ('value', models.CharField(max_length=150)),
+                ('supply', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='components', to='core.productsupply')),
+            ],
+            options={
+                'db_table': 'supply_components',
+                'indexes': [models.Index(fields=['value', 'kind'], name='supply_comp_value_0c5f59_idx')],
+                'constraints': [models.UniqueConstraint(fields=('supply', 'kind'), name='supply_component_kind_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_supplycomponent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supplycomponent',
+            name='supply',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='components', to='core.productsupply'),
+        ),
+    ]
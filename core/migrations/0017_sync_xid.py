@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+TABLES = ('dealers', 'product_supplies', 'tombstones')
+
+STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION sync_stamp() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- partition_supplies sets sync.keep_xid while copying rows between tables
+    IF current_setting('sync.keep_xid', true) IS DISTINCT FROM 'on' THEN
+        NEW.sync_xid := txid_current();
+    END IF;
+    RETURN NEW;
+END $$;
+"""
+
+
+def create_stamp_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(STAMP_FUNCTION)
+    for table in TABLES:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}')
+        schema_editor.execute(
+            f'CREATE TRIGGER {table}_sync_stamp BEFORE INSERT OR UPDATE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION sync_stamp()'
+        )
+
+
+def drop_stamp_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}')
+    schema_editor.execute('DROP FUNCTION IF EXISTS sync_stamp()')
+
+
+class Migration(migrations.Migration):
+    # Concurrent index builds; existing rows get sync_xid 0 without a rewrite
+    atomic = False
+
+    dependencies = [
+        ('core', '0016_supplycomponent_supply_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealer',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productsupply',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name='dealer',
+            index=models.Index(fields=['sync_xid', 'id'], name='dealers_sync_xi_13c626_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='productsupply',
+            index=models.Index(fields=['sync_xid', 'id'], name='product_sup_sync_xi_6cec6c_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tombstone',
+            index=models.Index(fields=['sync_xid', 'id'], name='tombstones_sync_xi_1eecd8_idx'),
+        ),
+        migrations.RunPython(create_stamp_triggers, drop_stamp_triggers),
+    ]
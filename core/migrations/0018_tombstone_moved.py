@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sync_xid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='moved',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import hashlib
+import json
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
@@ -20,6 +24,9 @@ class Role(models.Model):
     class Meta:
         db_table = 'roles'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['created_by', 'name']),
+        ]
 
     def __str__(self):
         return self.name
@@ -30,6 +37,7 @@ class Branch(models.Model):
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=150)
     address = models.TextField(blank=True)
+    is_deleting = models.BooleanField(default=False)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         null=True,
@@ -43,6 +51,9 @@ class Branch(models.Model):
     class Meta:
         db_table = 'branches'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['created_by', 'name']),
+        ]
         verbose_name_plural = 'Branches'
 
     def __str__(self):
@@ -99,6 +110,7 @@ class Dealer(models.Model):
         on_delete=models.SET_NULL,
         related_name='dealer_profile'
     )
+    is_deleting = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(
@@ -108,6 +120,16 @@ class Dealer(models.Model):
         on_delete=models.SET_NULL,
         related_name='created_dealers'
     )
+    # Digits of mobile_number, forwards and reversed, so a search for the
+    # first or last digits is a range scan on an index (see mobile_search)
+    mobile_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
+    mobile_digits_reversed = models.CharField(max_length=20, blank=True, default='', editable=False)
+    # Id of the last transaction that wrote the row (trigger, Postgres only); delta
+    # sync orders by it so a long transaction cannot commit behind a cursor
+    sync_xid = models.BigIntegerField(default=0, editable=False)
+
+    # Search terms made only of these characters are treated as phone numbers
+    NUMERIC_SEARCH = re.compile(r'[\d\s+()-]+')
 
     class Meta:
         db_table = 'dealers'
@@ -115,11 +137,53 @@ class Dealer(models.Model):
         indexes = [
             models.Index(fields=['branch', '-created_at']),
             models.Index(fields=['mobile_number']),
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['sync_xid', 'id']),
+            models.Index(fields=['created_by', '-created_at']),
+            models.Index(fields=['mobile_digits']),
+            models.Index(fields=['mobile_digits_reversed']),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.mobile_number})"
 
+    @staticmethod
+    def normalize_mobile(value):
+        """Digits only: '+91 98765-43210' -> '919876543210'"""
+        return re.sub(r'\D', '', value or '')[:20]
+
+    @staticmethod
+    def _digits_prefix(field, digits):
+        """Q for values of a digits-only field starting with digits, as a range
+        (>= '4329' and < '433') so it is an index range scan on any backend and
+        collation, unlike LIKE"""
+        upper = digits.rstrip('9')
+        if not upper:
+            return models.Q(**{f'{field}__gte': digits})
+        upper = upper[:-1] + str(int(upper[-1]) + 1)
+        return models.Q(**{f'{field}__gte': digits, f'{field}__lt': upper})
+
+    @classmethod
+    def mobile_search(cls, term, prefix=''):
+        """Q matching numbers that start or end with a numeric term's digits,
+        or None when the term is not numeric. ``prefix`` is the path to the
+        dealer, e.g. 'dealer__' from ProductSupply."""
+        digits = cls.normalize_mobile(term)
+        if not digits or not cls.NUMERIC_SEARCH.fullmatch(term):
+            return None
+        return (
+            cls._digits_prefix(f'{prefix}mobile_digits', digits)
+            | cls._digits_prefix(f'{prefix}mobile_digits_reversed', digits[::-1])
+        )
+
+    def save(self, *args, **kwargs):
+        self.mobile_digits = self.normalize_mobile(self.mobile_number)
+        self.mobile_digits_reversed = self.mobile_digits[::-1]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'mobile_number' in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'mobile_digits', 'mobile_digits_reversed']
+        super().save(*args, **kwargs)
+
 
 class ProductSupply(models.Model):
     """Product supply model for tracking vehicle and component supplies"""
@@ -171,6 +235,20 @@ class ProductSupply(models.Model):
         on_delete=models.SET_NULL,
         related_name='created_supplies'
     )
+    # sha256 of CONTENT_FIELDS; lets bulk upserts skip rows that did not change
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    # Id of the last transaction that wrote the row (trigger, Postgres only); delta
+    # sync orders by it so a long transaction cannot commit behind a cursor
+    sync_xid = models.BigIntegerField(default=0, editable=False)
+
+    # Fields a client sends; everything else is bookkeeping
+    CONTENT_FIELDS = (
+        'dealer_id', 'product_name', 'invoice_number', 'serial_number', 'purchase_date', 'count',
+        'chase_number', 'vehicle_model', 'vehicle_variant', 'vehicle_warranty', 'controller', 'motor',
+        'battery_number', 'battery_model', 'battery_variant', 'battery_warranty', 'bulging_warranty',
+        'charger_number', 'charger_model', 'charger_type', 'charger_variant', 'charger_warranty',
+        'remarks',
+    )
 
     class Meta:
         db_table = 'product_supplies'
@@ -179,8 +257,236 @@ class ProductSupply(models.Model):
             models.Index(fields=['dealer', '-created_at']),
             models.Index(fields=['serial_number']),
             models.Index(fields=['product_name']),
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['sync_xid', 'id']),
+            models.Index(fields=['created_by', '-created_at']),
+            # Unfiltered and branch-filtered lists walk this in order and stop at the page
+            models.Index(fields=['-created_at']),
         ]
         verbose_name_plural = 'Product Supplies'
 
     def __str__(self):
-        return f"{self.product_name} - {self.serial_number}"
\ No newline at end of file
+        return f"{self.product_name} - {self.serial_number}"
+
+    def compute_content_hash(self):
+        values = [getattr(self, field) for field in self.CONTENT_FIELDS]
+        return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'content_hash']
+        super().save(*args, **kwargs)
+
+
+class DeletionJob(models.Model):
+    """Background job that deletes a dealer or branch in bounded batches"""
+    TARGET_DEALER = 'dealer'
+    TARGET_BRANCH = 'branch'
+    TARGET_CHOICES = [
+        (TARGET_DEALER, 'Dealer'),
+        (TARGET_BRANCH, 'Branch'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    target_type = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    target_name = models.CharField(max_length=150, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_supplies = models.PositiveIntegerField(default=0)
+    deleted_supplies = models.PositiveIntegerField(default=0)
+    deleted_dealers = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='created_deletion_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'deletion_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+            models.Index(fields=['target_type', 'target_id']),
+        ]
+
+    def __str__(self):
+        return f"Delete {self.target_type} {self.target_id} ({self.status})"
+
+
+class Tombstone(models.Model):
+    """Marker left behind by a deleted dealer or supply for delta sync clients"""
+    ENTITY_DEALER = 'dealer'
+    ENTITY_SUPPLY = 'supply'
+    ENTITY_CHOICES = [
+        (ENTITY_DEALER, 'Dealer'),
+        (ENTITY_SUPPLY, 'Product Supply'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    # Scope columns copied from the deleted row, so sync can filter without joins
+    dealer_id = models.BigIntegerField(blank=True, null=True)
+    creator_id = models.BigIntegerField(blank=True, null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    # The supply still exists but moved to another dealer: only clients scoped
+    # to the old dealer drop it
+    moved = models.BooleanField(default=False)
+    # Id of the last transaction that wrote the row (trigger, Postgres only); delta
+    # sync orders by it so a long transaction cannot commit behind a cursor
+    sync_xid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        db_table = 'tombstones'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+            models.Index(fields=['sync_xid', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.entity_id} deleted at {self.deleted_at}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a write request, replayed when the client retries with the same key"""
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body: a reused key with a different request is rejected
+    request_hash = models.CharField(max_length=64)
+    # Null while the first request is still being processed
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    response = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
+
+
+class DealerPeriodTotal(models.Model):
+    """Per-dealer, per-quarter, per-product supply count, maintained from the ledger.
+
+    Rows are recomputed from product_supplies after every committed write
+    (see PeriodTotalsService), so leaderboards read this small table through
+    an index instead of grouping the whole ledger.
+    """
+    id = models.BigAutoField(primary_key=True)
+    dealer = models.ForeignKey(
+        Dealer,
+        on_delete=models.CASCADE,
+        related_name='period_totals'
+    )
+    # Copied from the dealer so a branch leaderboard is one index range
+    branch_id = models.BigIntegerField()
+    # Quarter of purchase_date (created_at when missing), e.g. "2026-Q3"
+    period = models.CharField(max_length=7)
+    # Lower-cased, trimmed product_name: vehicle, battery, charger, ...
+    product = models.CharField(max_length=150)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dealer_period_totals'
+        constraints = [
+            models.UniqueConstraint(fields=['dealer', 'period', 'product'], name='dealer_period_product_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'product', '-total']),
+            models.Index(fields=['period', 'product', 'branch_id', '-total']),
+        ]
+
+    def __str__(self):
+        return f"{self.dealer_id} {self.period} {self.product}: {self.total}"
+
+
+class SupplyComponent(models.Model):
+    """One component identifier of a supply (chassis, battery, charger, motor, controller).
+
+    A reverse index over ProductSupply's component columns, which have no
+    indexes of their own, so finding the supply that holds battery X is one
+    index lookup. Kept in step by SupplyComponentService.
+    """
+    KIND_CHASSIS = 'chassis'
+    KIND_BATTERY = 'battery'
+    KIND_CHARGER = 'charger'
+    KIND_MOTOR = 'motor'
+    KIND_CONTROLLER = 'controller'
+    KIND_CHOICES = [
+        (KIND_CHASSIS, 'Chassis'),
+        (KIND_BATTERY, 'Battery'),
+        (KIND_CHARGER, 'Charger'),
+        (KIND_MOTOR, 'Motor'),
+        (KIND_CONTROLLER, 'Controller'),
+    ]
+    # ProductSupply column each kind is read from
+    KIND_FIELDS = {
+        KIND_CHASSIS: 'chase_number',
+        KIND_BATTERY: 'battery_number',
+        KIND_CHARGER: 'charger_number',
+        KIND_MOTOR: 'motor',
+        KIND_CONTROLLER: 'controller',
+    }
+
+    id = models.BigAutoField(primary_key=True)
+    # No database constraint: product_supplies may be partitioned, and its
+    # primary key is then (id, created_at). The cascade runs in Django.
+    supply = models.ForeignKey(
+        ProductSupply,
+        on_delete=models.CASCADE,
+        related_name='components',
+        db_constraint=False
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Trimmed and upper-cased, see normalize()
+    value = models.CharField(max_length=150)
+
+    class Meta:
+        db_table = 'supply_components'
+        constraints = [
+            models.UniqueConstraint(fields=['supply', 'kind'], name='supply_component_kind_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['value', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.value} (supply {self.supply_id})"
+
+    @staticmethod
+    def normalize(value):
+        return (value or '').strip().upper()
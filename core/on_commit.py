@@ -0,0 +1,35 @@
+from django.db import connection, transaction
+
+
+def on_commit_merged(callback, robust=False):
+    """Run callback once the current transaction commits (immediately outside one).
+
+    Within a transaction, at most one callback of each class is queued per
+    savepoint. Later ones are folded into it with ``queued.merge(callback)``,
+    so a transaction writing many rows still runs a single callback. The
+    queued callbacks are tracked on the connection, next to the
+    run_on_commit list they were added to. Django starts a new list on
+    commit, rollback and savepoint rollback, and the tracking starts over
+    with it.
+    """
+    if not connection.in_atomic_block:
+        transaction.on_commit(callback, robust=robust)
+        return
+    pending = getattr(connection, 'pending_on_commit', None)
+    if pending is None or pending[0] is not connection.run_on_commit:
+        pending = connection.pending_on_commit = (connection.run_on_commit, {})
+    key = (type(callback), tuple(connection.savepoint_ids))
+    queued = pending[1].get(key)
+    if queued is not None:
+        queued.merge(callback)
+        return
+    pending[1][key] = callback
+
+    def run():
+        # Callbacks can run without Django replacing the list (tests capturing
+        # on_commit callbacks); later writes then queue a fresh one
+        pending[1].pop(key, None)
+        callback()
+
+    run.__qualname__ = type(callback).__qualname__
+    transaction.on_commit(run, robust=robust)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import path
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from ninja import NinjaAPI
+from ninja.responses import NinjaJSONEncoder
+
+# Source trees whose changes invalidate a prebuilt schema file
+SOURCE_DIRS = ('core', 'dealer_project')
+
+
+def code_version() -> str:
+    """APP_VERSION from the environment, else a digest of the source files' size and mtime"""
+    version = os.environ.get('APP_VERSION')
+    if version:
+        return version
+
+    digest = hashlib.sha1()
+    for directory in SOURCE_DIRS:
+        for source in sorted(Path(settings.BASE_DIR, directory).rglob('*.py')):
+            stat = source.stat()
+            digest.update(f"{source}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+class OpenAPIDocument:
+    """Serialized OpenAPI schema with its ETag"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+    @classmethod
+    def from_schema(cls, schema) -> 'OpenAPIDocument':
+        return cls(json.dumps(schema, cls=NinjaJSONEncoder).encode())
+
+
+class CachedSchemaNinjaAPI(NinjaAPI):
+    """NinjaAPI that builds its OpenAPI document once per process.
+
+    The document is loaded from OPENAPI_SCHEMA_FILE (written by the
+    export_openapi command) when that file was built for the running code
+    version, otherwise generated on first use. /openapi.json is served from
+    memory with an ETag so clients can revalidate with a 304.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._documents = {}
+
+    def get_openapi_schema(self, *, path_prefix=None, path_params=None):
+        return json.loads(self.get_openapi_document(path_prefix=path_prefix, path_params=path_params).content)
+
+    def get_openapi_document(self, *, path_prefix=None, path_params=None) -> OpenAPIDocument:
+        if path_prefix is None:
+            path_prefix = self.get_root_path(path_params or {})
+        document = self._documents.get(path_prefix)
+        if document is None:
+            document = self._load_prebuilt(path_prefix) or OpenAPIDocument.from_schema(
+                super().get_openapi_schema(path_prefix=path_prefix)
+            )
+            self._documents[path_prefix] = document
+        return document
+
+    def export_openapi(self, path_prefix: str, destination: Path) -> OpenAPIDocument:
+        """Build the document and write it with the code version it belongs to"""
+        document = OpenAPIDocument.from_schema(super().get_openapi_schema(path_prefix=path_prefix))
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text(json.dumps({
+            'version': code_version(),
+            'path_prefix': path_prefix,
+            'schema': json.loads(document.content),
+        }))
+        self._documents[path_prefix] = document
+        return document
+
+    def _load_prebuilt(self, path_prefix):
+        schema_file = getattr(settings, 'OPENAPI_SCHEMA_FILE', None)
+        if not schema_file or not Path(schema_file).exists():
+            return None
+        try:
+            prebuilt = json.loads(Path(schema_file).read_text())
+        except (OSError, ValueError):
+            return None
+        if prebuilt.get('version') != code_version() or prebuilt.get('path_prefix') != path_prefix:
+            return None
+        return OpenAPIDocument.from_schema(prebuilt['schema'])
+
+    def _get_urls(self):
+        urls = super()._get_urls()
+        if not self.openapi_url:
+            return urls
+
+        view = partial(cached_openapi_json, api=self)
+        if self.docs_decorator:
+            view = self.docs_decorator(view)
+        return [
+            path(self.openapi_url.lstrip('/'), view, name='openapi-json')
+            if getattr(url, 'name', None) == 'openapi-json' else url
+            for url in urls
+        ]
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match is a list of ETags or ``*``, compared weakly (RFC 9110 13.1.2)"""
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
+
+
+def cached_openapi_json(request, api: CachedSchemaNinjaAPI, **kwargs):
+    """Serve the cached OpenAPI document, answering 304 when the ETag matches"""
+    document = api.get_openapi_document(path_params=kwargs)
+    if etag_matches(document.etag, request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(document.content, content_type='application/json')
+    response['ETag'] = document.etag
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,168 @@
+import cProfile
+import io
+import pstats
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .scope import Scope
+from .timing import API_PREFIX
+
+HEADER = 'X-Profile'
+QUERY_FLAG = '_profile'
+
+# Rows of the pstats listing kept in the report
+STATS_LIMIT = 80
+
+# Our own execute_wrappers sit between the app code and the query
+WRAPPER_MODULES = {'profiling.py', 'timing.py', 'metrics.py'}
+
+
+def profile_store() -> Path:
+    return Path(settings.PROFILER_DIR)
+
+
+def requesting_staff(request):
+    """Scope of a staff/superuser bearer token, or None for anyone else"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        token = AccessToken(header[len('Bearer '):])
+        scope = Scope.from_token(token)
+        if scope is None:
+            scope = Scope.from_user(get_user_model().objects.get(id=token['user_id']))
+    except Exception:
+        return None
+    return scope if scope.is_admin else None
+
+
+class SQLRecorder:
+    """execute_wrapper that notes when each query ran and which app line issued it"""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        offset = time.perf_counter() - self.started
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((offset, time.perf_counter() - self.started - offset, sql, self.call_site()))
+
+    @staticmethod
+    def call_site():
+        base = str(settings.BASE_DIR)
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            if (
+                frame.filename.startswith(base)
+                and 'site-packages' not in frame.filename
+                and Path(frame.filename).name not in WRAPPER_MODULES
+            ):
+                return f"{Path(frame.filename).relative_to(base)}:{frame.lineno} {frame.name}"
+        return '-'
+
+
+def build_report(request, response, scope, elapsed, profiler, recorder):
+    """Plain-text report: summary line, SQL timeline, then the cumulative call listing"""
+    out = io.StringIO()
+    db_total = sum(duration for _, duration, _, _ in recorder.queries)
+    out.write(
+        f"{request.method} {request.get_full_path()}  status {response.status_code}  "
+        f"{elapsed * 1000:.1f} ms  {len(recorder.queries)} queries ({db_total * 1000:.1f} ms)\n"
+    )
+    role = 'superuser' if scope.is_superuser else 'staff'
+    out.write(f"user {scope.user_id} ({role})  {timezone.now().isoformat(timespec='seconds')}\n\n")
+
+    out.write("SQL timeline (start, duration, issued from)\n")
+    for offset, duration, sql, site in recorder.queries:
+        out.write(f"  +{offset * 1000:8.1f} ms {duration * 1000:8.1f} ms  {site}\n      {sql[:2000]}\n")
+
+    out.write(f"\nProfile (cumulative, top {STATS_LIMIT})\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(STATS_LIMIT)
+    return out.getvalue()
+
+
+def save_profile(report, profiler) -> str:
+    """Write <id>.txt and <id>.prof, then drop the oldest beyond PROFILER_MAX_FILES"""
+    store = profile_store()
+    store.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+    (store / f"{profile_id}.txt").write_text(report)
+    profiler.dump_stats(store / f"{profile_id}.prof")
+
+    for stale in list_profiles()[settings.PROFILER_MAX_FILES:]:
+        for suffix in ('.txt', '.prof'):
+            (store / f"{stale['id']}{suffix}").unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles():
+    """Stored profiles, newest first, with their summary line"""
+    store = profile_store()
+    if not store.exists():
+        return []
+    profiles = []
+    for report in sorted(store.glob('*.txt'), reverse=True):
+        with report.open() as f:
+            summary = f.readline().strip()
+        profiles.append({'id': report.stem, 'summary': summary, 'size': report.stat().st_size})
+    return profiles
+
+
+def read_profile(profile_id, suffix='.txt'):
+    """Path of a stored profile, or None; ids never leave the store directory"""
+    path = profile_store() / f"{Path(profile_id).name}{suffix}"
+    return path if path.exists() else None
+
+
+class ProfilerMiddleware:
+    """Run a single /api/ request under cProfile when a staff user asks for it.
+
+    Send ``X-Profile: 1`` or ``?_profile=1`` with a staff/superuser bearer
+    token; the flag is ignored for everyone else. The report is stored in
+    PROFILER_DIR and its id returned in the ``X-Profile-Id`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILER_ENABLED', False)
+
+    def __call__(self, request):
+        if not (
+            self.enabled
+            and request.path.startswith(API_PREFIX)
+            and (request.headers.get(HEADER) or request.GET.get(QUERY_FLAG))
+        ):
+            return self.get_response(request)
+
+        scope = requesting_staff(request)
+        if scope is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        recorder = SQLRecorder(started)
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        report = build_report(request, response, scope, elapsed, profiler, recorder)
+        response['X-Profile-Id'] = save_profile(report, profiler)
+        return response
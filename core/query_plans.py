@@ -0,0 +1,135 @@
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable
+
+from django.db import connection
+from django.db.models import Count, F, QuerySet, Sum
+from django.utils import timezone
+
+from .models import Role, Branch, Dealer, DealerPeriodTotal, ProductSupply
+from .scope import Scope, scoped_queryset
+from .services.period_totals_service import PeriodTotalsService
+
+# SQLite: "SCAN product_supplies" is a full scan, "SCAN t USING INDEX ..." is not
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?(?P<index> USING (?:COVERING )?INDEX| USING INTEGER PRIMARY KEY)?')
+
+
+@dataclass
+class PlanCase:
+    """An endpoint's main query, built for one representative scope"""
+    name: str
+    build: Callable[[], QuerySet]
+
+
+@dataclass
+class PlanResult:
+    name: str
+    plan: str
+    seq_scans: list = field(default_factory=list)  # [(table, rows)]
+
+
+def endpoint_cases(superuser: Scope, staff: Scope, dealer: Scope, branch_id: int) -> list[PlanCase]:
+    """Main queries of the list/detail/dashboard endpoints, as the API builds them"""
+    def supplies(scope):
+        return scoped_queryset(ProductSupply, scope).select_related('dealer')
+
+    return [
+        PlanCase('list_supplies[superuser]', lambda: supplies(superuser)[:10]),
+        PlanCase('list_supplies[superuser,branch]', lambda: supplies(superuser).filter(dealer__branch_id=branch_id)[:10]),
+        PlanCase('list_supplies[staff]', lambda: supplies(staff)[:10]),
+        PlanCase('list_supplies[staff,count]', lambda: supplies(staff).values('id')),
+        PlanCase('list_supplies[dealer]', lambda: supplies(dealer)[:10]),
+        PlanCase('get_dealer_supplies', lambda: ProductSupply.objects.filter(dealer_id=dealer.dealer_id).order_by('-created_at')[:10]),
+        PlanCase('get_dealer_details[totals]', lambda: (
+            ProductSupply.objects.filter(dealer_id=dealer.dealer_id)
+            .values('product_name').annotate(total=Sum('count'))
+        )),
+        PlanCase('dashboard_counts[staff]', lambda: (
+            scoped_queryset(ProductSupply, staff)
+            .values(product=PeriodTotalsService.product_key()).annotate(total=Sum('count'))
+        )),
+        PlanCase('dashboard_counts[staff,group_by=branch]', lambda: (
+            scoped_queryset(ProductSupply, staff)
+            .values('dealer__branch_id', 'dealer__branch__name')
+            .annotate(total=Sum('count'), dealers=Count('dealer_id', distinct=True))
+            .order_by('-total')[:20]
+        )),
+        PlanCase('leaderboard[branch]', lambda: (
+            DealerPeriodTotal.objects
+            .filter(period='2026-Q1', product='vehicle', branch_id=branch_id)
+            .order_by('-total')[:10]
+        )),
+        PlanCase('list_dealers[branch]', lambda: Dealer.objects.filter(is_deleting=False, branch_id=branch_id)[:10]),
+        PlanCase('list_dealers[mobile]', lambda: (
+            Dealer.objects.filter(is_deleting=False).filter(Dealer.mobile_search('43210'))[:10]
+        )),
+        PlanCase('details[staff,dealers]', lambda: scoped_queryset(Dealer, staff)),
+        PlanCase('details[staff,branches]', lambda: scoped_queryset(Branch, staff)),
+        PlanCase('details[staff,roles]', lambda: scoped_queryset(Role, staff)),
+        PlanCase('components_lookup[staff]', lambda: (
+            supplies(staff).filter(components__value='PLAN-BAT-1').annotate(component_kind=F('components__kind'))
+        )),
+        PlanCase('sync[staff,supplies]', lambda: (
+            scoped_queryset(ProductSupply, staff)
+            .filter(updated_at__gt=timezone.now() - timedelta(days=1))
+            .order_by('updated_at', 'id')[:500]
+        )),
+        # Postgres orders sync by writing transaction (core/sync.py)
+        PlanCase('sync[superuser,supplies,xid]', lambda: (
+            supplies(superuser).filter(sync_xid__gt=1000).order_by('sync_xid', 'id')[:500]
+        )),
+    ]
+
+
+def _postgres_seq_scans(plan: str) -> list:
+    scans = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append(node.get('Relation Name'))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    for entry in json.loads(plan):
+        walk(entry['Plan'])
+    return scans
+
+
+def _sqlite_seq_scans(plan: str) -> list:
+    return [m.group(1) for m in SQLITE_SCAN.finditer(plan) if not m.group('index')]
+
+
+def explain(queryset: QuerySet) -> tuple[str, list]:
+    """Return the plan text and the tables it reads with a sequential scan"""
+    if connection.vendor == 'postgresql':
+        plan = queryset.explain(format='json')
+        return plan, _postgres_seq_scans(plan)
+    if connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        return plan, _sqlite_seq_scans(plan)
+    raise ValueError(f"Plan checks are not supported on {connection.vendor}")
+
+
+def table_rows(table: str) -> int:
+    """Current row count of a table; plans only regress once a scan is expensive"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+        return cursor.fetchone()[0]
+
+
+def check_plans(cases: list[PlanCase], max_seq_rows: int) -> list[PlanResult]:
+    """EXPLAIN every case and flag sequential scans over tables above the threshold"""
+    sizes = {}
+    results = []
+    for case in cases:
+        plan, scanned = explain(case.build())
+        result = PlanResult(name=case.name, plan=plan)
+        for table in scanned:
+            if table not in sizes:
+                sizes[table] = table_rows(table)
+            if sizes[table] > max_seq_rows:
+                result.seq_scans.append((table, sizes[table]))
+        results.append(result)
+    return results
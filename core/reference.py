@@ -0,0 +1,44 @@
+from .invalidation import LocalCache
+from .models import Branch, Role
+
+# ============================================================================
+# Reference data
+# ============================================================================
+#
+# Branch and role names are read for nearly every row we serialize but change
+# a few times a year. Each worker keeps the whole table in a LocalCache, so
+# serializers fill in names from memory and list queries need no join. A miss
+# reloads the table (a few hundred rows at most); writes evict across workers
+# through the invalidation bus (core/invalidation.py).
+
+_branches = LocalCache('branch')
+_roles = LocalCache('role')
+
+
+def _names(local_cache, model, ids):
+    ids = {pk for pk in ids if pk is not None}
+    found = local_cache.get_many(ids)
+    if len(found) < len(ids):
+        generation = local_cache.generation
+        names = dict(model.objects.order_by().values_list('id', 'name'))
+        local_cache.set_many(names, generation)
+        found = {pk: names[pk] for pk in ids if pk in names}
+    return found
+
+
+def branch_names(ids):
+    """{branch_id: name} for the given ids; unknown ids are left out"""
+    return _names(_branches, Branch, ids)
+
+
+def branch_name(branch_id):
+    return branch_names([branch_id]).get(branch_id)
+
+
+def role_names(ids):
+    """{role_id: name} for the given ids; unknown ids are left out"""
+    return _names(_roles, Role, ids)
+
+
+def role_name(role_id):
+    return role_names([role_id]).get(role_id)
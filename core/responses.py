@@ -11,6 +11,7 @@ class ErrorSchema(Schema):
 
 class PaginationSchema(Schema):
     count: int
+    count_is_exact: bool = True
     next: Optional[str] = None
     previous: Optional[str] = None
     page_size: int
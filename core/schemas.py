@@ -1,6 +1,6 @@
 from ninja import Schema, Field
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime
 from pydantic import EmailStr, BaseModel
 
 from core.responses import PaginationSchema
@@ -122,6 +122,15 @@ class DealerSchema(Schema):
         from_attributes = True
 
 
+class DealerSuggestionSchema(Schema):
+    id: int
+    name: str
+    company_name: Optional[str] = None
+    mobile_number: str
+    branch_id: int
+    branch_name: Optional[str] = None
+
+
 # ============================================================================
 # UPDATED SCHEMAS - Add these to your schemas.py
 # ============================================================================
@@ -189,6 +198,12 @@ class ProductSupplySchema(Schema):
     remarks: Optional[str] = None
 
 
+class SupplyUpsertSchema(Schema):
+    inserted: int
+    updated: int
+    unchanged: int
+
+
 class ProductSupplyResponseSchema(Schema):
     id: int
     dealer: int
@@ -218,6 +233,98 @@ class ProductSupplyResponseSchema(Schema):
     charger_warranty: Optional[str] = None
     remarks: Optional[str] = None
     created_at: Optional[date] = None
+    # Read from the cold-data archive (manage.py archive_supplies); read-only
+    archived: bool = False
+
+
+# ============================================================================
+# Deletion Job Schemas
+# ============================================================================
+
+class DeletionJobSchema(Schema):
+    id: int
+    target_type: str
+    target_id: int
+    target_name: str
+    status: str
+    total_supplies: int
+    deleted_supplies: int
+    deleted_dealers: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# ============================================================================
+# Sync Schemas
+# ============================================================================
+
+class TombstoneSchema(Schema):
+    entity: str
+    id: int
+    deleted_at: datetime
+
+
+class SyncSchema(Schema):
+    dealers: List[DealerSchema]
+    supplies: List[ProductSupplyResponseSchema]
+    deleted: List[TombstoneSchema]
+    cursor: str
+    has_more: bool
+
+
+# ============================================================================
+# Leaderboard Schemas
+# ============================================================================
+
+class LeaderboardEntrySchema(Schema):
+    rank: int
+    dealer_id: int
+    dealer_name: str
+    branch_id: int
+    total: int
+
+
+class LeaderboardSchema(Schema):
+    period: str
+    product: str
+    branch_id: Optional[int] = None
+    entries: List[LeaderboardEntrySchema]
+
+
+# ============================================================================
+# Batch Schemas
+# ============================================================================
+
+class DealerBatchSchema(Schema):
+    items: List[DealerSchema]
+    missing: List[int]
+    forbidden: List[int]
+
+
+class SupplyBatchSchema(Schema):
+    items: List[ProductSupplyResponseSchema]
+    missing: List[int]
+    forbidden: List[int]
+
+
+# ============================================================================
+# Component Schemas
+# ============================================================================
+
+class ComponentMatchSchema(Schema):
+    kind: str
+    value: str
+    # Supplies carrying this kind and value, across all users
+    supply_count: int
+    duplicate: bool
+    supply: ProductSupplyResponseSchema
+
+
+class ComponentDuplicateSchema(Schema):
+    kind: str
+    value: str
+    supply_count: int
 
 
 # ============================================================================
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from django.db.models import Model, QuerySet
+from ninja.errors import HttpError
+
+from .models import Role, Branch, Dealer, ProductSupply
+
+
+# Claim names written into every access/refresh token at issue time
+SCOPE_CLAIMS = ('is_superuser', 'is_staff', 'dealer_id', 'branch_id')
+
+
+@dataclass(frozen=True)
+class Scope:
+    """Caller scope resolved once at token issue time.
+
+    Tokens live for ``ACCESS_TOKEN_LIFETIME``, so a role or dealer change is
+    picked up on the next refresh.
+    """
+    user_id: int
+    is_superuser: bool = False
+    is_staff: bool = False
+    dealer_id: Optional[int] = None
+    branch_id: Optional[int] = None
+
+    @property
+    def is_admin(self) -> bool:
+        """Staff and superusers can see any dealer"""
+        return self.is_superuser or self.is_staff
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies the rows scoped_queryset would return, for keying cached results"""
+        if self.is_superuser:
+            return 'all'
+        if self.is_staff:
+            return f'staff:{self.user_id}'
+        return f'dealer:{self.dealer_id}'
+
+    @classmethod
+    def from_user(cls, user) -> 'Scope':
+        """Resolve scope from a user instance (one dealer lookup for non-staff)"""
+        dealer_id = None
+        branch_id = getattr(user, 'branch_id', None)
+        if not (user.is_superuser or user.is_staff):
+            dealer = (
+                Dealer.objects
+                .filter(user_id=user.id)
+                .values('id', 'branch_id')
+                .first()
+            )
+            if dealer:
+                dealer_id = dealer['id']
+                branch_id = dealer['branch_id']
+        return cls(
+            user_id=user.id,
+            is_superuser=user.is_superuser,
+            is_staff=user.is_staff,
+            dealer_id=dealer_id,
+            branch_id=branch_id,
+        )
+
+    @classmethod
+    def from_token(cls, token) -> Optional['Scope']:
+        """Read scope claims from a validated token, None for tokens issued without them"""
+        if any(claim not in token for claim in SCOPE_CLAIMS):
+            return None
+        return cls(
+            user_id=int(token['user_id']),
+            is_superuser=bool(token['is_superuser']),
+            is_staff=bool(token['is_staff']),
+            dealer_id=token['dealer_id'],
+            branch_id=token['branch_id'],
+        )
+
+    def add_to_token(self, token) -> None:
+        """Write scope claims into a token"""
+        claims = asdict(self)
+        for claim in SCOPE_CLAIMS:
+            token[claim] = claims[claim]
+
+
+def get_request_scope(request) -> Scope:
+    """Return the caller scope, raising 401 for anonymous requests"""
+    scope = getattr(request, 'scope', None)
+    if scope is not None:
+        return scope
+
+    # Authentication disabled or session auth: resolve from the user once
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        raise HttpError(401, "Unauthorized")
+    request.scope = Scope.from_user(user)
+    return request.scope
+
+
+def scoped_queryset(model: type[Model], scope: Scope) -> QuerySet:
+    """Base queryset for a model restricted to what the caller may see.
+
+    Built from scope claims only, so it never reads the user or dealer table.
+    """
+    if model is ProductSupply:
+        if scope.is_superuser:
+            return ProductSupply.objects.all()
+        if scope.is_staff:
+            return ProductSupply.objects.filter(created_by_id=scope.user_id)
+        if scope.dealer_id is None:
+            return ProductSupply.objects.none()
+        return ProductSupply.objects.filter(dealer_id=scope.dealer_id)
+
+    if model in (Branch, Dealer):
+        # Records queued for background deletion are hidden everywhere
+        queryset = model.objects.filter(is_deleting=False)
+    elif model is Role:
+        queryset = Role.objects.all()
+    else:
+        raise ValueError(f"No scope rule for {model.__name__}")
+
+    if scope.is_superuser:
+        return queryset
+    return queryset.filter(created_by_id=scope.user_id)
+
+
+def can_view_supply(scope: Scope, supply: ProductSupply) -> bool:
+    """scoped_queryset's ProductSupply rule for one record (e.g. an archived one)"""
+    if scope.is_superuser:
+        return True
+    if scope.is_staff:
+        return supply.created_by_id == scope.user_id
+    return scope.dealer_id is not None and supply.dealer_id == scope.dealer_id
+
+
+def can_view_dealer(scope: Scope, dealer_id: int) -> bool:
+    """Staff and superusers can view any dealer, dealer users only their own"""
+    return scope.is_admin or scope.dealer_id == dealer_id
+
+
+def viewable_dealers(scope: Scope) -> QuerySet:
+    """Dealers the caller may open, the queryset form of can_view_dealer"""
+    queryset = Dealer.objects.filter(is_deleting=False)
+    if scope.is_admin:
+        return queryset
+    if scope.dealer_id is None:
+        return queryset.none()
+    return queryset.filter(id=scope.dealer_id)
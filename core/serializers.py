@@ -1,4 +1,5 @@
-from .models import Role, Branch, Dealer, ProductSupply
+from .models import Role, Branch, Dealer, ProductSupply, DeletionJob, Tombstone
+from .reference import branch_name
 
 
 class ModelSerializer:
@@ -23,7 +24,7 @@ class ModelSerializer:
 
     @staticmethod
     def dealer_to_dict(dealer: Dealer) -> dict:
-        """Convert Dealer model to dictionary"""
+        """Convert Dealer model to dictionary; the branch name comes from the reference cache"""
         return {
             'id': dealer.id,
             'name': dealer.name,
@@ -37,18 +38,18 @@ class ModelSerializer:
             'branch': dealer.branch_id,
             'user_id': dealer.user_id,
             'created_at': dealer.created_at.date() if dealer.created_at else None,
-            'branch_name': dealer.branch.name if dealer.branch else None,
+            'branch_name': branch_name(dealer.branch_id),
         }
 
     @staticmethod
     def supply_to_dict(supply: ProductSupply) -> dict:
-        """Convert ProductSupply model to dictionary"""
+        """Convert ProductSupply model to dictionary; select_related('dealer') to avoid a query per row"""
         return {
             'id': supply.id,
             'dealer': supply.dealer_id,
             'dealer_name': supply.dealer.name if supply.dealer else None,
             'branch_id': supply.dealer.branch_id if supply.dealer else None,
-            'branch_name': supply.dealer.branch.name if supply.dealer and supply.dealer.branch else None,
+            'branch_name': branch_name(supply.dealer.branch_id) if supply.dealer else None,
             'product_name': supply.product_name,
             'invoice_number': supply.invoice_number,
             'serial_number': supply.serial_number,
@@ -72,4 +73,31 @@ class ModelSerializer:
             'charger_warranty': supply.charger_warranty,
             'remarks': supply.remarks,
             'created_at': supply.created_at.date() if supply.created_at else None,
-        }
\ No newline at end of file
+            'archived': getattr(supply, 'is_archived', False),
+        }
+
+    @staticmethod
+    def deletion_job_to_dict(job: DeletionJob) -> dict:
+        """Convert DeletionJob model to dictionary"""
+        return {
+            'id': job.id,
+            'target_type': job.target_type,
+            'target_id': job.target_id,
+            'target_name': job.target_name,
+            'status': job.status,
+            'total_supplies': job.total_supplies,
+            'deleted_supplies': job.deleted_supplies,
+            'deleted_dealers': job.deleted_dealers,
+            'error': job.error,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+        }
+
+    @staticmethod
+    def tombstone_to_dict(tombstone: Tombstone) -> dict:
+        """Convert Tombstone model to dictionary"""
+        return {
+            'entity': tombstone.entity,
+            'id': tombstone.entity_id,
+            'deleted_at': tombstone.deleted_at,
+        }
@@ -0,0 +1,78 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.archive import FIELDS, SEGMENT_ROWS, archiving, supply_archive
+from core.models import ProductSupply
+from core.services.partition_service import SupplyPartitionService
+
+
+class SupplyArchiveService:
+    """Service class moving old supplies from product_supplies to the archive.
+
+    Each batch is written to a segment file and indexed (core/archive.py)
+    before it is deleted from the database, so a crash in between leaves
+    rows in both places and the next run archives them again. The delete
+    runs under ``archiving()``: no sync tombstones (clients keep the rows),
+    no period total refresh (leaderboards keep counting them, and
+    PeriodTotalsService adds the archive index's counts when it recomputes
+    or rebuilds). Components go with the cascade; response caches are invalidated as for any delete.
+    Archived serial numbers stay reserved: the API checks the archive index
+    before writing one, and a partitioned table keeps them in supply_serials.
+    """
+
+    @staticmethod
+    def cutoff(older_than_days=None):
+        if older_than_days is None:
+            older_than_days = settings.SUPPLY_ARCHIVE_AFTER_DAYS
+        return timezone.now() - timedelta(days=older_than_days)
+
+    @staticmethod
+    def candidates(cutoff):
+        return ProductSupply.objects.filter(created_at__lt=cutoff)
+
+    @staticmethod
+    def archive(older_than_days=None, batch_size=1000, pause=0.0, log=None):
+        """Archive every supply created before the cutoff; return how many"""
+        cutoff = SupplyArchiveService.cutoff(older_than_days)
+        run = timezone.now().strftime('%Y%m%dT%H%M%S')
+        db = supply_archive.writer()
+        # The registry's release trigger frees serials on delete; archived ones stay taken
+        partitioned = SupplyPartitionService.is_partitioned()
+        archived = 0
+        segment_rows = 0
+        segment_number = 0
+        last_id = 0
+        try:
+            while True:
+                rows = list(
+                    SupplyArchiveService.candidates(cutoff)
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .values(*(field.attname for field in FIELDS))[:batch_size]
+                )
+                if not rows:
+                    return archived
+                if segment_rows >= SEGMENT_ROWS:
+                    segment_number += 1
+                    segment_rows = 0
+                segment = f'supplies-{run}-{segment_number:04d}.ndjson.gz'
+                supply_archive.append(db, segment, rows)
+                segment_rows += len(rows)
+
+                ids = [row['id'] for row in rows]
+                with transaction.atomic(), archiving():
+                    ProductSupply.objects.filter(id__in=ids).delete()
+                    if partitioned:
+                        SupplyPartitionService.reserve_serials([(row['serial_number'], row['id']) for row in rows])
+                archived += len(rows)
+                last_id = ids[-1]
+                if log:
+                    log(f"{archived} supplies archived (last id {last_id}) to {segment}")
+                if pause:
+                    time.sleep(pause)
+        finally:
+            db.close()
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.cache import branch_ns, creator_ns, dealer_ns, invalidate
+from core.invalidation import publish
+from core.models import Branch, Dealer, DeletionJob, ProductSupply
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class DeletionService:
+    """Service class for chunked, lock-friendly dealer and branch deletion.
+
+    The API marks the record as deleting and queues a DeletionJob. The job
+    removes supplies in batches of ``DELETION_CHUNK_SIZE``, each in its own
+    short transaction, so inserts on other dealers are never blocked behind
+    one huge cascade.
+    """
+
+    @staticmethod
+    def chunk_size():
+        return getattr(settings, 'DELETION_CHUNK_SIZE', 500)
+
+    @staticmethod
+    def active_job(target_type, target_id):
+        """Return the unfinished job for a target, if any"""
+        return (
+            DeletionJob.objects
+            .filter(
+                target_type=target_type,
+                target_id=target_id,
+                status__in=[DeletionJob.STATUS_PENDING, DeletionJob.STATUS_RUNNING],
+            )
+            .first()
+        )
+
+    @staticmethod
+    def schedule_dealer_deletion(dealer, user=None):
+        """Hide a dealer from lists and queue its deletion"""
+        with transaction.atomic():
+            Dealer.objects.filter(id=dealer.id).update(is_deleting=True, updated_at=timezone.now())
+            invalidate(dealer_ns(dealer.id), branch_ns(dealer.branch_id), creator_ns(dealer.created_by_id), 'dealers')
+            publish('dealer', dealer.id)
+            job = DeletionJob.objects.create(
+                target_type=DeletionJob.TARGET_DEALER,
+                target_id=dealer.id,
+                target_name=dealer.name,
+                total_supplies=ProductSupply.objects.filter(dealer_id=dealer.id).count(),
+                created_by=user,
+            )
+            transaction.on_commit(lambda: DeletionService.start(job.id))
+        return job
+
+    @staticmethod
+    def schedule_branch_deletion(branch, user=None):
+        """Hide a branch and all its dealers from lists and queue their deletion"""
+        with transaction.atomic():
+            now = timezone.now()
+            Branch.objects.filter(id=branch.id).update(is_deleting=True, updated_at=now)
+            Dealer.objects.filter(branch_id=branch.id).update(is_deleting=True, updated_at=now)
+            # Every dealer of the branch disappears from lists and details
+            dealer_ids = list(Dealer.objects.filter(branch_id=branch.id).values_list('id', flat=True))
+            invalidate(branch_ns(branch.id), 'branches', 'dealers', *(dealer_ns(dealer_id) for dealer_id in dealer_ids))
+            publish('branch', branch.id)
+            if dealer_ids:
+                publish('dealer', *dealer_ids)
+            job = DeletionJob.objects.create(
+                target_type=DeletionJob.TARGET_BRANCH,
+                target_id=branch.id,
+                target_name=branch.name,
+                total_supplies=ProductSupply.objects.filter(dealer__branch_id=branch.id).count(),
+                created_by=user,
+            )
+            transaction.on_commit(lambda: DeletionService.start(job.id))
+        return job
+
+    @staticmethod
+    def start(job_id):
+        """Run a job in a background thread of the current worker"""
+        thread = threading.Thread(
+            target=DeletionService.run_job,
+            args=(job_id,),
+            name=f"deletion-job-{job_id}",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def claim(job_id, stale_after=None):
+        """Mark a job as running; returns False if another worker owns it"""
+        claimable = Q(status=DeletionJob.STATUS_PENDING)
+        if stale_after is not None:
+            claimable |= Q(
+                status=DeletionJob.STATUS_RUNNING,
+                updated_at__lt=timezone.now() - stale_after,
+            )
+        return bool(
+            DeletionJob.objects
+            .filter(claimable, id=job_id)
+            .update(status=DeletionJob.STATUS_RUNNING, updated_at=timezone.now())
+        )
+
+    @staticmethod
+    def run_job(job_id, stale_after=None):
+        """Execute a job to completion, recording progress after every chunk"""
+        try:
+            if not DeletionService.claim(job_id, stale_after=stale_after):
+                return
+            job = DeletionJob.objects.get(id=job_id)
+            if job.target_type == DeletionJob.TARGET_DEALER:
+                DeletionService._delete_dealer(job, job.target_id)
+            else:
+                DeletionService._delete_branch(job)
+            DeletionJob.objects.filter(id=job_id).update(
+                status=DeletionJob.STATUS_DONE,
+                finished_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+        except Exception as e:
+            logger.exception("Deletion job %s failed", job_id)
+            DeletionJob.objects.filter(id=job_id).update(
+                status=DeletionJob.STATUS_FAILED,
+                error=str(e),
+                updated_at=timezone.now(),
+            )
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    @staticmethod
+    def resume_jobs(stale_after=timedelta(minutes=5)):
+        """Run pending jobs and jobs whose worker died mid-way; returns job ids"""
+        job_ids = list(
+            DeletionJob.objects
+            .filter(
+                Q(status=DeletionJob.STATUS_PENDING) |
+                Q(status=DeletionJob.STATUS_RUNNING, updated_at__lt=timezone.now() - stale_after)
+            )
+            .order_by('created_at')
+            .values_list('id', flat=True)
+        )
+        for job_id in job_ids:
+            DeletionService.run_job(job_id, stale_after=stale_after)
+        return job_ids
+
+    @staticmethod
+    def _delete_branch(job):
+        dealer_ids = Dealer.objects.filter(branch_id=job.target_id).order_by().values_list('id', flat=True)
+        for dealer_id in list(dealer_ids):
+            DeletionService._delete_dealer(job, dealer_id)
+
+        with transaction.atomic():
+            Branch.objects.filter(id=job.target_id).delete()
+
+    @staticmethod
+    def _delete_dealer(job, dealer_id):
+        chunk_size = DeletionService.chunk_size()
+        pause = getattr(settings, 'DELETION_CHUNK_PAUSE', 0)
+
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    ProductSupply.objects
+                    .filter(dealer_id=dealer_id)
+                    .order_by()
+                    .values_list('id', flat=True)[:chunk_size]
+                )
+                if not ids:
+                    break
+                ProductSupply.objects.filter(id__in=ids).delete()
+                DeletionJob.objects.filter(id=job.id).update(
+                    deleted_supplies=F('deleted_supplies') + len(ids),
+                    updated_at=timezone.now(),
+                )
+            if pause:
+                time.sleep(pause)
+
+        # Supplies are gone, so the remaining cascade only touches the dealer row
+        with transaction.atomic():
+            user_id = Dealer.objects.filter(id=dealer_id).values_list('user_id', flat=True).first()
+            if user_id:
+                User.objects.filter(id=user_id).delete()
+            Dealer.objects.filter(id=dealer_id).delete()
+            DeletionJob.objects.filter(id=job.id).update(
+                deleted_dealers=F('deleted_dealers') + 1,
+                updated_at=timezone.now(),
+            )
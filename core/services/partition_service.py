@@ -0,0 +1,397 @@
+import re
+import time
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import ProductSupply
+
+TABLE = ProductSupply._meta.db_table
+# Built next to the live table, then swapped in under its name
+NEW_TABLE = f'{TABLE}_partitioned'
+# Where the original table is left after the swap, until dropped by hand
+OLD_TABLE = f'{TABLE}_unpartitioned'
+# id sequence of the partitioned table (the original one belongs to the old table)
+SEQUENCE = f'{TABLE}_part_id_seq'
+# One row per serial number: partitioned tables cannot have a unique index
+# that leaves out the partition key, so the global uniqueness lives here
+REGISTRY = 'supply_serials'
+MIRROR_TRIGGER = f'{TABLE}_mirror'
+# Delta sync's transaction stamp (migration 0017); copies keep the row's stamp
+SYNC_STAMP_TRIGGER = f'{TABLE}_sync_stamp'
+KEEP_SYNC_XID = "SET LOCAL sync.keep_xid = 'on'"
+# Index names are global in Postgres; copies carry a suffix until the swap
+INDEX_SUFFIX = '_prt'
+OLD_INDEX_SUFFIX = '_old'
+
+MIN_SERVER_VERSION = 130000  # BEFORE row triggers on partitioned tables
+
+CREATE_INDEX = re.compile(r'^CREATE INDEX (\S+) ON (\S+) (USING .*)$')
+
+REGISTRY_SQL = f"""
+CREATE TABLE IF NOT EXISTS {REGISTRY} (
+    serial_number varchar(150) PRIMARY KEY,
+    supply_id bigint NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION {REGISTRY}_register() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.serial_number = OLD.serial_number THEN
+            RETURN NEW;
+        END IF;
+        DELETE FROM {REGISTRY} WHERE serial_number = OLD.serial_number AND supply_id = OLD.id;
+    END IF;
+    INSERT INTO {REGISTRY} (serial_number, supply_id) VALUES (NEW.serial_number, NEW.id)
+    ON CONFLICT (serial_number) DO NOTHING;
+    -- Re-registering the same supply (copy and mirror overlap) is fine
+    IF NOT FOUND AND NOT EXISTS (
+        SELECT 1 FROM {REGISTRY} WHERE serial_number = NEW.serial_number AND supply_id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'duplicate key value violates unique constraint "{REGISTRY}_pkey"'
+            USING ERRCODE = 'unique_violation',
+                  DETAIL = format('Key (serial_number)=(%s) already exists.', NEW.serial_number);
+    END IF;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION {REGISTRY}_release() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM {REGISTRY} WHERE serial_number = OLD.serial_number AND supply_id = OLD.id;
+    RETURN OLD;
+END $$;
+"""
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(start):
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def utc_bound(day):
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+class SupplyPartitionService:
+    """Service class for range-partitioning product_supplies on created_at.
+
+    ``prepare``, ``copy`` and ``swap`` convert the live table without
+    blocking writers: a partitioned copy with one partition per month is
+    built next to it, a trigger mirrors every write on the old table into
+    it, the existing rows are copied in id chunks, copies left stale by
+    writes that raced the copy are removed, and the names are swapped in
+    one short transaction.
+    ``ensure_partitions`` keeps partitions created ahead of time (cron).
+    Postgres 13+ only.
+    """
+
+    @staticmethod
+    def is_partitioned():
+        """Whether product_supplies is a partitioned table; not cached, so
+        running workers notice the swap"""
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+            row = cursor.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    @staticmethod
+    def reserve_serials(rows):
+        """Put (serial_number, supply_id) pairs back in the registry after their
+        rows were deleted without freeing the serial number (archival)"""
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {REGISTRY} (serial_number, supply_id) '
+                f'SELECT * FROM unnest(%s::varchar[], %s::bigint[]) ON CONFLICT (serial_number) DO NOTHING',
+                [[serial for serial, _ in rows], [supply_id for _, supply_id in rows]],
+            )
+
+    @staticmethod
+    def check_backend():
+        if connection.vendor != 'postgresql':
+            raise CommandError(f"Partitioning needs PostgreSQL, not {connection.vendor}")
+        if connection.pg_version < MIN_SERVER_VERSION:
+            raise CommandError("Partitioning needs PostgreSQL 13 or later")
+
+    @staticmethod
+    def partition_name(table, start):
+        return f'{table}_p{start:%Y%m}'
+
+    @staticmethod
+    def _exists(cursor, name):
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _columns(cursor, table):
+        cursor.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 "
+            "AND NOT attisdropped ORDER BY attnum",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def create_partition(cursor, table, start):
+        """Create the month partition starting at ``start`` unless it exists.
+
+        Rows of that month that landed in the default partition are moved in.
+        """
+        name = SupplyPartitionService.partition_name(table, start)
+        if SupplyPartitionService._exists(cursor, name):
+            return False
+        default = f'{table}_default'
+        bounds = [utc_bound(start), utc_bound(next_month(start))]
+        cursor.execute(f'SELECT 1 FROM {default} WHERE created_at >= %s AND created_at < %s LIMIT 1', bounds)
+        if cursor.fetchone() is None:
+            cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', bounds)
+            return True
+
+        with transaction.atomic():
+            cursor.execute(KEEP_SYNC_XID)
+            cursor.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {default} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved',
+                bounds,
+            )
+            cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+            # The delete from the default partition released these serials
+            cursor.execute(
+                f'INSERT INTO {REGISTRY} (serial_number, supply_id) SELECT serial_number, id FROM {name} '
+                f'ON CONFLICT (serial_number) DO NOTHING'
+            )
+        return True
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None, table=TABLE, first=None):
+        """Create the partitions from ``first`` (default: this month) to
+        ``months_ahead`` months from now; return the names created"""
+        if months_ahead is None:
+            months_ahead = settings.SUPPLY_PARTITION_MONTHS_AHEAD
+        start = month_start(first or timezone.now())
+        last = month_start(timezone.now())
+        for _ in range(months_ahead):
+            last = next_month(last)
+        created = []
+        with connection.cursor() as cursor:
+            while start <= last:
+                if SupplyPartitionService.create_partition(cursor, table, start):
+                    created.append(SupplyPartitionService.partition_name(table, start))
+                start = next_month(start)
+        return created
+
+    @staticmethod
+    def referencing_constraints():
+        """Foreign keys pointing at product_supplies; they would block the swap"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' AND confrelid = %s::regclass",
+                [TABLE],
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def _copied_indexes(cursor):
+        """(original name, CREATE INDEX for the new table) for every non-unique index"""
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [TABLE])
+        indexes = []
+        for name, definition in cursor.fetchall():
+            match = CREATE_INDEX.match(definition)
+            if match:  # primary key and serial_number unique index are not copied
+                temp = name[:63 - len(INDEX_SUFFIX)] + INDEX_SUFFIX
+                indexes.append((name, f'CREATE INDEX IF NOT EXISTS {temp} ON {NEW_TABLE} {match.group(3)}'))
+        return indexes
+
+    @staticmethod
+    def prepare(months_ahead=None, log=None):
+        """Create the partitioned table, the serial registry and the mirror trigger.
+
+        Safe to run again after an interruption.
+        """
+        SupplyPartitionService.check_backend()
+        if SupplyPartitionService.is_partitioned():
+            raise CommandError(f"{TABLE} is already partitioned")
+        referencing = SupplyPartitionService.referencing_constraints()
+        if referencing:
+            names = ', '.join(f'{table}.{name}' for table, name in referencing)
+            raise CommandError(f"Drop the foreign keys referencing {TABLE} first (migrate): {names}")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not SupplyPartitionService._exists(cursor, NEW_TABLE):
+                cursor.execute(
+                    f'CREATE TABLE {NEW_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                    f'PARTITION BY RANGE (created_at)'
+                )
+                # The original default draws from the old table's sequence or identity
+                cursor.execute(f'ALTER TABLE {NEW_TABLE} ALTER COLUMN id DROP DEFAULT')
+                cursor.execute(f'ALTER TABLE {NEW_TABLE} ADD PRIMARY KEY (id, created_at)')
+                cursor.execute(
+                    "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                    "WHERE contype = 'f' AND conrelid = %s::regclass",
+                    [TABLE],
+                )
+                for name, definition in cursor.fetchall():
+                    cursor.execute(f'ALTER TABLE {NEW_TABLE} ADD CONSTRAINT {name} {definition}')
+                for _, statement in SupplyPartitionService._copied_indexes(cursor):
+                    cursor.execute(statement)
+                cursor.execute(f'CREATE TABLE {NEW_TABLE}_default PARTITION OF {NEW_TABLE} DEFAULT')
+                cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}')
+
+            cursor.execute(REGISTRY_SQL)
+            cursor.execute(f"""
+                DROP TRIGGER IF EXISTS {REGISTRY}_register ON {NEW_TABLE};
+                CREATE TRIGGER {REGISTRY}_register BEFORE INSERT OR UPDATE OF serial_number
+                ON {NEW_TABLE} FOR EACH ROW EXECUTE FUNCTION {REGISTRY}_register();
+                DROP TRIGGER IF EXISTS {REGISTRY}_release ON {NEW_TABLE};
+                CREATE TRIGGER {REGISTRY}_release AFTER DELETE
+                ON {NEW_TABLE} FOR EACH ROW EXECUTE FUNCTION {REGISTRY}_release();
+                DROP TRIGGER IF EXISTS {SYNC_STAMP_TRIGGER} ON {NEW_TABLE};
+                CREATE TRIGGER {SYNC_STAMP_TRIGGER} BEFORE INSERT OR UPDATE
+                ON {NEW_TABLE} FOR EACH ROW EXECUTE FUNCTION sync_stamp();
+            """)
+
+            columns = SupplyPartitionService._columns(cursor, TABLE)
+            assignments = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns if column != 'id')
+            cursor.execute(f"""
+                CREATE OR REPLACE FUNCTION {MIRROR_TRIGGER}() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP <> 'INSERT' THEN
+                        IF TG_OP = 'DELETE' OR NEW.created_at IS DISTINCT FROM OLD.created_at THEN
+                            DELETE FROM {NEW_TABLE} WHERE id = OLD.id AND created_at = OLD.created_at;
+                        END IF;
+                        IF TG_OP = 'DELETE' THEN
+                            RETURN OLD;
+                        END IF;
+                    END IF;
+                    INSERT INTO {NEW_TABLE} SELECT NEW.*
+                    ON CONFLICT (id, created_at) DO UPDATE SET {assignments};
+                    RETURN NEW;
+                END $$;
+                DROP TRIGGER IF EXISTS {MIRROR_TRIGGER} ON {TABLE};
+                CREATE TRIGGER {MIRROR_TRIGGER} AFTER INSERT OR UPDATE OR DELETE
+                ON {TABLE} FOR EACH ROW EXECUTE FUNCTION {MIRROR_TRIGGER}();
+            """)
+
+            cursor.execute(f'SELECT min(created_at) FROM {TABLE}')
+            oldest = cursor.fetchone()[0]
+        created = SupplyPartitionService.ensure_partitions(months_ahead, table=NEW_TABLE, first=oldest)
+        if log:
+            log(f"{NEW_TABLE} ready, {len(created)} partitions created")
+
+    @staticmethod
+    def copy(chunk_size=5000, start_id=0, pause=0.0, log=None):
+        """Copy the rows that existed before the mirror trigger, chunk_size ids
+        per transaction; rows the trigger already wrote are left alone"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT max(id) FROM {TABLE}')
+            upto = cursor.fetchone()[0] or 0
+        copied = 0
+        last_id = start_id
+        while last_id < upto:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(KEEP_SYNC_XID)
+                cursor.execute(
+                    f'INSERT INTO {NEW_TABLE} SELECT * FROM {TABLE} WHERE id > %s AND id <= %s '
+                    f'ON CONFLICT (id, created_at) DO NOTHING',
+                    [last_id, last_id + chunk_size],
+                )
+                copied += cursor.rowcount
+            last_id += chunk_size
+            if log:
+                log(f"{copied} rows copied (up to id {min(last_id, upto)} of {upto})")
+            if pause:
+                time.sleep(pause)
+        return copied
+
+    @staticmethod
+    def reconcile(chunk_size=5000, pause=0.0, log=None):
+        """Delete copied rows whose (id, created_at) is no longer in the old
+        table; return how many.
+
+        A row the copy read just before a concurrent delete, or before its
+        created_at changed, is inserted after the trigger already handled it.
+        Once the copy is done the trigger keeps the tables in step, so one
+        pass is enough.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT max(id) FROM {NEW_TABLE}')
+            upto = cursor.fetchone()[0] or 0
+        removed = 0
+        last_id = 0
+        while last_id < upto:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {NEW_TABLE} n WHERE n.id > %s AND n.id <= %s AND NOT EXISTS '
+                    f'(SELECT 1 FROM {TABLE} o WHERE o.id = n.id AND o.created_at = n.created_at) '
+                    f'RETURNING n.id',
+                    [last_id, last_id + chunk_size],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids:
+                    # The release trigger freed the serial numbers; the row with the
+                    # current created_at may still hold them
+                    cursor.execute(
+                        f'INSERT INTO {REGISTRY} (serial_number, supply_id) '
+                        f'SELECT serial_number, id FROM {NEW_TABLE} WHERE id = ANY(%s) '
+                        f'ON CONFLICT (serial_number) DO NOTHING',
+                        [ids],
+                    )
+                removed += len(ids)
+            last_id += chunk_size
+            if log and ids:
+                log(f"{removed} stale rows removed (up to id {min(last_id, upto)} of {upto})")
+            if pause:
+                time.sleep(pause)
+        return removed
+
+    @staticmethod
+    def swap(log=None):
+        """Put the partitioned table in place under an exclusive lock held for
+        a few catalog updates; the original is kept as product_supplies_unpartitioned"""
+        with connection.cursor() as cursor:
+            # One statement, one snapshot: the trigger writes both tables in the same transaction
+            cursor.execute(f'SELECT (SELECT count(*) FROM {TABLE}), (SELECT count(*) FROM {NEW_TABLE})')
+            expected, actual = cursor.fetchone()
+        if actual != expected:
+            raise CommandError(f"{NEW_TABLE} has {actual} rows, {TABLE} has {expected}: run the copy again")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = '10s'")
+            cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'DROP TRIGGER {MIRROR_TRIGGER} ON {TABLE}')
+            cursor.execute(f'DROP FUNCTION {MIRROR_TRIGGER}()')
+            for name, _ in SupplyPartitionService._copied_indexes(cursor):
+                temp = name[:63 - len(INDEX_SUFFIX)] + INDEX_SUFFIX
+                cursor.execute(f'ALTER INDEX {name} RENAME TO {name[:63 - len(OLD_INDEX_SUFFIX)]}{OLD_INDEX_SUFFIX}')
+                cursor.execute(f'ALTER INDEX {temp} RENAME TO {name}')
+            # The kept copy must not block deleting the dealers and users it references
+            cursor.execute("SELECT conname FROM pg_constraint WHERE contype = 'f' AND conrelid = %s::regclass", [TABLE])
+            for (name,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {TABLE} DROP CONSTRAINT {name}')
+            cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+            cursor.execute(f'ALTER TABLE {NEW_TABLE} RENAME TO {TABLE}')
+            cursor.execute(f'ALTER TABLE {NEW_TABLE}_default RENAME TO {TABLE}_default')
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass AND c.relname LIKE %s",
+                [TABLE, f'{NEW_TABLE}_p%'],
+            )
+            for (name,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {name} RENAME TO {TABLE}{name[len(NEW_TABLE):]}')
+
+            cursor.execute(f'SELECT setval(%s, GREATEST((SELECT max(id) FROM {OLD_TABLE}), 1))', [SEQUENCE])
+            cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+            cursor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        if log:
+            log(f"{TABLE} is now partitioned; the original table is kept as {OLD_TABLE}")
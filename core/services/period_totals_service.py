@@ -0,0 +1,171 @@
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, ExtractQuarter, ExtractYear, Lower, Trim, TruncDate
+from django.utils import timezone
+
+from core.archive import supply_archive
+from core.models import Dealer, DealerPeriodTotal, ProductSupply
+from core.on_commit import on_commit_merged
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingTotals:
+    """on_commit callback collecting the (dealer_id, period) keys a transaction touched"""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def merge(self, other):
+        self.keys |= other.keys
+
+    def __call__(self):
+        try:
+            PeriodTotalsService.recompute(self.keys)
+        except Exception:
+            # The write itself is committed; rebuild_period_totals repairs the totals
+            logger.exception("Recomputing period totals failed for %d keys", len(self.keys))
+
+
+class PeriodTotalsService:
+    """Service class keeping DealerPeriodTotal in step with product_supplies.
+
+    Writes only mark the (dealer, quarter) pairs they touch. The marks of one
+    transaction are collected in a single on_commit callback, which then
+    recomputes those pairs from the ledger with one grouped query, so a
+    500-row insert costs one recompute rather than 500 increments. Archived
+    supplies (manage.py archive_supplies) are added from the archive index,
+    so archiving does not change the totals.
+    """
+
+    @staticmethod
+    def period_of(day: date) -> str:
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+
+    @staticmethod
+    def current_period() -> str:
+        return PeriodTotalsService.period_of(timezone.localdate())
+
+    @staticmethod
+    def period_range(period: str) -> tuple[date, date]:
+        """First and last day of a "YYYY-Qn" period; ValueError when malformed"""
+        year, quarter = period.split('-Q')
+        year, quarter = int(year), int(quarter)
+        if not 1 <= quarter <= 4:
+            raise ValueError(period)
+        start = date(year, 3 * quarter - 2, 1)
+        end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+        return start, date.fromordinal(end.toordinal() - 1)
+
+    @staticmethod
+    def product_key():
+        """product_name as totals are grouped by it: trimmed and lower-cased"""
+        return Lower(Trim('product_name'))
+
+    @staticmethod
+    def key_of(dealer_id, purchase_date, created_at):
+        """(dealer_id, period) a supply counts towards"""
+        day = purchase_date or (timezone.localdate(created_at) if created_at else timezone.localdate())
+        return dealer_id, PeriodTotalsService.period_of(day)
+
+    @staticmethod
+    def mark_dirty(keys):
+        """Schedule a recompute of these (dealer_id, period) pairs when the transaction commits"""
+        keys = set(keys)
+        if not keys:
+            return
+        on_commit_merged(_PendingTotals(keys), robust=True)
+
+    @staticmethod
+    def recompute(keys):
+        """Replace the totals of the given (dealer_id, period) pairs from the ledger"""
+        keys = set(keys)
+        if not keys:
+            return
+
+        in_periods = Q()
+        stale = Q()
+        for dealer_id, period in keys:
+            start, end = PeriodTotalsService.period_range(period)
+            in_periods |= Q(dealer_id=dealer_id, day__range=(start, end))
+            stale |= Q(dealer_id=dealer_id, period=period)
+
+        totals = [
+            total for total in PeriodTotalsService._compute(
+                in_periods, {dealer_id for dealer_id, _ in keys}, {period for _, period in keys}
+            )
+            if (total.dealer_id, total.period) in keys
+        ]
+        PeriodTotalsService._replace(stale, totals)
+
+    @staticmethod
+    def rebuild(batch_size=200, log=None):
+        """Recompute every dealer's totals, batch_size dealers per transaction"""
+        dealer_ids = list(Dealer.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(dealer_ids), batch_size):
+            batch = dealer_ids[start:start + batch_size]
+            totals = PeriodTotalsService._compute(Q(dealer_id__in=batch), batch)
+            PeriodTotalsService._replace(Q(dealer_id__in=batch), totals)
+            if log:
+                log(f"{start + len(batch)}/{len(dealer_ids)} dealers")
+        return len(dealer_ids)
+
+    @staticmethod
+    def _replace(stale, totals):
+        """Upsert totals and delete the rows matching stale that are no longer produced.
+
+        An upsert rather than delete-then-insert, so two transactions
+        recomputing the same pair at once cannot collide on the unique key.
+        """
+        produced = {(t.dealer_id, t.period, t.product) for t in totals}
+        with transaction.atomic():
+            gone = [
+                row['id'] for row in DealerPeriodTotal.objects.filter(stale).values('id', 'dealer_id', 'period', 'product')
+                if (row['dealer_id'], row['period'], row['product']) not in produced
+            ]
+            DealerPeriodTotal.objects.filter(id__in=gone).delete()
+            DealerPeriodTotal.objects.bulk_create(
+                totals,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['dealer', 'period', 'product'],
+                update_fields=['branch_id', 'total', 'updated_at'],
+            )
+
+    @staticmethod
+    def _compute(condition, dealer_ids, periods=None):
+        """Grouped totals of the supplies matching condition (which may use the
+        'day' annotation), plus the archived supplies of those dealers (and periods)"""
+        rows = (
+            ProductSupply.objects
+            .annotate(day=Coalesce('purchase_date', TruncDate('created_at')))
+            .filter(condition)
+            .annotate(year=ExtractYear('day'), quarter=ExtractQuarter('day'), product=PeriodTotalsService.product_key())
+            .order_by()
+            .values('dealer_id', 'year', 'quarter', 'product')
+            .annotate(total=Sum('count'))
+        )
+        sums = {}
+        for row in rows:
+            key = (row['dealer_id'], f"{row['year']}-Q{row['quarter']}", row['product'])
+            sums[key] = row['total'] or 0
+        for dealer_id, period, product, total in supply_archive.period_totals(dealer_ids, periods):
+            key = (dealer_id, period, product)
+            sums[key] = sums.get(key, 0) + total
+
+        branches = dict(Dealer.objects.filter(id__in=dealer_ids).values_list('id', 'branch_id'))
+        return [
+            DealerPeriodTotal(
+                dealer_id=dealer_id,
+                branch_id=branches[dealer_id],
+                period=period,
+                product=product,
+                total=total,
+            )
+            for (dealer_id, period, product), total in sums.items()
+            # Dealers deleted in the same transaction have nothing left to total
+            if dealer_id in branches
+        ]
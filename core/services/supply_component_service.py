@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import ProductSupply, SupplyComponent
+
+FIELDS = tuple(SupplyComponent.KIND_FIELDS.values())
+
+
+class SupplyComponentService:
+    """Service class keeping the supply_components reverse index in step.
+
+    Single saves replace a supply's rows from the post_save signal when a
+    component column changed; bulk writes (stream, upsert) refresh the rows
+    of the serial numbers they wrote; ``backfill`` rebuilds everything in
+    chunks. Rows go away with their supply through the cascade.
+    """
+
+    @staticmethod
+    def components_of(values):
+        """{kind: normalized value} of a supply's non-empty component columns;
+        ``values`` is a ProductSupply or a dict with the component fields"""
+        get = values.get if isinstance(values, dict) else lambda field: getattr(values, field)
+        components = {}
+        for kind, field in SupplyComponent.KIND_FIELDS.items():
+            value = SupplyComponent.normalize(get(field))
+            if value:
+                components[kind] = value
+        return components
+
+    @staticmethod
+    def replace(supply_id, components, created=False):
+        """Write one supply's components; a new supply has nothing to delete"""
+        if not created:
+            SupplyComponent.objects.filter(supply_id=supply_id).delete()
+        SupplyComponent.objects.bulk_create(
+            SupplyComponent(supply_id=supply_id, kind=kind, value=value) for kind, value in components.items()
+        )
+
+    @staticmethod
+    def refresh(supplies):
+        """Rebuild the components of a ProductSupply queryset: one select, one delete, one insert"""
+        rows = list(supplies.order_by().values('id', *FIELDS))
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            SupplyComponent.objects.filter(supply_id__in=ids).delete()
+            SupplyComponent.objects.bulk_create(
+                (
+                    SupplyComponent(supply_id=row['id'], kind=kind, value=value)
+                    for row in rows
+                    for kind, value in SupplyComponentService.components_of(row).items()
+                ),
+                batch_size=1000,
+            )
+        return len(rows)
+
+    @staticmethod
+    def refresh_serials(serial_numbers):
+        """Rebuild the components of the supplies with these serial numbers (after bulk writes)"""
+        return SupplyComponentService.refresh(ProductSupply.objects.filter(serial_number__in=serial_numbers))
+
+    @staticmethod
+    def backfill(batch_size=2000, start_id=0, log=None):
+        """Rebuild the index for every supply with id > start_id, batch_size supplies per transaction"""
+        last_id = start_id
+        done = 0
+        while True:
+            ids = list(
+                ProductSupply.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return done
+            done += SupplyComponentService.refresh(ProductSupply.objects.filter(id__gte=ids[0], id__lte=ids[-1]))
+            last_id = ids[-1]
+            if log:
+                log(f"{done} supplies indexed (last id {last_id})")
+
+    @staticmethod
+    def duplicated(kind=None):
+        """(kind, value) pairs found on more than one supply, most repeated first"""
+        components = SupplyComponent.objects.all()
+        if kind:
+            components = components.filter(kind=kind)
+        return (
+            components
+            .values('kind', 'value')
+            .annotate(supply_count=Count('supply_id'))
+            .filter(supply_count__gt=1)
+            .order_by('-supply_count', 'kind', 'value')
+        )
@@ -0,0 +1,158 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from pydantic import ValidationError
+
+from core.archive import supply_archive
+from core.cache import creator_ns, dealer_ns, invalidate
+from core.models import Dealer, ProductSupply
+from core.schemas import ProductSupplySchema
+from core.services.period_totals_service import PeriodTotalsService
+from core.services.supply_component_service import SupplyComponentService
+
+logger = logging.getLogger(__name__)
+
+# A single NDJSON line longer than this is rejected without buffering the rest of it
+MAX_LINE_BYTES = 64 * 1024
+
+# Errors listed per chunk; the rest are only counted
+MAX_ERRORS_PER_CHUNK = 50
+
+
+class SupplyStreamService:
+    """Service class for NDJSON bulk supply ingestion.
+
+    Lines are read from the request stream, validated and inserted in chunks
+    of ``SUPPLY_STREAM_CHUNK_SIZE``. Each chunk commits in its own
+    transaction, so memory and lock time stay bounded by the chunk size no
+    matter how large the upload is. Invalid lines are skipped and reported;
+    they do not roll back the rest of their chunk.
+    """
+
+    @staticmethod
+    def chunk_size():
+        return getattr(settings, 'SUPPLY_STREAM_CHUNK_SIZE', 1000)
+
+    @staticmethod
+    def read_lines(stream):
+        """Yield (line_number, raw_line_or_error) pairs without reading the whole body"""
+        line_number = 0
+        while True:
+            raw = stream.readline(MAX_LINE_BYTES + 1)
+            if not raw:
+                return
+            line_number += 1
+            if len(raw) > MAX_LINE_BYTES and not raw.endswith(b'\n'):
+                # Drain the oversized line so the next one starts cleanly
+                while raw and not raw.endswith(b'\n'):
+                    raw = stream.readline(MAX_LINE_BYTES)
+                yield line_number, ValueError(f"Line exceeds {MAX_LINE_BYTES} bytes")
+                continue
+            if raw.strip():
+                yield line_number, raw
+
+    @staticmethod
+    def ingest(stream, scope, user_id):
+        """Yield one progress dict per committed chunk, then a summary dict"""
+        totals = {'lines': 0, 'created': 0, 'failed': 0, 'chunks': 0}
+        chunk = []
+        for line_number, raw in SupplyStreamService.read_lines(stream):
+            totals['lines'] = line_number
+            chunk.append((line_number, raw))
+            if len(chunk) >= SupplyStreamService.chunk_size():
+                yield SupplyStreamService._commit_chunk(chunk, scope, user_id, totals)
+                chunk = []
+        if chunk:
+            yield SupplyStreamService._commit_chunk(chunk, scope, user_id, totals)
+        yield dict(totals, done=True)
+
+    @staticmethod
+    def _commit_chunk(chunk, scope, user_id, totals):
+        totals['chunks'] += 1
+        errors = []
+        items = []
+        for line_number, raw in chunk:
+            if isinstance(raw, Exception):
+                errors.append((line_number, str(raw)))
+                continue
+            try:
+                items.append((line_number, ProductSupplySchema.model_validate_json(raw)))
+            except ValidationError as e:
+                errors.append((line_number, '; '.join(
+                    f"{'.'.join(str(p) for p in err['loc']) or 'body'}: {err['msg']}" for err in e.errors()
+                )))
+
+        # One query each for the chunk's dealers and already-used serial numbers
+        dealers = {
+            d['id']: d for d in Dealer.objects
+            .filter(id__in={item.dealer for _, item in items}, is_deleting=False)
+            .values('id', 'name', 'branch_id')
+        }
+        serial_numbers = [item.serial_number for _, item in items]
+        existing_serials = set(
+            ProductSupply.objects
+            .filter(serial_number__in=serial_numbers)
+            .values_list('serial_number', flat=True)
+        ) | supply_archive.archived_serials(serial_numbers)
+
+        supplies = []
+        for line_number, item in items:
+            payload = item.dict()
+            dealer_id = payload.pop('dealer')
+            branch_id = payload.pop('branch')
+            dealer = dealers.get(dealer_id)
+            if dealer is None:
+                errors.append((line_number, f"Dealer with ID {dealer_id} not found"))
+            elif dealer['branch_id'] != branch_id:
+                errors.append((line_number, (
+                    f"Dealer '{dealer['name']}' belongs to branch ID {dealer['branch_id']}, "
+                    f"not the specified branch (ID: {branch_id})"
+                )))
+            elif not scope.is_admin and scope.dealer_id != dealer_id:
+                errors.append((line_number, f"Not allowed to add supply for dealer '{dealer['name']}'"))
+            elif item.serial_number in existing_serials:
+                errors.append((line_number, f"Serial number '{item.serial_number}' already exists"))
+            else:
+                existing_serials.add(item.serial_number)
+                supply = ProductSupply(dealer_id=dealer_id, created_by_id=user_id, **payload)
+                # bulk_create skips save(), which normally fills the hash
+                supply.content_hash = supply.compute_content_hash()
+                supplies.append(supply)
+
+        created = 0
+        if supplies:
+            try:
+                with transaction.atomic():
+                    ProductSupply.objects.bulk_create(supplies)
+                    # bulk_create sends no signals
+                    PeriodTotalsService.mark_dirty(
+                        PeriodTotalsService.key_of(s.dealer_id, s.purchase_date, s.created_at) for s in supplies
+                    )
+                    invalidate(creator_ns(user_id), 'supplies', *{dealer_ns(s.dealer_id) for s in supplies})
+                    SupplyComponentService.refresh_serials([s.serial_number for s in supplies])
+                created = len(supplies)
+            except IntegrityError as e:
+                # Lost a race on a serial number: the whole chunk is rolled back
+                logger.warning("Supply stream chunk %s rolled back: %s", totals['chunks'], e)
+                errors.append((chunk[0][0], f"Chunk rolled back: {e}"))
+
+        failed = len(chunk) - created
+        totals['created'] += created
+        totals['failed'] += failed
+        errors.sort()
+        return {
+            'chunk': totals['chunks'],
+            'first_line': chunk[0][0],
+            'last_line': chunk[-1][0],
+            'created': created,
+            'failed': failed,
+            'errors': [{'line': line, 'error': error} for line, error in errors[:MAX_ERRORS_PER_CHUNK]],
+            'total_created': totals['created'],
+        }
+
+    @staticmethod
+    def to_ndjson(results):
+        for result in results:
+            yield json.dumps(result) + '\n'
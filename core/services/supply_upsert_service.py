@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from core.archive import supply_archive
+from core.cache import creator_ns, dealer_ns, invalidate
+from core.models import Dealer, ProductSupply
+from core.services.partition_service import SupplyPartitionService
+from core.services.period_totals_service import PeriodTotalsService
+from core.services.supply_component_service import SupplyComponentService
+from core.sync import record_moves
+
+BATCH_SIZE = 500
+
+
+class SupplyUpsertService:
+    """Service class for bulk insert-or-update of supplies keyed on serial_number.
+
+    Rows whose content hash matches the stored one are counted as unchanged
+    and not written at all; the rest go through one
+    ``INSERT ... ON CONFLICT (serial_number) DO UPDATE`` per batch. A
+    partitioned product_supplies has no unique index on serial_number to
+    conflict on, so there new rows are inserted and known ones updated by id.
+    """
+
+    # Columns overwritten when the serial number already exists; created_at
+    # and created_by keep the values of the original insert
+    UPDATE_FIELDS = [
+        'dealer' if field == 'dealer_id' else field
+        for field in ProductSupply.CONTENT_FIELDS if field != 'serial_number'
+    ] + ['content_hash', 'updated_at']
+
+    @staticmethod
+    def build(items, user):
+        """Validate the payload and return unsaved ProductSupply objects"""
+        duplicates = sorted(s for s, n in Counter(item.serial_number for item in items).items() if n > 1)
+        if duplicates:
+            raise HttpError(400, f"Duplicate serial numbers in payload: {', '.join(duplicates[:20])}")
+        archived = supply_archive.archived_serials(item.serial_number for item in items)
+        if archived:
+            raise HttpError(400, f"Serial numbers used by archived supplies: {', '.join(sorted(archived)[:20])}")
+
+        dealers = {
+            d['id']: d for d in Dealer.objects
+            .filter(id__in={item.dealer for item in items}, is_deleting=False)
+            .values('id', 'name', 'branch_id')
+        }
+        supplies = []
+        for item in items:
+            payload = item.dict()
+            dealer_id = payload.pop('dealer')
+            branch_id = payload.pop('branch')
+            dealer = dealers.get(dealer_id)
+            if dealer is None:
+                raise HttpError(404, f"Dealer with ID {dealer_id} not found")
+            if dealer['branch_id'] != branch_id:
+                raise HttpError(
+                    400,
+                    f"Dealer '{dealer['name']}' belongs to branch ID {dealer['branch_id']}, "
+                    f"not the specified branch (ID: {branch_id}) for serial '{item.serial_number}'"
+                )
+            supply = ProductSupply(dealer_id=dealer_id, created_by=user, **payload)
+            supply.content_hash = supply.compute_content_hash()
+            supplies.append(supply)
+        return supplies
+
+    @staticmethod
+    def upsert(supplies):
+        """Write new and changed supplies; return inserted/updated/unchanged counts"""
+        stored = {
+            row['serial_number']: row for row in
+            ProductSupply.objects
+            .filter(serial_number__in=[s.serial_number for s in supplies])
+            .values('id', 'serial_number', 'content_hash', 'dealer_id', 'purchase_date', 'created_at')
+        }
+        changed = [
+            s for s in supplies
+            if s.serial_number not in stored or stored[s.serial_number]['content_hash'] != s.content_hash
+        ]
+        inserted = sum(1 for s in changed if s.serial_number not in stored)
+
+        # bulk_create sends no signals: refresh the periods rows move out of and into
+        period_keys = set()
+        namespaces = {'supplies'}
+        for s in changed:
+            old = stored.get(s.serial_number)
+            if old:
+                period_keys.add(PeriodTotalsService.key_of(old['dealer_id'], old['purchase_date'], old['created_at']))
+                namespaces.add(dealer_ns(old['dealer_id']))
+            period_keys.add(PeriodTotalsService.key_of(
+                s.dealer_id, s.purchase_date, old['created_at'] if old else None
+            ))
+            namespaces.update((dealer_ns(s.dealer_id), creator_ns(s.created_by_id)))
+
+        partitioned = SupplyPartitionService.is_partitioned()
+        with transaction.atomic():
+            for start in range(0, len(changed), BATCH_SIZE):
+                batch = changed[start:start + BATCH_SIZE]
+                if partitioned:
+                    SupplyUpsertService._write_by_id(batch, stored)
+                else:
+                    ProductSupply.objects.bulk_create(
+                        batch,
+                        update_conflicts=True,
+                        unique_fields=['serial_number'],
+                        update_fields=SupplyUpsertService.UPDATE_FIELDS,
+                    )
+                SupplyComponentService.refresh_serials([s.serial_number for s in batch])
+            record_moves(
+                (stored[s.serial_number]['id'], stored[s.serial_number]['dealer_id'], s.dealer_id)
+                for s in changed if s.serial_number in stored
+            )
+            PeriodTotalsService.mark_dirty(period_keys)
+            invalidate(*namespaces)
+
+        return {
+            'inserted': inserted,
+            'updated': len(changed) - inserted,
+            'unchanged': len(supplies) - len(changed),
+        }
+
+    @staticmethod
+    def _write_by_id(batch, stored):
+        """Insert the new serials and update the stored ones by primary key"""
+        now = timezone.now()
+        updates = []
+        for s in batch:
+            old = stored.get(s.serial_number)
+            if old:
+                s.id, s.created_at, s.updated_at = old['id'], old['created_at'], now
+                updates.append(s)
+        ProductSupply.objects.bulk_create([s for s in batch if s.serial_number not in stored])
+        ProductSupply.objects.bulk_update(updates, SupplyUpsertService.UPDATE_FIELDS)
@@ -0,0 +1,152 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .archive import is_archiving
+from .cache import branch_ns, creator_ns, dealer_ns, invalidate
+from .invalidation import publish
+from .models import AdminUser, Branch, Dealer, DealerPeriodTotal, ProductSupply, Role, SupplyComponent, Tombstone
+from .services.period_totals_service import PeriodTotalsService
+from .services.supply_component_service import SupplyComponentService
+from .sync import record_moves
+
+
+@receiver(post_delete, sender=Dealer)
+def dealer_deleted(sender, instance, **kwargs):
+    """Leave a tombstone so sync clients drop the dealer"""
+    Tombstone.objects.create(
+        entity=Tombstone.ENTITY_DEALER,
+        entity_id=instance.id,
+        dealer_id=instance.id,
+        creator_id=instance.created_by_id,
+    )
+
+
+@receiver(post_delete, sender=ProductSupply)
+def supply_deleted(sender, instance, **kwargs):
+    """Leave a tombstone so sync clients drop the supply (not when it is archived)"""
+    if is_archiving():
+        return
+    Tombstone.objects.create(
+        entity=Tombstone.ENTITY_SUPPLY,
+        entity_id=instance.id,
+        dealer_id=instance.dealer_id,
+        creator_id=instance.created_by_id,
+    )
+
+
+@receiver(pre_save, sender=ProductSupply)
+def supply_saving(sender, instance, **kwargs):
+    """Remember which period an edited supply counted towards, and its components, before the edit"""
+    if instance.pk is None:
+        return
+    old = (
+        ProductSupply.objects.filter(pk=instance.pk)
+        .values('dealer_id', 'purchase_date', 'created_at', *SupplyComponent.KIND_FIELDS.values())
+        .first()
+    )
+    if old is None:
+        instance._old_period_key = None
+        return
+    instance._old_dealer_id = old['dealer_id']
+    instance._old_period_key = PeriodTotalsService.key_of(old['dealer_id'], old['purchase_date'], old['created_at'])
+    instance._old_components = SupplyComponentService.components_of(old)
+
+
+@receiver(post_save, sender=ProductSupply)
+def supply_saved(sender, instance, **kwargs):
+    """Refresh the dealer's period totals once the transaction commits"""
+    keys = {PeriodTotalsService.key_of(instance.dealer_id, instance.purchase_date, instance.created_at)}
+    if getattr(instance, '_old_period_key', None):
+        keys.add(instance._old_period_key)
+    PeriodTotalsService.mark_dirty(keys)
+
+
+@receiver(post_save, sender=ProductSupply)
+def supply_moved(sender, instance, created, **kwargs):
+    """Let the old dealer's sync clients drop a supply moved to another dealer"""
+    old_dealer_id = getattr(instance, '_old_dealer_id', None)
+    if not created and old_dealer_id is not None:
+        record_moves([(instance.pk, old_dealer_id, instance.dealer_id)])
+
+
+@receiver(post_save, sender=ProductSupply)
+def supply_components_saved(sender, instance, created, **kwargs):
+    """Keep the component reverse index in step when a component number changes"""
+    components = SupplyComponentService.components_of(instance)
+    if created or components != getattr(instance, '_old_components', None):
+        SupplyComponentService.replace(instance.pk, components, created=created)
+
+
+@receiver(post_delete, sender=ProductSupply)
+def supply_deleted_totals(sender, instance, **kwargs):
+    if is_archiving():
+        return
+    PeriodTotalsService.mark_dirty(
+        [PeriodTotalsService.key_of(instance.dealer_id, instance.purchase_date, instance.created_at)]
+    )
+
+
+@receiver(pre_save, sender=Dealer)
+def dealer_saving(sender, instance, **kwargs):
+    """Remember the branch of an edited dealer, in case the edit moves it"""
+    if instance.pk is not None:
+        instance._old_branch_id = Dealer.objects.filter(pk=instance.pk).values_list('branch_id', flat=True).first()
+
+
+@receiver(post_save, sender=Dealer)
+def dealer_saved(sender, instance, created, **kwargs):
+    """Keep the denormalized branch of a moved dealer's totals in step"""
+    old_branch_id = getattr(instance, '_old_branch_id', None)
+    if old_branch_id is not None and old_branch_id != instance.branch_id:
+        DealerPeriodTotal.objects.filter(dealer_id=instance.id).update(branch_id=instance.branch_id)
+
+
+# ============================================================================
+# Response cache invalidation (core/cache.py)
+# ============================================================================
+
+@receiver(post_save, sender=Dealer)
+@receiver(post_delete, sender=Dealer)
+def dealer_changed(sender, instance, **kwargs):
+    namespaces = [dealer_ns(instance.id), branch_ns(instance.branch_id), creator_ns(instance.created_by_id), 'dealers']
+    if getattr(instance, '_old_branch_id', None):
+        namespaces.append(branch_ns(instance._old_branch_id))
+    invalidate(*namespaces)
+
+
+@receiver(post_save, sender=ProductSupply)
+@receiver(post_delete, sender=ProductSupply)
+def supply_changed(sender, instance, **kwargs):
+    namespaces = [dealer_ns(instance.dealer_id), creator_ns(instance.created_by_id), 'supplies']
+    old_key = getattr(instance, '_old_period_key', None)
+    if old_key:
+        namespaces.append(dealer_ns(old_key[0]))
+    invalidate(*namespaces)
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def branch_changed(sender, instance, **kwargs):
+    invalidate(branch_ns(instance.id), creator_ns(instance.created_by_id), 'branches')
+
+
+# ============================================================================
+# Cross-worker invalidation of in-process caches (core/invalidation.py)
+# ============================================================================
+
+INVALIDATED_ENTITIES = {Role: 'role', Branch: 'branch', AdminUser: 'user', Dealer: 'dealer'}
+
+# Saves touching only these fields change nothing an in-process cache holds
+# (a login stamps last_login on every sign-in)
+UNCACHED_FIELDS = {AdminUser: {'last_login'}}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def entity_changed(sender, instance, update_fields=None, **kwargs):
+    entity = INVALIDATED_ENTITIES.get(sender)
+    if entity is None:
+        return
+    if update_fields and set(update_fields) <= UNCACHED_FIELDS.get(sender, set()):
+        return
+    publish(entity, instance.pk)
@@ -0,0 +1,206 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from .models import Dealer, ProductSupply, Tombstone
+from .scope import Scope, scoped_queryset
+
+# Cursor keys for the three change streams
+DEALERS = 'd'
+SUPPLIES = 's'
+TOMBSTONES = 't'
+# Present in cursors ordered by transaction id (Postgres): when tombstones were read up to
+TOMBSTONES_AT = 'x'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(positions: dict, tombstones_at: Optional[datetime] = None) -> str:
+    """Pack per-stream positions into an opaque token: (timestamp, id) pairs,
+    or (transaction id, id) pairs plus the time tombstones were read up to"""
+    payload = {
+        key: [value.isoformat() if isinstance(value, datetime) else value, pk]
+        for key, (value, pk) in positions.items()
+    }
+    if tombstones_at is not None:
+        payload[TOMBSTONES_AT] = tombstones_at.isoformat()
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[dict, Optional[datetime]]:
+    """Unpack a token produced by encode_cursor into (positions, tombstones_at),
+    raising 400 if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        tombstones_at = datetime.fromisoformat(payload[TOMBSTONES_AT]) if TOMBSTONES_AT in payload else None
+        parse = datetime.fromisoformat if tombstones_at is None else int
+        positions = {
+            key: (parse(payload[key][0]), int(payload[key][1]))
+            for key in (DEALERS, SUPPLIES, TOMBSTONES)
+        }
+    except (ValueError, KeyError, TypeError, IndexError, OverflowError):
+        raise HttpError(400, "Invalid sync cursor")
+    # Naive timestamps cannot be compared with the horizon; ids must fit a bigint
+    if tombstones_at is None:
+        times, ids = [value for value, _ in positions.values()], [pk for _, pk in positions.values()]
+    else:
+        times, ids = [tombstones_at], [number for position in positions.values() for number in position]
+    if any(timezone.is_naive(value) for value in times) or not all(0 <= number < 2 ** 63 for number in ids):
+        raise HttpError(400, "Invalid sync cursor")
+    return positions, tombstones_at
+
+
+def initial_positions(start, horizon) -> dict:
+    """Start of a full sync: every live row, no tombstones from before the horizon"""
+    return {
+        DEALERS: (start, 0),
+        SUPPLIES: (start, 0),
+        TOMBSTONES: (horizon, 0),
+    }
+
+
+def transaction_horizon() -> Optional[int]:
+    """Newest transaction id below every transaction still running (Postgres):
+    rows stamped with a sync_xid up to it are committed and will not change
+    behind a cursor. None on other databases."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot()) - 1')
+        return cursor.fetchone()[0]
+
+
+def _page(queryset: QuerySet, field: str, position: tuple, horizon, limit: int):
+    """One page of rows strictly after (timestamp or transaction id, id) up to the horizon.
+
+    Returns the rows, the new stream position and whether more rows remain.
+    An exhausted stream moves up to the horizon, so the position of a quiet
+    stream (usually tombstones) keeps pace with the clock and the cursor
+    only expires when the client stops syncing.
+    """
+    ts, pk = position
+    rows = list(
+        queryset
+        .filter(Q(**{f'{field}__gt': ts}) | Q(**{field: ts, 'id__gt': pk}))
+        .filter(**{f'{field}__lte': horizon})
+        .order_by(field, 'id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = (getattr(rows[-1], field), rows[-1].id)
+    if not has_more and position[0] < horizon:
+        # Nothing is left at or before the horizon, so no id there was passed over
+        position = (horizon, 0)
+    return rows, position, has_more
+
+
+def synced_dealers(scope: Scope) -> QuerySet:
+    """Dealers a client keeps locally: admins as in details, dealer users their own profile"""
+    if scope.is_admin:
+        return scoped_queryset(Dealer, scope)
+    if scope.dealer_id is None:
+        return Dealer.objects.none()
+    return Dealer.objects.filter(id=scope.dealer_id, is_deleting=False)
+
+
+def scoped_tombstones(scope: Scope) -> QuerySet:
+    """Tombstones filtered with the same rules as the live rows"""
+    if scope.is_superuser:
+        return Tombstone.objects.filter(moved=False)
+    if scope.is_staff:
+        return Tombstone.objects.filter(creator_id=scope.user_id, moved=False)
+    if scope.dealer_id is None:
+        return Tombstone.objects.none()
+    return Tombstone.objects.filter(dealer_id=scope.dealer_id)
+
+
+def record_moves(moves) -> None:
+    """Tombstone supplies that moved to another dealer for the old dealer's clients.
+
+    ``moves`` holds (supply id, old dealer id, new dealer id) triples. A
+    supply moving back drops the tombstone its new dealer got earlier, so
+    those clients do not delete it again on their next sync.
+    """
+    moves = [(pk, old, new) for pk, old, new in moves if old != new]
+    if not moves:
+        return
+    returned = Q()
+    for pk, _, new in moves:
+        returned |= Q(entity_id=pk, dealer_id=new)
+    Tombstone.objects.filter(returned, entity=Tombstone.ENTITY_SUPPLY, moved=True).delete()
+    Tombstone.objects.bulk_create([
+        Tombstone(entity=Tombstone.ENTITY_SUPPLY, entity_id=pk, dealer_id=old, moved=True)
+        for pk, old, _ in moves
+    ])
+
+
+def collect_changes(scope: Scope, cursor: Optional[str], limit: int) -> dict:
+    """Return rows changed and deleted since the cursor, plus the next cursor.
+
+    On Postgres rows are ordered by the transaction that last wrote them
+    (sync_xid, stamped by a trigger) and only transactions older than every
+    one still running are returned, so a write cannot commit behind the
+    cursor however long its transaction takes. Elsewhere rows are ordered
+    by updated_at and only those older than ``SYNC_SAFETY_LAG_SECONDS`` are
+    returned.
+    """
+    now = timezone.now()
+    xid_horizon = transaction_horizon()
+    if xid_horizon is None:
+        field, tombstone_field = 'updated_at', 'deleted_at'
+        horizon = now - timedelta(seconds=getattr(settings, 'SYNC_SAFETY_LAG_SECONDS', 2))
+        start = EPOCH
+    else:
+        field = tombstone_field = 'sync_xid'
+        horizon = xid_horizon
+        start = 0
+
+    if cursor:
+        positions, tombstones_at = decode_cursor(cursor)
+        if (tombstones_at is None) != (xid_horizon is None):
+            # Issued under the other ordering (before the database was migrated)
+            raise HttpError(410, "Sync cursor expired, perform a full sync")
+    else:
+        positions = initial_positions(start, horizon)
+        tombstones_at = None if xid_horizon is None else now
+
+    retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    read_up_to = positions[TOMBSTONES][0] if tombstones_at is None else tombstones_at
+    if read_up_to < now - retention:
+        raise HttpError(410, "Sync cursor expired, perform a full sync")
+
+    dealers, positions[DEALERS], more_dealers = _page(
+        synced_dealers(scope),
+        field, positions[DEALERS], horizon, limit,
+    )
+    supplies, positions[SUPPLIES], more_supplies = _page(
+        scoped_queryset(ProductSupply, scope).select_related('dealer'),
+        field, positions[SUPPLIES], horizon, limit,
+    )
+    tombstones, positions[TOMBSTONES], more_tombstones = _page(
+        scoped_tombstones(scope),
+        tombstone_field, positions[TOMBSTONES], horizon, limit,
+    )
+    if tombstones_at is not None:
+        if not more_tombstones:
+            tombstones_at = now
+        elif tombstones:
+            tombstones_at = tombstones[-1].deleted_at
+
+    return {
+        'dealers': dealers,
+        'supplies': supplies,
+        'deleted': tombstones,
+        'cursor': encode_cursor(positions, tombstones_at),
+        'has_more': more_dealers or more_supplies or more_tombstones,
+    }
@@ -0,0 +1,73 @@
+import json
+
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.auth import get_tokens_for_user
+from core.invalidation import evict_all
+from core.models import AdminUser, Branch, Dealer, ProductSupply
+
+# Per-process caches: the suite runs in one process, and the invalidation
+# bus would start a LISTEN thread on Postgres. Fixture passwords need no
+# slow hashing.
+TEST_SETTINGS = override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+        'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-responses'},
+    },
+    INVALIDATION_BUS_ENABLED=False,
+    SYNC_SAFETY_LAG_SECONDS=0,
+)
+
+
+class ApiFixtures:
+    """A staff user, a superuser, one branch and a dealer with its own login"""
+
+    def setUp(self):
+        super().setUp()
+        # Rolled-back rows reuse ids, so nothing cached may outlive a test
+        for alias in ('default', 'responses'):
+            caches[alias].clear()
+        evict_all()
+
+        self.superuser = AdminUser.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.staff = AdminUser.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.branch = Branch.objects.create(name='North', created_by=self.staff)
+        self.dealer_user = AdminUser.objects.create_user('+919876543210', 'dealer@example.com', 'pw')
+        self.dealer = self.create_dealer('Shree Motors', '+91 98765-43210', user=self.dealer_user)
+
+    def create_dealer(self, name, mobile_number, **fields):
+        return Dealer.objects.create(
+            name=name, mobile_number=mobile_number, address_line1='-',
+            branch=self.branch, created_by=self.staff, **fields,
+        )
+
+    def create_supply(self, serial_number, dealer=None, **fields):
+        return ProductSupply.objects.create(
+            dealer=dealer or self.dealer,
+            product_name=fields.pop('product_name', 'Vehicle'),
+            invoice_number=f'INV-{serial_number}',
+            serial_number=serial_number,
+            created_by=self.staff,
+            **fields,
+        )
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {get_tokens_for_user(user).access_token}'}
+
+    def get(self, path, user, **params):
+        return self.client.get(path, params, **self.auth(user))
+
+    def post(self, path, data, user, **headers):
+        return self.client.post(path, json.dumps(data), content_type='application/json', **self.auth(user), **headers)
+
+
+@TEST_SETTINGS
+class ApiTestCase(ApiFixtures, TestCase):
+    pass
+
+
+@TEST_SETTINGS
+class ApiTransactionTestCase(ApiFixtures, TransactionTestCase):
+    """For code that reads what other transactions committed (delta sync)"""
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from core.admin import ProductSupplyAdmin
+from core.models import ProductSupply
+
+from .base import ApiTestCase
+
+CHANGELIST = '/admin/core/productsupply/'
+
+
+@mock.patch('core.admin.PERFORMANCE_MODE', True)
+@mock.patch.object(ProductSupplyAdmin, 'list_per_page', 2)
+class CursorChangeListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.supplies = [self.create_supply(f'SN-{i}') for i in range(5)]
+        for age, supply in enumerate(self.supplies):
+            ProductSupply.objects.filter(id=supply.id).update(created_at=now - timedelta(minutes=age))
+        self.client.force_login(self.superuser)
+
+    def changelist(self, query=''):
+        response = self.client.get(CHANGELIST + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def ids(self, cl):
+        return [supply.id for supply in cl.result_list]
+
+    def test_pages_walk_forward_and_back_by_keyset(self):
+        expected = [supply.id for supply in self.supplies]
+
+        first = self.changelist()
+        self.assertEqual(self.ids(first), expected[:2])
+        self.assertIsNone(first.previous_page_url)
+        self.assertEqual(first.result_count, 5)
+
+        second = self.changelist(first.next_page_url)
+        self.assertEqual(self.ids(second), expected[2:4])
+
+        last = self.changelist(second.next_page_url)
+        self.assertEqual(self.ids(last), expected[4:])
+        self.assertIsNone(last.next_page_url)
+
+        back = self.changelist(last.previous_page_url)
+        self.assertEqual(self.ids(back), expected[2:4])
+        self.assertEqual(self.ids(self.changelist(back.previous_page_url)), expected[:2])
+
+    def test_sorting_by_a_column_falls_back_to_page_numbers(self):
+        cl = self.changelist('?o=6')
+        self.assertFalse(cl.cursor_mode)
+        self.assertEqual(len(cl.result_list), 2)
+
+    def test_search_by_serial_prefix(self):
+        self.create_supply('OTHER-1')
+        cl = self.changelist('?q=SN-')
+        self.assertEqual(self.ids(cl), [supply.id for supply in self.supplies[:2]])
+        self.assertEqual(cl.result_count, 5)
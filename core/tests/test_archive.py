@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from core.models import ProductSupply, Tombstone
+
+from .base import ApiTestCase
+
+
+class ArchiveReadThroughTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, True)
+        settings_override = override_settings(SUPPLY_ARCHIVE_DIR=archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.recent = self.create_supply('SN-NEW')
+        old = self.create_supply('SN-OLD', battery_number='BAT-1')
+        ProductSupply.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=4000))
+        self.old_id = old.id
+        call_command('archive_supplies', pause=0, stdout=StringIO())
+
+    def test_archived_supply_leaves_the_table_without_a_tombstone(self):
+        self.assertFalse(ProductSupply.objects.filter(id=self.old_id).exists())
+        self.assertTrue(ProductSupply.objects.filter(id=self.recent.id).exists())
+        self.assertFalse(Tombstone.objects.filter(entity_id=self.old_id).exists())
+
+    def test_lookup_by_serial_falls_back_to_the_archive(self):
+        response = self.get('/api/core/supplies/by-serial', self.staff, serial_number='SN-OLD')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['id'], data['archived'], data['battery_number']), (self.old_id, True, 'BAT-1'))
+
+    def test_dealer_history_continues_into_the_archive(self):
+        response = self.get(f'/api/core/dealers/{self.dealer.id}/supplies', self.staff, page_size=10)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [(s['serial_number'], s['archived']) for s in body['data']],
+            [('SN-NEW', False), ('SN-OLD', True)],
+        )
+        self.assertEqual(body['pagination']['count'], 2)
+
+    def test_archived_serial_number_stays_reserved(self):
+        item = {
+            'dealer': self.dealer.id, 'branch': self.branch.id, 'product_name': 'Vehicle',
+            'invoice_number': 'INV-2', 'serial_number': 'SN-OLD',
+        }
+        response = self.post('/api/core/supplies', [item], self.staff)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductSupply.objects.filter(serial_number='SN-OLD').exists())
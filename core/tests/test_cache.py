@@ -0,0 +1,46 @@
+from django.db import transaction
+
+from core.cache import invalidate
+
+from .base import ApiTestCase
+
+
+class ResponseCacheTests(ApiTestCase):
+    def details(self):
+        response = self.get(f'/api/core/dealers/{self.dealer.id}/details', self.staff)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_repeated_read_is_served_from_the_cache(self):
+        self.create_supply('SN-1')
+        first = self.details()
+        with self.assertNumQueries(0):
+            second = self.details()
+        self.assertEqual(second, first)
+
+    def test_committed_write_invalidates_the_cached_response(self):
+        self.details()
+        # Its own savepoint, so the bumps are not merged into setUp's pending ones
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.dealer.name = 'Shree Motors Ltd'
+            self.dealer.save()
+            self.create_supply('SN-1')
+        data = self.details()
+        self.assertEqual(data['dealer']['name'], 'Shree Motors Ltd')
+        self.assertEqual(len(data['purchases']), 1)
+
+    def test_rolled_back_write_keeps_the_cached_response(self):
+        before = self.details()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_supply('SN-1')
+                transaction.set_rollback(True)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.details(), before)
+
+    def test_one_transaction_queues_one_bump(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                invalidate('dealers')
+                invalidate('branches', 'dealers')
+        self.assertEqual(len(callbacks), 1)
@@ -0,0 +1,31 @@
+from core.models import Branch
+
+from .base import ApiTestCase
+
+
+class IdempotencyTests(ApiTestCase):
+    def test_retry_replays_the_stored_response(self):
+        body = {'name': 'South', 'address': 'Main road'}
+        first = self.post('/api/core/branches', body, self.staff, HTTP_IDEMPOTENCY_KEY='branch-1')
+        retry = self.post('/api/core/branches', body, self.staff, HTTP_IDEMPOTENCY_KEY='branch-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Branch.objects.filter(name='South').count(), 1)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.post('/api/core/branches', {'name': 'South', 'address': 'x'}, self.staff, HTTP_IDEMPOTENCY_KEY='branch-1')
+        response = self.post('/api/core/branches', {'name': 'East', 'address': 'x'}, self.staff, HTTP_IDEMPOTENCY_KEY='branch-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Branch.objects.filter(name='East').exists())
+
+    def test_keys_are_per_user(self):
+        body = {'name': 'South', 'address': 'x'}
+        self.post('/api/core/branches', body, self.staff, HTTP_IDEMPOTENCY_KEY='branch-1')
+        response = self.post('/api/core/branches', body, self.superuser, HTTP_IDEMPOTENCY_KEY='branch-1')
+
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Branch.objects.filter(name='South').count(), 2)
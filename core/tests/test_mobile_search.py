@@ -0,0 +1,43 @@
+from core.models import Dealer
+
+from .base import ApiTestCase
+
+
+class MobileSearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_dealer('Ganesh Autos', '9000012399')
+
+    def matches(self, term):
+        return set(Dealer.objects.filter(Dealer.mobile_search(term)).values_list('id', flat=True))
+
+    def test_formatting_is_ignored(self):
+        for term in ('43210', '98765 43210', '+91 98765-43210', '(91) 98765'):
+            self.assertEqual(self.matches(term), {self.dealer.id}, term)
+
+    def test_digits_match_the_start_or_the_end_only(self):
+        self.assertEqual(self.matches('9'), {self.dealer.id, self.other.id})
+        self.assertEqual(self.matches('99'), {self.other.id})
+        self.assertEqual(self.matches('765432'), set())
+
+    def test_range_bounds_around_trailing_nines(self):
+        # Upper bound '90000124' for the prefix '9000012399'
+        self.assertEqual(self.matches('9000012399'), {self.other.id})
+        # '99' reversed is all nines: a range with no upper bound
+        self.assertEqual(self.matches('399'), {self.other.id})
+        self.assertEqual(self.matches('0001'), set())
+
+    def test_words_are_not_numbers(self):
+        self.assertIsNone(Dealer.mobile_search('shree'))
+        self.assertIsNone(Dealer.mobile_search('A-12'))
+
+    def test_digits_follow_mobile_number_edits(self):
+        self.other.mobile_number = '+91 81234 56789'
+        self.other.save(update_fields=['mobile_number'])
+        self.assertEqual(self.matches('56789'), {self.other.id})
+
+    def test_dealer_list_search(self):
+        response = self.get('/api/core/dealers', self.staff, search='98765 43210')
+        self.assertEqual([d['id'] for d in response.json()['data']], [self.dealer.id])
+        response = self.get('/api/core/dealers', self.staff, search='ganesh')
+        self.assertEqual([d['id'] for d in response.json()['data']], [self.other.id])
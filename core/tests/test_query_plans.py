@@ -0,0 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class QueryPlanTests(TestCase):
+    def test_endpoint_queries_avoid_sequential_scans(self):
+        # Raises CommandError listing every plan that scans a large table
+        out = StringIO()
+        call_command('check_query_plans', seed=3000, stdout=out)
+        self.assertIn('query plan(s) OK', out.getvalue())
@@ -0,0 +1,77 @@
+from django.test import override_settings
+
+from core.models import Tombstone
+
+from .base import ApiTransactionTestCase
+
+
+class DeltaSyncTests(ApiTransactionTestCase):
+    def sync(self, user, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        response = self.get('/api/core/sync', user, **params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_cursor_returns_only_later_changes(self):
+        supply = self.create_supply('SN-1')
+        full = self.sync(self.dealer_user)
+        self.assertEqual([s['id'] for s in full['supplies']], [supply.id])
+        self.assertEqual([d['id'] for d in full['dealers']], [self.dealer.id])
+
+        unchanged = self.sync(self.dealer_user, full['cursor'])
+        self.assertEqual(unchanged['supplies'], [])
+        self.assertEqual(unchanged['dealers'], [])
+
+        supply.count = 3
+        supply.save()
+        changed = self.sync(self.dealer_user, unchanged['cursor'])
+        self.assertEqual([(s['id'], s['count']) for s in changed['supplies']], [(supply.id, 3)])
+
+    def test_pages_follow_the_cursor(self):
+        supplies = [self.create_supply(f'SN-{i}') for i in range(5)]
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            response = self.get('/api/core/sync', self.staff, limit=2, **({'cursor': cursor} if cursor else {}))
+            data = response.json()['data']
+            seen += [s['id'] for s in data['supplies']]
+            cursor, has_more = data['cursor'], data['has_more']
+        self.assertEqual(seen, [s.id for s in supplies])
+
+    def test_deleted_supply_leaves_a_tombstone(self):
+        supply = self.create_supply('SN-1')
+        cursors = {user: self.sync(user)['cursor'] for user in (self.dealer_user, self.staff, self.superuser)}
+        supply_id = supply.id
+        supply.delete()
+
+        for user, cursor in cursors.items():
+            deleted = self.sync(user, cursor)['deleted']
+            self.assertEqual([(t['entity'], t['id']) for t in deleted], [('supply', supply_id)])
+
+    def test_moved_supply_is_dropped_by_the_old_dealer_only(self):
+        other = self.create_dealer('Other Motors', '9000012345')
+        supply = self.create_supply('SN-1')
+        old_dealer = self.sync(self.dealer_user)['cursor']
+        superuser = self.sync(self.superuser)['cursor']
+
+        supply.dealer = other
+        supply.save()
+
+        self.assertEqual([t['id'] for t in self.sync(self.dealer_user, old_dealer)['deleted']], [supply.id])
+        changes = self.sync(self.superuser, superuser)
+        self.assertEqual(changes['deleted'], [])
+        self.assertEqual([s['id'] for s in changes['supplies']], [supply.id])
+
+        # Moving it back clears the tombstone its first dealer would otherwise keep
+        supply.dealer = self.dealer
+        supply.save()
+        self.assertFalse(Tombstone.objects.filter(entity_id=supply.id, dealer_id=self.dealer.id).exists())
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0)
+    def test_cursor_older_than_tombstone_retention_expires(self):
+        cursor = self.sync(self.staff)['cursor']
+        response = self.get('/api/core/sync', self.staff, cursor=cursor)
+        self.assertEqual(response.status_code, 410)
+
+    def test_malformed_cursor_is_rejected(self):
+        response = self.get('/api/core/sync', self.staff, cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
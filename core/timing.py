@@ -0,0 +1,114 @@
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from ninja.renderers import JSONRenderer
+
+# Only responses under this prefix get the header
+API_PREFIX = '/api/'
+
+
+class ServerTiming:
+    """Per-request phase durations (ms), rendered as a Server-Timing header"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.view_finished = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds * 1000
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - started)
+            self.queries += 1
+
+    def header(self):
+        self.add('total', time.perf_counter() - self.started)
+        entries = []
+        for name in ('auth', 'db', 'serialize', 'render', 'total'):
+            if name not in self.phases:
+                continue
+            entry = f"{name};dur={self.phases[name]:.1f}"
+            if name == 'db':
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+@contextmanager
+def timing_phase(request, name):
+    """Time a block into the request's Server-Timing; a no-op when timing is off"""
+    timing = getattr(request, 'server_timing', None)
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that records 'serialize' (response schema validation, from
+    the view returning to rendering starting) and 'render' (JSON encoding)"""
+
+    def render(self, request, data, *, response_status):
+        timing = getattr(request, 'server_timing', None)
+        if timing is None:
+            return super().render(request, data, response_status=response_status)
+        started = time.perf_counter()
+        if timing.view_finished is not None:
+            timing.add('serialize', started - timing.view_finished)
+        content = super().render(request, data, response_status=response_status)
+        timing.add('render', time.perf_counter() - started)
+        return content
+
+
+def instrument_api(api):
+    """Mark when each operation's view returns, so the renderer can split
+    response validation from the view itself. Call after all routers are added."""
+    for _, router in api._routers:
+        for path_view in router.path_operations.values():
+            for operation in path_view.operations:
+                operation.view_func = _mark_view_finished(operation.view_func)
+
+
+def _mark_view_finished(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        result = view_func(request, *args, **kwargs)
+        timing = getattr(request, 'server_timing', None)
+        if timing is not None:
+            timing.view_finished = time.perf_counter()
+        return result
+
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """Add a Server-Timing header (auth, db, serialize, render, total) to API responses"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SERVER_TIMING_ENABLED', False)
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith(API_PREFIX):
+            return self.get_response(request)
+
+        timing = request.server_timing = ServerTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.db_wrapper))
+            response = self.get_response(request)
+        response['Server-Timing'] = timing.header()
+        return response
@@ -1,19 +1,95 @@
-from typing import Type, TypeVar, List, Any
+import hashlib
+from typing import Type, TypeVar, List, Any, Callable, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from django.db.models import QuerySet
 from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from ninja import Schema
 from .responses import PaginationSchema, BaseResponseSchema, PaginatedResponseSchema
 
 T = TypeVar('T')
 
+# A count strategy returns (count, is_exact) for a queryset
+CountStrategy = Callable[[QuerySet], tuple[int, bool]]
+
+
+def exact_count(queryset: QuerySet) -> tuple[int, bool]:
+    """Plain COUNT(*)"""
+    return queryset.count(), True
+
+
+def estimated_count(queryset: QuerySet) -> tuple[int, bool]:
+    """Planner row estimate for an unfiltered queryset over a whole table.
+
+    Uses pg_class.reltuples on Postgres (summed over the partitions of a
+    partitioned table, whose own reltuples stays -1); falls back to an exact
+    count on other backends, for never-analyzed tables and below
+    PAGINATION_ESTIMATE_THRESHOLD rows where COUNT(*) is cheap anyway.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return exact_count(queryset)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            "  SELECT sum(p.reltuples)::bigint FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid "
+            "  WHERE i.inhparent = c.oid AND p.reltuples >= 0"
+            ") ELSE c.reltuples::bigint END "
+            "FROM pg_class c WHERE c.oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    estimate = row[0] if row else None
+    if estimate is None or estimate < settings.PAGINATION_ESTIMATE_THRESHOLD:
+        return exact_count(queryset)
+    return int(estimate), False
+
+
+def cached_count(queryset: QuerySet) -> tuple[int, bool]:
+    """COUNT(*) cached for PAGINATION_COUNT_CACHE_TTL seconds, keyed on the SQL.
+
+    Only a freshly computed count is reported as exact; one read from the
+    cache may be up to the TTL out of date.
+    """
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}|{params}".encode()).hexdigest()
+    key = f"count:{queryset.model._meta.db_table}:{digest}"
+
+    count = cache.get(key)
+    if count is not None:
+        return count, False
+    count = queryset.count()
+    cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+    return count, True
+
+
+class CountedPaginator(Paginator):
+    """Paginator whose total comes from a count strategy instead of COUNT(*)"""
+
+    def __init__(self, object_list, per_page, count_strategy: CountStrategy, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = self.count_strategy(self.object_list)
+        return count
+
+
 def paginate_queryset(
     queryset: QuerySet,
     page: int = 1,
     page_size: int = 10,
-    url_path: str = None
+    url_path: str = None,
+    count_strategy: Optional[CountStrategy] = None
 ) -> tuple[List[Any], PaginationSchema]:
     """Paginates a queryset and returns items and pagination info"""
-    paginator = Paginator(queryset, page_size)
+    paginator = CountedPaginator(queryset, page_size, count_strategy or exact_count)
     
     # Ensure page is within valid range
     page = min(max(1, page), paginator.num_pages)
@@ -25,14 +101,17 @@ def paginate_queryset(
     next_page = None
     prev_page = None
     if url_path:
+        # url_path may already carry the endpoint's own query parameters
+        separator = '&' if '?' in url_path else '?'
         if page_obj.has_next():
-            next_page = f"{url_path}?page={page_obj.next_page_number()}&page_size={page_size}"
+            next_page = f"{url_path}{separator}page={page_obj.next_page_number()}&page_size={page_size}"
         if page_obj.has_previous():
-            prev_page = f"{url_path}?page={page_obj.previous_page_number()}&page_size={page_size}"
+            prev_page = f"{url_path}{separator}page={page_obj.previous_page_number()}&page_size={page_size}"
 
     # Create pagination info
     pagination = PaginationSchema(
         count=paginator.count,
+        count_is_exact=paginator.count_is_exact,
         next=next_page,
         previous=prev_page,
         page_size=page_size,
@@ -52,4 +131,29 @@ def create_paginated_response(
         data=items,
         message=message,
         pagination=pagination
-    )
\ No newline at end of file
+    )
+
+def parse_id_list(raw: str, limit: int) -> List[int]:
+    """Distinct ids of a comma-separated ?ids= value, in the order given.
+
+    Raises ValueError when an entry is not an integer or there are more
+    than ``limit`` of them.
+    """
+    ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} ids per request")
+    return ids
+
+
+def fetch_by_ids(scoped: QuerySet, existing: QuerySet, ids: List[int]) -> tuple[list, List[int], List[int]]:
+    """Rows of ``scoped`` with these ids, in request order, plus the ids that
+    are missing and the ids that exist but fall outside the caller's scope.
+
+    One IN query on the scoped queryset; ``existing`` is only consulted for
+    the ids it did not return.
+    """
+    found = scoped.in_bulk(ids)
+    rest = [pk for pk in ids if pk not in found]
+    hidden = set(existing.filter(pk__in=rest).values_list('pk', flat=True)) if rest else set()
+    items = [found[pk] for pk in ids if pk in found]
+    return items, [pk for pk in rest if pk not in hidden], [pk for pk in rest if pk in hidden]
@@ -0,0 +1,24 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Do the one-off work the first request of a worker would otherwise pay for.
+
+    Safe to call before forking: it loads the URLconf (and with it every
+    router, view and Ninja/pydantic schema) and builds the OpenAPI document,
+    without opening a database connection.
+    """
+    from django.conf import settings
+    from django.urls import get_resolver
+
+    started = time.perf_counter()
+    resolver = get_resolver()
+    resolver.url_patterns  # imports ROOT_URLCONF and core.api
+
+    from dealer_project.urls import api
+    api.get_openapi_document(path_prefix='/api/')
+
+    logger.info("Warm-up of %s took %.1f ms", settings.ROOT_URLCONF, (time.perf_counter() - started) * 1000)
@@ -18,6 +18,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -25,6 +28,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.idempotency.IdempotencyMiddleware',
 ]
 
 ROOT_URLCONF = 'dealer_project.urls'
@@ -71,6 +75,105 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # API Authentication settings
 API_AUTHENTICATION_ENABLED = True
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Response cache versions and entries (core/cache.py). Shared by all
+    # gunicorn workers and management commands, so a write in one process
+    # invalidates every worker; point it at Redis or Memcached when available
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# manage.py archive_supplies moves supplies created more than this many days
+# ago to gzip NDJSON segments in SUPPLY_ARCHIVE_DIR (core/archive.py)
+SUPPLY_ARCHIVE_AFTER_DAYS = 3 * 365
+SUPPLY_ARCHIVE_DIR = BASE_DIR / 'archive'
+
+# Once product_supplies is partitioned by month (manage.py partition_supplies),
+# the daily --ensure run keeps this many months of partitions ready ahead
+SUPPLY_PARTITION_MONTHS_AHEAD = 3
+
+# Dashboard group_by=branch|dealer breakdowns and leaderboards return at most
+# this many groups
+DASHBOARD_MAX_GROUPS = 200
+
+# GET /api/core/dealers/autocomplete returns at most this many suggestions
+AUTOCOMPLETE_MAX_RESULTS = 50
+
+# GET /api/core/dealers/batch and /supplies/batch accept at most this many ids
+BATCH_MAX_IDS = 200
+
+# In-process caches (core/invalidation.py) are evicted across workers through
+# Postgres LISTEN/NOTIFY. Without it (SQLite, or while the listener
+# reconnects) entries expire after the fallback TTL; with it they are still
+# reloaded after LOCAL_CACHE_MAX_AGE as a safety net (seconds)
+INVALIDATION_BUS_ENABLED = True
+LOCAL_CACHE_FALLBACK_TTL = 30
+LOCAL_CACHE_MAX_AGE = 3600
+
+# Read endpoints (dealer details/supplies, dealer list, dashboard) are cached
+# in the 'responses' cache under per-scope versions that writes bump
+# (core/cache.py); the TTL (seconds) bounds staleness only for changes that
+# bypass the ORM and signals (raw SQL, manual edits in the database)
+RESPONSE_CACHE_TTL = 600
+
+# Pagination counts: tables above the threshold report the planner estimate when
+# unfiltered; filtered counts are cached for the TTL (seconds) and reported as
+# inexact (count_is_exact false) when served from that cache
+PAGINATION_ESTIMATE_THRESHOLD = 100_000
+PAGINATION_COUNT_CACHE_TTL = 30
+
+# NDJSON supply uploads (POST /api/core/supplies/stream) commit this many
+# lines per transaction
+SUPPLY_STREAM_CHUNK_SIZE = 1000
+
+# Server-Timing header (auth, db, serialize, render, total) on /api/ responses
+SERVER_TIMING_ENABLED = True
+
+# Prometheus metrics per route/status at /metrics; only answered for these
+# client addresses (nginx also restricts the location to localhost)
+METRICS_ENABLED = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Staff can profile a single API request with X-Profile: 1 or ?_profile=1;
+# reports are kept in PROFILER_DIR (oldest dropped beyond PROFILER_MAX_FILES)
+# and listed at /admin/profiles/
+PROFILER_ENABLED = True
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_FILES = 50
+
+# Idempotency-Key responses are replayed for this long; expired rows are
+# removed by manage.py purge_idempotency_keys
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+# A key claimed this long ago without a stored response (the worker died
+# mid-request) is handed to the next retry instead of answering 409
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = 300
+
+# Prebuilt OpenAPI document (manage.py export_openapi); ignored unless it was
+# built for the running code version (APP_VERSION env var or source mtimes)
+OPENAPI_SCHEMA_FILE = STATIC_ROOT / 'openapi.json'
+
+# Django admin on large tables: estimated counts, cached filter choices,
+# keyset pagination and index-only search for ProductSupply and Dealer
+ADMIN_PERFORMANCE_MODE = True
+ADMIN_FILTER_CACHE_TTL = 300
+
+# Dealer/branch deletion runs in the background in batches of this many supplies
+DELETION_CHUNK_SIZE = 500
+DELETION_CHUNK_PAUSE = 0.05  # seconds between batches, lets waiting writers in
+
+# Delta sync (/api/core/sync): on Postgres rows are ordered by writing transaction
+# (sync_xid); on other databases rows newer than the lag are left for the next
+# call. Cursors older than the tombstone retention must do a full resync
+SYNC_SAFETY_LAG_SECONDS = 2
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+SYNC_MAX_PAGE_SIZE = 2000
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -1,13 +1,20 @@
 from django.contrib import admin
 from django.urls import path
-from ninja import NinjaAPI
 from core.api import router as core_router, auth_router as core_auth_router
+from core.admin import profile_detail_view, profile_list_view
+from core.metrics import metrics_view
+from core.openapi import CachedSchemaNinjaAPI
+from core.timing import TimedJSONRenderer, instrument_api
 
-api = NinjaAPI(title="Dealer API", version="1.0")
+api = CachedSchemaNinjaAPI(title="Dealer API", version="1.0", renderer=TimedJSONRenderer())
 api.add_router("/core/", core_router)
 api.add_router("/auth/", core_auth_router)
+instrument_api(api)
 
 urlpatterns = [
+    path('admin/profiles/', admin.site.admin_view(profile_list_view), name='admin-profiles'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(profile_detail_view), name='admin-profile-detail'),
     path('admin/', admin.site.urls),
     path('api/', api.urls),
+    path('metrics', metrics_view),
 ]
@@ -32,6 +32,7 @@ sudo -H -u $DEPLOY_USER bash -lc "${ACTIVATE_CMD} && cd \"$APP_DIR\" && python m
 $SUDO mkdir -p "$APP_DIR/staticfiles"
 $SUDO chown -R $DEPLOY_USER:$DEPLOY_USER "$APP_DIR/staticfiles"
 sudo -H -u $DEPLOY_USER bash -lc "${ACTIVATE_CMD} && cd \"$APP_DIR\" && python manage.py collectstatic --noinput"
+sudo -H -u $DEPLOY_USER bash -lc "${ACTIVATE_CMD} && cd \"$APP_DIR\" && python manage.py export_openapi"
 
 # === SYSTEMD SERVICE ===
 GUNICORN_SERVICE_PATH=/etc/systemd/system/gunicorn_main_backend.service
@@ -45,7 +46,7 @@ User=$DEPLOY_USER
 Group=$DEPLOY_USER
 WorkingDirectory=$APP_DIR
 Environment="PATH=$VENV_DIR/bin"
-ExecStart=$VENV_DIR/bin/gunicorn --workers $NUM_WORKERS --bind unix:$SOCKET_FILE $PROJECT_MODULE.wsgi:application
+ExecStart=$VENV_DIR/bin/gunicorn --config $APP_DIR/deployments/gunicorn.conf.py --workers $NUM_WORKERS --bind unix:$SOCKET_FILE $PROJECT_MODULE.wsgi:application
 
 [Install]
 WantedBy=multi-user.target
@@ -55,9 +56,46 @@ $SUDO systemctl daemon-reload
 $SUDO systemctl enable gunicorn_main_backend.service
 $SUDO systemctl restart gunicorn_main_backend.service
 
+# === DELETION JOBS TIMER ===
+# Resumes dealer/branch deletions interrupted by a gunicorn restart
+DELETION_JOBS_UNIT=deletion_jobs_main_backend
+$SUDO tee "/etc/systemd/system/$DELETION_JOBS_UNIT.service" > /dev/null <<EOF
+[Unit]
+Description=Resume interrupted deletion jobs of the MAIN Django backend
+After=network.target
+
+[Service]
+Type=oneshot
+User=$DEPLOY_USER
+Group=$DEPLOY_USER
+WorkingDirectory=$APP_DIR
+Environment="PATH=$VENV_DIR/bin"
+ExecStart=$VENV_DIR/bin/python manage.py run_deletion_jobs
+EOF
+
+$SUDO tee "/etc/systemd/system/$DELETION_JOBS_UNIT.timer" > /dev/null <<EOF
+[Unit]
+Description=Run $DELETION_JOBS_UNIT every 5 minutes
+
+[Timer]
+OnCalendar=*:0/5
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+EOF
+
+$SUDO systemctl daemon-reload
+$SUDO systemctl enable --now "$DELETION_JOBS_UNIT.timer"
+
 # === NGINX CONFIG ===
 NGINX_CONF_PATH=/etc/nginx/sites-available/django_project_main
 $SUDO tee "$NGINX_CONF_PATH" > /dev/null <<EOF
+# Django's Server-Timing header (auth/db/serialize/render/total) next to nginx's own timings
+log_format server_timing_main '\$remote_addr [\$time_local] "\$request" \$status '
+                          'rt=\$request_time urt=\$upstream_response_time '
+                          'st="\$upstream_http_server_timing"';
+
 server {
     listen 8000;
     server_name $DOMAIN;
@@ -66,6 +104,24 @@ server {
       alias $APP_DIR/staticfiles/;
     }
 
+    access_log /var/log/nginx/access.log server_timing_main;
+
+    # Local Prometheus scraper only
+    location = /metrics {
+        allow 127.0.0.1;
+        allow ::1;
+        deny all;
+        include proxy_params;
+        proxy_pass http://unix:$SOCKET_FILE;
+    }
+
+    # NDJSON bulk uploads (README, Bulk uploads); everything else keeps the 1 MB default
+    location = /api/core/supplies/stream {
+        client_max_body_size 20m;
+        include proxy_params;
+        proxy_pass http://unix:$SOCKET_FILE;
+    }
+
     location / {
         include proxy_params;
         proxy_pass http://unix:$SOCKET_FILE;